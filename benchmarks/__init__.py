@@ -0,0 +1,10 @@
+"""Offline benchmarks for the hot paths of the bot.
+
+Each module can be run from the program root directory, e.g. `python -m benchmarks.bench_models`.
+`python -m benchmarks.suite` runs the parsing and lookup benchmarks against the recorded HTML
+fixtures in `benchmarks/fixtures` and can write a JSON report to compare between commits.
+`python -m benchmarks.replay` replays a stream of command messages through `bot.on_message` using
+the fake Discord client in `benchmarks.fake_discord`, reporting the throughput and latency.
+`python -m benchmarks.fixture_server` serves the fixtures by the paths of the real web services,
+with injectable faults, so that the bot can be pointed at it by setting `API_BASE_URL`.
+"""
@@ -0,0 +1,83 @@
+"""Benchmark of the memory usage and CPU time of the homework and Steam Market models."""
+
+# Standard library imports
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+# Local application imports
+# The bot module is imported first, as in `main`, to resolve the circular imports.
+from modules import bot  # pylint: disable=unused-import
+from modules import ROLE_CODES
+from modules.commands import HomeworkEvent, HomeworkEventContainer, TrackedItem
+
+NUM_EVENTS = 10_000
+SEED = 2022
+
+
+def make_event_args(num_events: int) -> list[tuple]:
+    """Generates the constructor arguments for the given number of homework events."""
+    rng = random.Random(SEED)
+    start = datetime(2022, 9, 1)
+    groups = list(ROLE_CODES)
+    args = []
+    for i in range(num_events):
+        deadline = start + timedelta(days=rng.randrange(365))
+        author_id = 274995992456069131
+        args.append((f"Zadanie {i}", rng.choice(groups), author_id, f"{deadline:%d.%m.%Y} 17"))
+    return args
+
+
+def _timed(label: str, function, *args) -> any:
+    """Runs the function and prints how long it took."""
+    start = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<36}{elapsed * 1000:>10.2f} ms")
+    return result
+
+
+def run(num_events: int = NUM_EVENTS) -> None:
+    """Runs the benchmark and prints the results."""
+    event_args = make_event_args(num_events)
+    print(f"Homework events: {num_events}")
+
+    _timed("construct (untraced)", lambda: [HomeworkEvent(*args) for args in event_args])
+    tracemalloc.start()
+    snapshot_start = tracemalloc.take_snapshot()
+    events = _timed("construct (traced)", lambda: [HomeworkEvent(*args) for args in event_args])
+    snapshot_end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(
+        stat.size_diff for stat in snapshot_end.compare_to(snapshot_start, "filename")
+    )
+    print(f"{'memory':<36}{allocated / 1024:>10.1f} KiB ({allocated / num_events:.0f} B/event)")
+
+    container = HomeworkEventContainer()
+
+    def sort_all():
+        for event in events:
+            event.sort_into_container(container)
+
+    _timed("sort_into_container (all)", sort_all)
+    _timed("serialise (cold)", lambda: container.serialised)
+    _timed("serialise (cached)", lambda: container.serialised)
+    now = datetime(2023, 3, 1, 17)
+    _timed(
+        "due reminder scan",
+        lambda: [e for e in container if e.reminder_is_active and e.reminder_time <= now],
+    )
+    _timed("build identity set", lambda: set(container))
+    reference = HomeworkEventContainer(HomeworkEvent(*args) for args in event_args)
+    _timed("remove_disjunction", container.remove_disjunction, reference)
+
+    items = [TrackedItem(f"Case {i}", 100, 300, i) for i in range(num_events)]
+    probe = TrackedItem(f"Case {num_events - 1}", 100, 300, num_events - 1)
+    _timed("TrackedItem list lookup (worst case)", lambda: probe in items)
+    item_set = _timed("TrackedItem set build", set, items)
+    _timed("TrackedItem set lookup", lambda: probe in item_set)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,61 @@
+"""Microbenchmark of the per-message overhead of `bot.on_message` on a busy channel.
+
+Simulates ordinary chatter that the bot should ignore, which is the vast majority of messages.
+"""
+
+# Standard library imports
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+# Local application imports
+from modules import bot
+
+NUM_MESSAGES = 100_000
+SEED = 2022
+WORDS = ["hej", "co", "jest", "zadanie", "na", "jutro", "matma", "kiedy", "lekcja", "xd"]
+
+
+def _make_chatter(num_messages: int) -> list[SimpleNamespace]:
+    """Generates messages imitating ordinary conversation, with no commands or mentions."""
+    rng = random.Random(SEED)
+    author = SimpleNamespace(roles=[], mention="<@1>")
+    guild = SimpleNamespace(id=bot.MY_SERVER_ID)
+    return [
+        SimpleNamespace(
+            content=" ".join(rng.choices(WORDS, k=rng.randint(1, 12))),
+            mentions=[],
+            author=author,
+            guild=guild,
+        )
+        for _ in range(num_messages)
+    ]
+
+
+async def _dispatch_all(messages: list[SimpleNamespace]) -> float:
+    """Passes each message through the event handler and returns the elapsed time."""
+    start = time.perf_counter()
+    for message in messages:
+        await bot.on_message(message)
+    return time.perf_counter() - start
+
+
+def run(num_messages: int = NUM_MESSAGES) -> None:
+    """Runs the benchmark and prints the results."""
+    messages = _make_chatter(num_messages)
+    # Messages starting with the beginning of an auto-reply trigger pass the prefilter
+    rejected = [m for m in messages if not bot.fast_path_pattern.match(m.content)]
+    elapsed = asyncio.run(_dispatch_all(rejected))
+    print(f"Chatter messages rejected: {len(rejected)}")
+    print(f"on_message fast path:  {elapsed / len(rejected) * 1e6:.3f} µs/message")
+
+    start = time.perf_counter()
+    for message in messages:
+        bot.get_auto_reply(bot.MY_SERVER_ID, message.content)
+    elapsed = time.perf_counter() - start
+    print(f"auto-reply trie lookup: {elapsed / num_messages * 1e6:.3f} µs/message")
+
+
+if __name__ == "__main__":
+    run()
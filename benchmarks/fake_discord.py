@@ -0,0 +1,224 @@
+"""Local stand-ins for the discord.py objects used by the bot, for offline load testing.
+
+The fakes implement only the attributes and methods that the bot's message handling uses. Each
+method that would make a request to the Discord REST API records it in a `RestRecorder` instead,
+attributed to the label of the command that is currently being replayed.
+"""
+
+# Standard library imports
+import asyncio
+import contextlib
+import contextvars
+import itertools
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+# Third-party imports
+import discord
+
+# The label that the REST calls made in the current context are attributed to
+current_label: contextvars.ContextVar[str] = contextvars.ContextVar("current_label", default=None)
+
+_snowflakes = itertools.count(1_000_000_000_000_000)
+
+
+def make_snowflake() -> int:
+    """Returns a new unique ID."""
+    return next(_snowflakes)
+
+
+class RestRecorder:
+    """Records the REST API calls made through the fake objects.
+
+    Attributes:
+        latency -- the number of seconds each REST call takes, simulated using `asyncio.sleep`.
+        calls -- the number of calls made to each route, for each command label.
+    """
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.latency: float = latency
+        self.calls: defaultdict[str, Counter] = defaultdict(Counter)
+
+    async def request(self, method: str, route: str) -> None:
+        """Records a single REST call made in the current context."""
+        self.calls[current_label.get()][f"{method} {route}"] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def count(self, label: str) -> int:
+        """Returns the total number of REST calls attributed to the label."""
+        return sum(self.calls[label].values())
+
+
+class FakeRole:
+    """Stand-in for `discord.Role`."""
+
+    def __init__(self, name: str, role_id: int = None) -> None:
+        self.name: str = name
+        self.id: int = role_id or make_snowflake()  # pylint: disable=invalid-name
+        self.mention: str = f"<@&{self.id}>"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeMember:
+    """Stand-in for `discord.Member` and `discord.ClientUser`."""
+
+    def __init__(self, name: str, roles: list[FakeRole] = None, member_id: int = None) -> None:
+        self.name: str = name
+        self.display_name: str = name
+        self.id: int = member_id or make_snowflake()  # pylint: disable=invalid-name
+        self.roles: list[FakeRole] = roles or []
+        self.mention: str = f"<@{self.id}>"
+        self.bot: bool = False
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, FakeMember) and self.id == other.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeGuild:
+    """Stand-in for `discord.Guild`."""
+
+    def __init__(self, guild_id: int, roles: list[FakeRole], owner: FakeMember) -> None:
+        self.id: int = guild_id  # pylint: disable=invalid-name
+        self.name: str = "Fake guild"
+        self.roles: list[FakeRole] = roles
+        self.owner: FakeMember = owner
+        self.members: list[FakeMember] = [owner]
+
+    def get_role(self, role_id: int) -> FakeRole or None:
+        """Returns the role with the given ID, or None if there is none."""
+        return next((role for role in self.roles if role.id == role_id), None)
+
+    def get_member(self, member_id: int) -> FakeMember or None:
+        """Returns the member with the given ID, or None if there is none."""
+        return next((member for member in self.members if member.id == member_id), None)
+
+
+class FakeChannel:
+    """Stand-in for `discord.TextChannel`."""
+
+    def __init__(
+        self, channel_id: int, guild: FakeGuild, rest: RestRecorder, bot_user: FakeMember
+    ) -> None:
+        self.id: int = channel_id  # pylint: disable=invalid-name
+        self.guild: FakeGuild = guild
+        self.rest: RestRecorder = rest
+        self.bot_user: FakeMember = bot_user
+        self.mention: str = f"<#{channel_id}>"
+
+    async def send(self, content: str = None, **kwargs) -> "FakeMessage":
+        """Records the request and returns the sent message."""
+        await self.rest.request("POST", f"/channels/{self.id}/messages")
+        return FakeMessage.from_kwargs(self, self.bot_user, content, kwargs)
+
+    @contextlib.asynccontextmanager
+    async def typing(self):
+        """Records the request to trigger the typing indicator."""
+        await self.rest.request("POST", f"/channels/{self.id}/typing")
+        yield
+
+    def permissions_for(self, member: FakeMember) -> SimpleNamespace:
+        """Returns the permissions of the member, which are only administrative for the owner."""
+        return SimpleNamespace(administrator=member == self.guild.owner)
+
+
+class FakeMessage:
+    """Stand-in for `discord.Message`."""
+
+    def __init__(
+        self,
+        content: str,
+        author: FakeMember,
+        channel: FakeChannel,
+        mentions: list[FakeMember] = None,
+        embeds: list[discord.Embed] = None,
+    ) -> None:
+        self.id: int = make_snowflake()  # pylint: disable=invalid-name
+        self.content: str = content or ""
+        self.author: FakeMember = author
+        self.channel: FakeChannel = channel
+        self.guild: FakeGuild = channel.guild
+        self.mentions: list[FakeMember] = mentions or []
+        self.embeds: list[discord.Embed] = embeds or []
+
+    @classmethod
+    def from_kwargs(
+        cls, channel: FakeChannel, author: FakeMember, content: str, kwargs: dict[str, any]
+    ) -> "FakeMessage":
+        """Creates the message from the keyword arguments passed to `send`, `reply` or `edit`."""
+        embed = kwargs.get("embed")
+        return cls(content, author, channel, embeds=[embed] if embed else [])
+
+    async def reply(self, content: str = None, **kwargs) -> "FakeMessage":
+        """Records the request and returns the reply."""
+        await self.channel.rest.request("POST", f"/channels/{self.channel.id}/messages")
+        return FakeMessage.from_kwargs(self.channel, self.channel.bot_user, content, kwargs)
+
+    async def edit(self, content: str = None, **kwargs) -> "FakeMessage":
+        """Records the request and updates the message."""
+        await self.channel.rest.request("PATCH", f"/channels/{self.channel.id}/messages/{{id}}")
+        if content is not None:
+            self.content = content
+        if kwargs.get("embed") is not None:
+            self.embeds = [kwargs["embed"]]
+        return self
+
+    async def add_reaction(self, _) -> None:
+        """Records the request to add a reaction."""
+        route = f"/channels/{self.channel.id}/messages/{{id}}/reactions/{{emoji}}/@me"
+        await self.channel.rest.request("PUT", route)
+
+    async def delete(self) -> None:
+        """Records the request to delete the message."""
+        await self.channel.rest.request("DELETE", f"/channels/{self.channel.id}/messages/{{id}}")
+
+
+class FakeClient:
+    """Stand-in for `discord.Client`, which is connected to a single guild.
+
+    Attributes:
+        user -- the bot's own user.
+        guild -- the only guild the client is in.
+        rest -- the recorder of the REST calls made through the fake objects.
+    """
+
+    def __init__(self, guild_id: int, role_names: list[str], rest: RestRecorder) -> None:
+        self.rest: RestRecorder = rest
+        self.user = FakeMember("Dzwonnik", [FakeRole("Bot")])
+        roles = [FakeRole(name) for name in role_names]
+        self.guild = FakeGuild(guild_id, roles, FakeMember("Owner", roles))
+        self.guild.members.append(self.user)
+        self.guilds: list[FakeGuild] = [self.guild]
+        self._channels: dict[int, FakeChannel] = {}
+
+    async def wait_until_ready(self) -> None:
+        """The fake client is always ready."""
+
+    def is_ready(self) -> bool:
+        """The fake client is always ready."""
+        return True
+
+    def get_channel(self, channel_id: int) -> FakeChannel:
+        """Returns the channel with the given ID, creating it if it's not been used before."""
+        if channel_id not in self._channels:
+            self._channels[channel_id] = FakeChannel(channel_id, self.guild, self.rest, self.user)
+        return self._channels[channel_id]
+
+    def get_guild(self, guild_id: int) -> FakeGuild or None:
+        """Returns the guild if it has the given ID."""
+        return self.guild if guild_id == self.guild.id else None
+
+    def make_member(self, name: str, role_names: list[str]) -> FakeMember:
+        """Creates a member of the guild with the roles of the given names."""
+        roles = [role for role in self.guild.roles if role.name in role_names]
+        member = FakeMember(name, roles)
+        self.guild.members.append(member)
+        return member
@@ -0,0 +1,290 @@
+"""Local stand-in for the web services used by the API modules, serving the recorded fixtures.
+
+All of the services are served from a single origin, by the same paths as the real ones, so the
+bot can be pointed at the server by setting the `API_BASE_URL` environment variable, e.g.:
+
+    python -m benchmarks.fixture_server --port 8080 --latency 0.2 --rate-limited 0.1
+    API_BASE_URL=http://127.0.0.1:8080 python main.py
+
+Faults can be injected into the responses: latency, 403 Forbidden and 429 Too Many Requests
+responses, and malformed (truncated) bodies. They are chosen using a seeded random number generator,
+so a sequence of requests is answered deterministically. The faults can be changed while the server
+is running with a PUT request to `/_control/faults`, and the number of requests received by each
+route and the response statuses are available at `/_control/stats`.
+
+The server can also be run in a background thread from Python code using `serve`:
+
+    with fixture_server.serve(FaultConfig(malformed_rate=0.5)) as server:
+        lesson_plan.get_lesson_plan(force_update=True)
+        print(server.stats)
+"""
+
+# Standard library imports
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import sys
+import threading
+from collections import Counter
+from datetime import date
+
+# Third-party imports
+from aiohttp import web
+
+# Local application imports
+# The bot module is imported first, as in `main`, to resolve the circular imports.
+from modules import bot  # pylint: disable=unused-import
+from modules.api import endpoints, lesson_plan, lucky_numbers, steam_market, substitutions
+from benchmarks.suite import read_fixture
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+CONTROL_PREFIX = "/_control/"
+LUCKY_NUMBERS = {"luckyNumbers": [7, 21], "excludedClasses": ["3D"]}
+
+
+class FaultConfig:
+    """The faults injected into the responses of the fixture routes.
+
+    Attributes:
+        latency -- the number of seconds each response is delayed by.
+        jitter -- the maximum number of seconds randomly added to the latency.
+        forbidden_rate -- the fraction of requests answered with 403 Forbidden.
+        rate_limited_rate -- the fraction of requests answered with 429 Too Many Requests.
+        retry_after -- the value of the Retry-After header sent with the 429 responses, in seconds.
+        malformed_rate -- the fraction of successful responses whose body is truncated.
+        seed -- the seed of the random number generator that chooses the faults.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        forbidden_rate: float = 0.0,
+        rate_limited_rate: float = 0.0,
+        retry_after: int = 3,
+        malformed_rate: float = 0.0,
+        seed: int = 2022,
+    ) -> None:
+        self.latency: float = latency
+        self.jitter: float = jitter
+        self.forbidden_rate: float = forbidden_rate
+        self.rate_limited_rate: float = rate_limited_rate
+        self.retry_after: int = retry_after
+        self.malformed_rate: float = malformed_rate
+        self.seed: int = seed
+
+    @property
+    def serialised(self) -> dict[str, float or int]:
+        """The JSON-serialisable dictionary of the fault settings."""
+        return dict(vars(self))
+
+    def update(self, values: dict[str, any]) -> None:
+        """Changes the given settings, keeping the others.
+
+        Raises ValueError if a setting doesn't exist or its value is invalid.
+        """
+        for key, value in values.items():
+            if key not in vars(self):
+                raise ValueError(f"unknown fault setting '{key}'")
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or value < 0:
+                raise ValueError(f"invalid value of '{key}': {value!r}")
+        vars(self).update(values)
+
+
+class FixtureServer:
+    """The HTTP server answering the requests using the fixtures.
+
+    Attributes:
+        faults -- the faults injected into the responses.
+        stats -- the number of requests made to each route and of each response status.
+        base_url -- the URL of the running server, or None if it's not been started.
+    """
+
+    def __init__(self, faults: FaultConfig = None) -> None:
+        self.faults: FaultConfig = faults or FaultConfig()
+        self.stats: dict[str, Counter] = {"routes": Counter(), "statuses": Counter()}
+        self.base_url: str or None = None
+        self._random = random.Random(self.faults.seed)
+        self._runner: web.AppRunner or None = None
+        self._steam: dict[str, any] = json.loads(read_fixture("steam.json"))
+
+    def make_app(self) -> web.Application:
+        """Creates the application containing the fixture and control routes."""
+        app = web.Application(middlewares=[self._apply_faults])
+        plan_path = lesson_plan.SOURCE_PATH.replace("{id}", r"{plan_id:\d+}")
+        app.router.add_get(plan_path, self._get_lesson_plan)
+        app.router.add_get(substitutions.SOURCE_PATH, self._get_substitutions)
+        app.router.add_get(lucky_numbers.SOURCE_PATH, self._get_lucky_numbers)
+        app.router.add_get(steam_market.SOURCE_PATH_A.split("?")[0], self._get_price_overview)
+        app.router.add_get(steam_market.SOURCE_PATH_B.split("?")[0], self._search_items)
+        app.router.add_get(CONTROL_PREFIX + "faults", self._get_faults)
+        app.router.add_put(CONTROL_PREFIX + "faults", self._put_faults)
+        app.router.add_get(CONTROL_PREFIX + "stats", self._get_stats)
+        app.router.add_delete(CONTROL_PREFIX + "stats", self._reset_stats)
+        return app
+
+    async def start(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> str:
+        """Starts the server and returns its base URL. A port of 0 chooses any free port."""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        bound_host, bound_port = self._runner.addresses[0][:2]
+        self.base_url = f"http://{bound_host}:{bound_port}"
+        return self.base_url
+
+    async def stop(self) -> None:
+        """Stops the server."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+            self.base_url = None
+
+    @web.middleware
+    async def _apply_faults(self, request: web.Request, handler) -> web.StreamResponse:
+        """Delays the response, and may replace or truncate it according to the fault settings."""
+        if request.path.startswith(CONTROL_PREFIX):
+            return await handler(request)
+        route = request.match_info.route.resource
+        self.stats["routes"][route.canonical if route else request.path] += 1
+        faults = self.faults
+        delay = faults.latency + self._random.uniform(0, faults.jitter)
+        if delay:
+            await asyncio.sleep(delay)
+        roll = self._random.random()
+        if roll < faults.forbidden_rate:
+            response = web.Response(status=403, text="403 Forbidden")
+        elif roll < faults.forbidden_rate + faults.rate_limited_rate:
+            headers = {"Retry-After": str(faults.retry_after)}
+            response = web.Response(status=429, text="429 Too Many Requests", headers=headers)
+        else:
+            response = await handler(request)
+            if response.status == 200 and self._random.random() < faults.malformed_rate:
+                # Cut the body off somewhere in its first half, leaving unclosed tags and brackets
+                response.body = response.body[: self._random.randrange(len(response.body) // 2)]
+        self.stats["statuses"][response.status] += 1
+        return response
+
+    async def _get_lesson_plan(self, _: web.Request) -> web.Response:
+        """Every class is given the same lesson plan."""
+        return web.Response(text=read_fixture("plan.html"), content_type="text/html")
+
+    async def _get_substitutions(self, _: web.Request) -> web.Response:
+        return web.Response(text=read_fixture("substitutions.html"), content_type="text/html")
+
+    async def _get_lucky_numbers(self, _: web.Request) -> web.Response:
+        return web.json_response({"date": f"{date.today():%Y-%m-%d}", **LUCKY_NUMBERS})
+
+    async def _get_price_overview(self, request: web.Request) -> web.Response:
+        """Like the real API, responds with 500 Internal Server Error for unknown items."""
+        item = self._steam["priceoverview"].get(request.query.get("market_hash_name"))
+        if item is None:
+            return web.json_response({"success": False}, status=500)
+        return web.json_response(item)
+
+    async def _search_items(self, request: web.Request) -> web.Response:
+        query = request.query.get("query", "").lower()
+        start = int(request.query.get("start", 0))
+        count = int(request.query.get("count", 10))
+        results = [item for item in self._steam["items"] if query in item["name"].lower()]
+        return web.json_response({
+            "success": True,
+            "start": start,
+            "pagesize": count,
+            "total_count": len(results),
+            "results": results[start : start + count],
+        })
+
+    async def _get_faults(self, _: web.Request) -> web.Response:
+        return web.json_response(self.faults.serialised)
+
+    async def _put_faults(self, request: web.Request) -> web.Response:
+        """Changes the fault settings given in the JSON body. The seed also resets the generator."""
+        try:
+            values = await request.json()
+            self.faults.update(values)
+        except (ValueError, AttributeError) as error:
+            return web.json_response({"error": str(error)}, status=400)
+        if "seed" in values:
+            self._random.seed(self.faults.seed)
+        return web.json_response(self.faults.serialised)
+
+    async def _get_stats(self, _: web.Request) -> web.Response:
+        return web.json_response({key: dict(counter) for key, counter in self.stats.items()})
+
+    async def _reset_stats(self, _: web.Request) -> web.Response:
+        for counter in self.stats.values():
+            counter.clear()
+        return web.Response(status=204)
+
+
+@contextlib.contextmanager
+def serve(faults: FaultConfig = None, host: str = DEFAULT_HOST, port: int = 0):
+    """Runs the server in a background thread and points the API modules at it.
+
+    The API modules make blocking requests, so the server can't run in the caller's event loop.
+    Yields the running FixtureServer. The base URL override is removed on exit.
+    """
+    server = FixtureServer(faults)
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="fixture-server", daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(server.start(host, port), loop).result()
+        endpoints.set_base_url(server.base_url)
+        yield server
+    finally:
+        endpoints.set_base_url(None)
+        asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+async def run_forever(server: FixtureServer, host: str, port: int) -> None:
+    """Starts the server and keeps it running until cancelled."""
+    base_url = await server.start(host, port)
+    print(f"Serving the fixtures at {base_url}. Set {endpoints.GLOBAL_OVERRIDE_VARIABLE}={base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main(arguments: list[str] = None) -> None:
+    """Parses the command-line arguments and runs the server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("-p", "--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("-l", "--latency", type=float, default=0.0, help="in seconds")
+    parser.add_argument("-j", "--jitter", type=float, default=0.0, help="in seconds")
+    parser.add_argument("--forbidden", type=float, default=0.0, help="the rate of 403 responses")
+    parser.add_argument(
+        "--rate-limited", type=float, default=0.0, help="the rate of 429 responses"
+    )
+    parser.add_argument("--retry-after", type=int, default=3, help="in seconds")
+    parser.add_argument(
+        "--malformed", type=float, default=0.0, help="the rate of truncated response bodies"
+    )
+    parser.add_argument("--seed", type=int, default=2022)
+    options = parser.parse_args(arguments)
+
+    faults = FaultConfig(
+        options.latency,
+        options.jitter,
+        options.forbidden,
+        options.rate_limited,
+        options.retry_after,
+        options.malformed,
+        options.seed,
+    )
+    try:
+        asyncio.run(run_forever(FixtureServer(faults), options.host, options.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,292 @@
+"""Load test of the end-to-end command dispatch, replaying a stream of messages through
+`bot.on_message` using the fake Discord client and stubbed web requests.
+
+The stream is either synthetic (a weighted mix of commands and ordinary chatter) or recorded, read
+from a JSON lines file in which each line contains the message 'content' and optionally the names
+of the author's 'roles'. For example:
+
+    python -m benchmarks.replay --messages 5000 --concurrency 20 --rest-latency 0.05
+    python -m benchmarks.replay --input messages.jsonl --output replay.json
+
+The web requests are answered with the recorded HTML fixtures, so no network access is needed.
+The benchmark runs in a temporary working directory, so the bot's files are not modified.
+"""
+
+# Standard library imports
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import date
+from unittest import mock
+from urllib.parse import urlsplit
+
+# Third-party imports
+from corny_commons.util import web
+
+# Local application imports
+# The bot module is imported first, as in `main`, to resolve the circular imports.
+from modules import bot
+from modules import ROLE_CODES, log_writer
+from modules.api import lesson_plan, lucky_numbers, substitutions
+from modules.commands import HomeworkEvent, HomeworkEventContainer
+from benchmarks import fake_discord
+from benchmarks.bench_models import make_event_args
+from benchmarks.suite import prepare_lesson_plans, read_fixture
+
+NUM_MESSAGES = 2_000
+CONCURRENCY = 10
+SEED = 2022
+NUM_HOMEWORK_EVENTS = 40
+CHANNEL_ID = 1
+# The label of the messages that aren't commands
+CHATTER_LABEL = "chatter"
+# The synthetic command mix and the relative frequency of each invocation
+COMMAND_WEIGHTS = {
+    "!help": 2,
+    "!nl": 10,
+    "!nb": 6,
+    "!nl 9 30": 3,
+    "!plan": 8,
+    "!plan 3": 4,
+    "!plan pon 1a": 2,
+    "!zadania": 6,
+    "!numerki": 5,
+    "!zast": 5,
+    "!plan 9": 1,
+    "!zad": 1,
+}
+CHATTER = ["hej", "co jest na jutro?", "kiedy sprawdzian z matmy", "xd", "jest lekcja?"]
+DEFAULT_ROLES = ["Grupa 1", ROLE_CODES["grupa_2fp"], ROLE_CODES["grupa_RB"]]
+
+
+class FakeResponse:
+    """Stand-in for `requests.Response` returned by the stubbed web requests."""
+
+    def __init__(self, text: str, status_code: int = 200) -> None:
+        self.text: str = text
+        self.status_code: int = status_code
+
+    def json(self) -> any:
+        """Deserialises the response body."""
+        return json.loads(self.text)
+
+
+class StubWeb:
+    """Answers the web requests made through `corny_commons.util.web` using the fixtures.
+
+    Attributes:
+        calls -- the number of requests made to each host, for each command label.
+    """
+
+    def __init__(self) -> None:
+        self.calls: defaultdict[str, Counter] = defaultdict(Counter)
+        self.routes: dict[str, str] = {
+            lesson_plan.SOURCE_PATH.rsplit("/", 1)[0]: read_fixture("plan.html"),
+            substitutions.SOURCE_PATH: read_fixture("substitutions.html"),
+            lucky_numbers.SOURCE_PATH: json.dumps({
+                "date": f"{date.today():%Y-%m-%d}",
+                "luckyNumbers": [7, 21],
+                "excludedClasses": ["3D"],
+            }),
+        }
+
+    def make_request(self, url: str, *_, **__) -> FakeResponse:
+        """Stub of `web.make_request`. Raises InvalidResponseException for unknown URLs."""
+        parts = urlsplit(url)
+        self.calls[fake_discord.current_label.get()][f"GET {parts.netloc}"] += 1
+        for path, body in self.routes.items():
+            if parts.path.startswith(path):
+                return FakeResponse(body)
+        raise web.InvalidResponseException(404)
+
+    def get_html(self, url: str, ignore_request_limit: bool = False) -> str:
+        """Stub of `web.get_html`."""
+        return self.make_request(url, ignore_request_limit=ignore_request_limit).text
+
+
+def make_synthetic_stream(
+    num_messages: int, chatter_ratio: float = 0.5
+) -> list[tuple[str, list[str]]]:
+    """Generates a stream of (content, role names) tuples with the weighted command mix."""
+    rng = random.Random(SEED)
+    invocations = list(COMMAND_WEIGHTS)
+    weights = list(COMMAND_WEIGHTS.values())
+    stream = []
+    for _ in range(num_messages):
+        if rng.random() < chatter_ratio:
+            stream.append((rng.choice(CHATTER), DEFAULT_ROLES))
+        else:
+            stream.append((rng.choices(invocations, weights)[0], DEFAULT_ROLES))
+    return stream
+
+
+def read_recorded_stream(filename: str) -> list[tuple[str, list[str]]]:
+    """Reads the stream of (content, role names) tuples from the JSON lines file."""
+    stream = []
+    with open(filename, "r", encoding="UTF-8") as file:
+        for line in file:
+            if line.strip():
+                message = json.loads(line)
+                stream.append((message["content"], message.get("roles", DEFAULT_ROLES)))
+    return stream
+
+
+def get_label(content: str) -> str:
+    """Returns the label that the message's statistics are attributed to, e.g. '!plan'."""
+    if not content.startswith(bot.prefix):
+        return CHATTER_LABEL
+    return content.split(maxsplit=1)[0].lower()
+
+
+def write_data_file() -> None:
+    """Writes a data file containing homework events, which is read by the 'zadania' command."""
+    # The events are sorted into a container so that they are given unique IDs, which key them
+    events = HomeworkEventContainer()
+    for args in make_event_args(NUM_HOMEWORK_EVENTS):
+        HomeworkEvent(*args).sort_into_container(events)
+    homework_events = {event.id_string: event.serialised for event in events}
+    with open("data.json", "w", encoding="UTF-8") as file:
+        json.dump({"homework_events": homework_events}, file)
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """Returns the value at the given fraction of the sorted list, e.g. 0.99."""
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+async def replay(
+    client: fake_discord.FakeClient,
+    stream: list[tuple[str, list[str]]],
+    concurrency: int,
+) -> tuple[float, dict[str, list[float]]]:
+    """Dispatches the messages through `bot.on_message` with the given number in flight at once.
+
+    Returns the total elapsed time and the latencies of the messages, grouped by label.
+    """
+    # As in `bot.on_ready`, so that the messages logged from worker threads are sent by this loop
+    bot.client_loop = asyncio.get_running_loop()
+    channel = client.get_channel(CHANNEL_ID)
+    authors: dict[tuple[str], fake_discord.FakeMember] = {}
+    latencies: defaultdict[str, list[float]] = defaultdict(list)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def dispatch(message: fake_discord.FakeMessage, label: str) -> None:
+        fake_discord.current_label.set(label)
+        async with semaphore:
+            start = time.perf_counter()
+            await bot.on_message(message)
+            latencies[label].append(time.perf_counter() - start)
+
+    tasks = []
+    start = time.perf_counter()
+    for content, role_names in stream:
+        key = tuple(role_names)
+        if key not in authors:
+            authors[key] = client.make_member(f"Uczeń {len(authors) + 1}", role_names)
+        message = fake_discord.FakeMessage(content, authors[key], channel)
+        tasks.append(asyncio.create_task(dispatch(message, get_label(content))))
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - start
+    # Let the background tasks such as the log messages finish, so that their calls are counted
+    pending = asyncio.all_tasks() - {asyncio.current_task()}
+    await asyncio.gather(*pending, return_exceptions=True)
+    return elapsed, latencies
+
+
+def run(
+    stream: list[tuple[str, list[str]]], concurrency: int = CONCURRENCY, rest_latency: float = 0.0
+) -> dict[str, any]:
+    """Replays the stream in a temporary working directory and returns the report."""
+    rest = fake_discord.RestRecorder(rest_latency)
+    role_names = list(ROLE_CODES.values()) + ["Bot"]
+    client = fake_discord.FakeClient(bot.MY_SERVER_ID, role_names, rest)
+    stub_web = StubWeb()
+    original_directory = os.getcwd()
+    with contextlib.ExitStack() as stack:
+        working_directory = stack.enter_context(tempfile.TemporaryDirectory())
+        os.chdir(working_directory)
+        stack.callback(os.chdir, original_directory)
+        # Write the queued log lines before the temporary directory is removed
+        stack.callback(log_writer.flush)
+        stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+        stack.enter_context(mock.patch.object(bot, "client", client))
+        stack.enter_context(mock.patch.object(web, "make_request", stub_web.make_request))
+        stack.enter_context(mock.patch.object(web, "get_html", stub_web.get_html))
+        # The web requests log through the bot, as set up by `bot.on_ready`
+        stack.enter_context(mock.patch.object(web, "send_log", bot.send_log))
+        stack.enter_context(mock.patch.object(bot, "client_loop", None))
+        prepare_lesson_plans()
+        write_data_file()
+        elapsed, latencies = asyncio.run(replay(client, stream, concurrency))
+
+    results = {}
+    for label, values in sorted(latencies.items()):
+        values.sort()
+        results[label] = {
+            "messages": len(values),
+            "p50_ms": round(percentile(values, 0.5) * 1000, 3),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 3),
+            "rest_calls_per_message": round(rest.count(label) / len(values), 2),
+            "rest_calls": dict(rest.calls[label]),
+            "web_requests": dict(stub_web.calls[label]),
+        }
+    return {
+        "messages": len(stream),
+        "concurrency": concurrency,
+        "rest_latency_s": rest_latency,
+        "elapsed_s": round(elapsed, 4),
+        "throughput_per_s": round(len(stream) / elapsed, 1),
+        "unattributed_rest_calls": dict(rest.calls[None]),
+        "commands": results,
+    }
+
+
+def print_report(report: dict[str, any]) -> None:
+    """Prints the summary of the report."""
+    print(
+        f"{report['messages']} messages, concurrency {report['concurrency']}: "
+        f"{report['elapsed_s']:.3f} s, {report['throughput_per_s']:.1f} messages/s"
+    )
+    print(f"{'label':<16}{'count':>8}{'p50 ms':>12}{'p99 ms':>12}{'REST/msg':>10}")
+    for label, result in report["commands"].items():
+        print(
+            f"{label:<16}{result['messages']:>8}{result['p50_ms']:>12.3f}"
+            f"{result['p99_ms']:>12.3f}{result['rest_calls_per_message']:>10.2f}"
+        )
+
+
+def main(arguments: list[str] = None) -> None:
+    """Parses the command-line arguments, replays the stream and prints the report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-i", "--input", help="a JSON lines file containing recorded messages")
+    parser.add_argument("-n", "--messages", type=int, default=NUM_MESSAGES)
+    parser.add_argument("-c", "--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument(
+        "-l", "--rest-latency", type=float, default=0.0, help="simulated REST latency in seconds"
+    )
+    parser.add_argument("-o", "--output", help="the file to write the JSON report to")
+    options = parser.parse_args(arguments)
+
+    if options.input:
+        stream = read_recorded_stream(options.input)
+    else:
+        stream = make_synthetic_stream(options.messages)
+    report = run(stream, options.concurrency, options.rest_latency)
+    print_report(report)
+    if options.output:
+        with open(options.output, "w", encoding="UTF-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+            file.write("\n")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
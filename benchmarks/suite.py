@@ -0,0 +1,378 @@
+"""Offline benchmark suite of the parsing and lookup hot paths, using the recorded HTML fixtures.
+
+Writes a JSON report that can be compared between commits, e.g.:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json --compare before.json
+
+The benchmarks run in a temporary working directory, so the cache, data and log files of the bot
+are not modified. The log output of the benchmarked functions is discarded.
+
+The time taken to import the bot is also measured in fresh interpreters using `-X importtime`.
+The suite exits with a non-zero status if it exceeds the budget, or if any of the modules that
+should only be imported on first use is imported eagerly.
+"""
+
+# Standard library imports
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Local application imports
+# The bot module is imported first, as in `main`, to resolve the circular imports.
+from modules import bot  # pylint: disable=unused-import
+from modules import ROLE_CODES, util, data_manager, commands, log_writer, startup
+from modules.api import cache, lesson_plan, substitutions
+from modules.commands import HomeworkEvent, HomeworkEventContainer
+from benchmarks.bench_models import make_event_args
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(__file__), "fixtures")
+PROGRAM_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_REPEAT = 20
+EVENT_COUNTS = (10, 1_000, 10_000)
+# Fewer repetitions are needed for the slow cases to give a stable median
+SLOW_CASE_REPEAT = 5
+# The number of fresh interpreters the import time is measured in
+IMPORT_TIME_RUNS = 5
+# The maximum median time taken to import the bot, including its dependencies
+IMPORT_TIME_BUDGET_MS = 1_000
+# The number of slowest modules of the bot included in the import time report
+IMPORT_TIME_SLOWEST = 10
+# The modules that should only be imported when they are first used
+LAZY_MODULES = (
+    "lxml.html",
+    "cProfile",
+    "pstats",
+    "tracemalloc",
+    "multiprocessing",
+    "aiohttp.web",
+    "modules.sandbox",
+)
+
+
+def read_fixture(filename: str) -> str:
+    """Returns the contents of the fixture file."""
+    with open(os.path.join(FIXTURES_DIRECTORY, filename), "r", encoding="UTF-8") as file:
+        return file.read()
+
+
+class Case:
+    """A single benchmark.
+
+    Attributes:
+        name -- the unique name of the benchmark, used as its key in the report.
+        function -- the function to time. It is passed the value returned by the setup function.
+        setup -- an optional function run before each repetition, which isn't timed.
+        operations -- the number of operations performed by each call of the function.
+        repeat -- the number of times the function is timed.
+        check -- an optional function run after each repetition, which isn't timed. It is passed
+        the value returned by the setup function and raises AssertionError if the result is wrong.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        function,
+        setup=None,
+        operations: int = 1,
+        repeat: int = None,
+        check=None,
+    ) -> None:
+        self.name: str = name
+        self.function = function
+        self.setup = setup
+        self.operations: int = operations
+        self.repeat: int = repeat
+        self.check = check
+
+    def run(self, default_repeat: int) -> dict[str, float or int]:
+        """Times the function and returns the statistics in milliseconds."""
+        timings = []
+        for _ in range(self.repeat or default_repeat):
+            argument = self.setup() if self.setup else None
+            start = time.perf_counter()
+            self.function(argument)
+            timings.append((time.perf_counter() - start) * 1000)
+            if self.check:
+                self.check(argument)
+        median = statistics.median(timings)
+        return {
+            "repeat": len(timings),
+            "operations": self.operations,
+            "min_ms": round(min(timings), 4),
+            "median_ms": round(median, 4),
+            "mean_ms": round(statistics.fmean(timings), 4),
+            "stdev_ms": round(statistics.stdev(timings), 4) if len(timings) > 1 else 0.0,
+            "per_operation_us": round(median * 1000 / self.operations, 3),
+        }
+
+
+def prepare_lesson_plans() -> None:
+    """Parses the plan fixture and makes it available as the lesson plan of every class."""
+    plan = lesson_plan.parse_html(read_fixture("plan.html"))
+    for plan_id in range(1, 18):
+        cache.put("plan", plan_id, plan)
+    util.lesson_plan = plan
+    with open(os.path.join(PROGRAM_ROOT, "plan-dp1.json"), "r", encoding="UTF-8") as file:
+        util.lesson_plan_dp = {"times": plan["Godz"], "weekdays": json.load(file)}
+    startup.compile_lookup_tables()
+
+
+def get_cases() -> list[Case]:
+    """Returns the benchmark cases. The lesson plans must be prepared beforehand."""
+    plan_html = read_fixture("plan.html")
+    subs_html = read_fixture("substitutions.html")
+
+    # Every five minutes from Monday to Sunday
+    week_start = datetime(2023, 3, 13)
+    times = [week_start + timedelta(minutes=minutes) for minutes in range(0, 7 * 24 * 60, 5)]
+    num_periods = len(util.lesson_plan["Godz"])
+    # Group codes and role names are both accepted
+    role_sets = [
+        ["grupa_0"],
+        ["grupa_1", "grupa_2fp"],
+        ["grupa_2", ROLE_CODES["grupa_rel"], ROLE_CODES["grupa_RB"], ROLE_CODES["grupa_RCH"]],
+    ]
+    lookups = [
+        (period, weekday, roles)
+        for period in range(num_periods)
+        for weekday in range(5)
+        for roles in role_sets
+    ]
+    dp_lookups = [(period, weekday) for period in range(num_periods) for weekday in range(5)]
+
+    cases = [
+        Case("lesson_plan.parse_html", lambda _: lesson_plan.parse_html(plan_html)),
+        Case("substitutions.parse_html", lambda _: substitutions.parse_html(subs_html)),
+        Case("substitutions.parse_html_new", lambda _: substitutions.parse_html_new(subs_html)),
+        Case(
+            "get_next_period",
+            lambda _: [commands.get_next_period(given_time) for given_time in times],
+            operations=len(times),
+        ),
+        Case(
+            "get_lesson_by_roles",
+            lambda _: [commands.get_lesson_by_roles(*lookup) for lookup in lookups],
+            operations=len(lookups),
+        ),
+        Case(
+            "get_lessons_dp",
+            lambda _: [commands.get_lessons_dp(*lookup) for lookup in dp_lookups],
+            operations=len(dp_lookups),
+        ),
+    ]
+
+    for num_events in EVENT_COUNTS:
+        event_args = make_event_args(num_events)
+        repeat = SLOW_CASE_REPEAT if num_events >= 10_000 else None
+
+        def make_events(args=event_args) -> list[HomeworkEvent]:
+            return [HomeworkEvent(*arguments) for arguments in args]
+
+        def sort_all(events: list[HomeworkEvent]) -> None:
+            container = HomeworkEventContainer()
+            for event in events:
+                event.sort_into_container(container)
+
+        def prepare_data_file(args=event_args) -> None:
+            commands.homework.homework_events.clear()
+            for event in make_events(args):
+                event.sort_into_container(commands.homework.homework_events)
+            # Ensure that the data differs from the file's contents, so that it's actually written
+            with open("data.json", "w", encoding="UTF-8") as file:
+                file.write("{}")
+
+        def check_data_file(_, expected=num_events) -> None:
+            with open("data.json", "r", encoding="UTF-8") as file:
+                num_written = len(json.load(file)["homework_events"])
+            assert num_written == expected, f"wrote {num_written} of {expected} events"
+
+        cases += [
+            Case(
+                f"HomeworkEvent.sort_into_container[{num_events}]",
+                sort_all,
+                make_events,
+                num_events,
+                repeat,
+            ),
+            Case(
+                f"save_data_file[{num_events}]",
+                lambda _: data_manager.save_data_file("data.json", allow_logs=False),
+                prepare_data_file,
+                repeat=repeat,
+                check=check_data_file,
+            ),
+        ]
+    return cases
+
+
+def parse_import_times(output: str) -> dict[str, tuple[int, int]]:
+    """Parses the output of `-X importtime`, returning the self and cumulative times of each module
+    in microseconds. The names of the modules imported by other modules keep their indentation.
+    """
+    times = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_time, cumulative_time, name = line[len("import time:") :].split("|")
+        if self_time.strip().isdigit():
+            times[name.rstrip().removeprefix(" ")] = (int(self_time), int(cumulative_time))
+    return times
+
+
+def measure_import_time(
+    runs: int = IMPORT_TIME_RUNS, budget_ms: float = IMPORT_TIME_BUDGET_MS
+) -> dict[str, any]:
+    """Imports the bot in fresh interpreters and returns the import time report."""
+    totals = []
+    module_times: dict[str, list[float]] = {}
+    imported_modules = set()
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import modules.bot"],
+            cwd=PROGRAM_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        times = parse_import_times(result.stderr)
+        imported_modules.update(name.strip() for name in times)
+        top_level = [name for name in times if name.startswith("modules")]
+        totals.append(sum(times[name][1] for name in top_level) / 1000)
+        for name, (_, cumulative_time) in times.items():
+            if name.strip().startswith("modules"):
+                module_times.setdefault(name.strip(), []).append(cumulative_time / 1000)
+    medians = {name: statistics.median(values) for name, values in module_times.items()}
+    slowest = sorted(medians.items(), key=lambda item: item[1], reverse=True)
+    total = statistics.median(totals)
+    eager_modules = [name for name in LAZY_MODULES if name in imported_modules]
+    return {
+        "runs": runs,
+        "median_total_ms": round(total, 3),
+        "budget_ms": budget_ms,
+        "eagerly_imported": eager_modules,
+        "passed": total <= budget_ms and not eager_modules,
+        "slowest_ms": {
+            name: round(duration, 3) for name, duration in slowest[:IMPORT_TIME_SLOWEST]
+        },
+    }
+
+
+def print_import_time_report(report: dict[str, any]) -> None:
+    """Prints the summary of the import time report."""
+    status = "OK" if report["passed"] else "FAILED"
+    print(
+        f"\nImport time: {report['median_total_ms']:.1f} ms "
+        f"(budget {report['budget_ms']:g} ms) -- {status}"
+    )
+    for name, duration in report["slowest_ms"].items():
+        print(f"  {name:<42}{duration:>12.3f} ms")
+    if report["eagerly_imported"]:
+        print("Imported eagerly: " + ", ".join(report["eagerly_imported"]))
+
+
+def get_commit() -> str or None:
+    """Returns the hash of the current git commit, or None if it can't be determined."""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=PROGRAM_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run(
+    repeat: int = DEFAULT_REPEAT,
+    name_filter: str = None,
+    import_budget_ms: float = IMPORT_TIME_BUDGET_MS,
+) -> dict[str, any]:
+    """Runs the benchmarks in a temporary working directory and returns the report."""
+    results = {}
+    original_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as working_directory:
+        os.chdir(working_directory)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                prepare_lesson_plans()
+                cases = get_cases()
+            for case in cases:
+                if name_filter and name_filter not in case.name:
+                    continue
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results[case.name] = case.run(repeat)
+                print(f"{case.name:<44}{results[case.name]['median_ms']:>12.3f} ms")
+        finally:
+            commands.homework.homework_events.clear()
+            # Write the queued log lines before the temporary directory is removed
+            log_writer.flush()
+            os.chdir(original_directory)
+    imports = measure_import_time(budget_ms=import_budget_ms)
+    print_import_time_report(imports)
+    return {
+        "meta": {
+            "commit": get_commit(),
+            "timestamp": f"{datetime.now():%Y-%m-%d %H:%M:%S}",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+        "imports": imports,
+    }
+
+
+def compare(old_report: dict[str, any], new_report: dict[str, any]) -> None:
+    """Prints the relative change of the median time of each benchmark between the reports."""
+    print(f"\nCompared to {old_report['meta'].get('commit')}:")
+    for name, result in new_report["results"].items():
+        old_result = old_report["results"].get(name)
+        if old_result is None:
+            print(f"{name:<44}{'(new)':>12}")
+            continue
+        change = result["median_ms"] / old_result["median_ms"] - 1
+        print(f"{name:<44}{change:>+12.1%}")
+    if "imports" in old_report:
+        old_total = old_report["imports"]["median_total_ms"]
+        change = new_report["imports"]["median_total_ms"] / old_total - 1
+        print(f"{'import time':<44}{change:>+12.1%}")
+
+
+def main(arguments: list[str] = None) -> None:
+    """Parses the command-line arguments, runs the benchmarks and writes the report."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="the file to write the JSON report to")
+    parser.add_argument("-c", "--compare", help="a previous JSON report to compare against")
+    parser.add_argument("-r", "--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("-k", "--filter", help="only run the benchmarks containing this text")
+    parser.add_argument(
+        "-b", "--import-budget", type=float, default=IMPORT_TIME_BUDGET_MS, help="in milliseconds"
+    )
+    options = parser.parse_args(arguments)
+
+    report = run(options.repeat, options.filter, options.import_budget)
+    if options.output:
+        with open(options.output, "w", encoding="UTF-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+            file.write("\n")
+    if options.compare:
+        with open(options.compare, "r", encoding="UTF-8") as file:
+            compare(json.load(file), report)
+    if not report["imports"]["passed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
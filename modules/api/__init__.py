@@ -1,3 +1,12 @@
 """__init__.py file for the web API modules."""
 
-__all__ = ["lesson_plan", "lucky_numbers", "steam_market", "substitutions"]
+__all__ = [
+    "cache",
+    "endpoints",
+    "lesson_plan",
+    "lucky_numbers",
+    "single_flight",
+    "snapshots",
+    "steam_market",
+    "substitutions",
+]
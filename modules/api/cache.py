@@ -0,0 +1,253 @@
+"""The cache subsystem shared by the web API modules.
+
+Each namespace has an in-memory LRU tier, optionally backed by a disk tier which stores the entries
+as JSON files in the cache directory. Entries expire after the namespace's TTL, and the least
+recently used entries are evicted from memory once the namespace's size bound is exceeded.
+"""
+
+# Standard library imports
+import itertools
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Third-party imports
+from corny_commons import file_manager
+
+
+class CacheEntry:
+    """A single cached value.
+
+    Attributes:
+        data -- the cached data.
+        timestamp -- the UNIX timestamp of when the data was cached.
+        version -- a number that changes whenever the data changes, e.g. to key rendered embeds.
+    """
+
+    __slots__ = ("data", "timestamp", "version")
+
+    def __init__(self, data: any, timestamp: float, version: int = None) -> None:
+        self.data: any = data
+        self.timestamp: float = timestamp
+        self.version: int = next(_versions) if version is None else version
+
+    @property
+    def age(self) -> float:
+        """The number of seconds since the data was cached."""
+        return time.time() - self.timestamp
+
+
+class Namespace:
+    """The settings and the memory tier of a group of related cache entries.
+
+    Attributes:
+        name -- the name of the namespace, also used as the prefix of the cache filenames.
+        ttl -- the number of seconds after which entries expire, or None if they don't.
+        max_entries -- the maximum number of entries kept in memory.
+        persistent -- a boolean indicating if the entries are also stored on disk.
+        statistics -- the numbers of memory hits, disk hits, misses, expirations and evictions.
+    """
+
+    __slots__ = ("name", "ttl", "max_entries", "persistent", "entries", "statistics")
+
+    def __init__(
+        self, name: str, ttl: float = None, max_entries: int = 64, persistent: bool = True
+    ) -> None:
+        self.name: str = name
+        self.ttl: float = ttl
+        self.max_entries: int = max_entries
+        self.persistent: bool = persistent
+        self.entries: OrderedDict[any, CacheEntry] = OrderedDict()
+        self.statistics: dict[str, int] = dict.fromkeys(
+            ("memory_hits", "disk_hits", "misses", "expirations", "evictions"), 0
+        )
+
+    def get_filename(self, key: any) -> str:
+        """Returns the path of the file containing the entry with the given key."""
+        cache_name = self.name if key is None else f"{self.name}_{key}"
+        return os.path.join(file_manager.CACHE_DIRECTORY, f"{cache_name}.json")
+
+    def is_expired(self, entry: CacheEntry) -> bool:
+        """Checks if the entry is older than the namespace's TTL."""
+        return self.ttl is not None and entry.age > self.ttl
+
+
+_namespaces: dict[str, Namespace] = {}
+_lock = threading.RLock()
+# Generates the versions of the entries; unique across all namespaces
+_versions = itertools.count(1)
+# Orders the writes to the disk tier, so that an older write never replaces a newer one
+_write_sequence = itertools.count(1)
+# Serialise the disk writes of each file, and the sequence number of the last write of each file
+_disk_locks: dict[str, threading.Lock] = {}
+_written_sequences: dict[str, int] = {}
+
+
+def register(
+    name: str, ttl: float = None, max_entries: int = 64, persistent: bool = True
+) -> Namespace:
+    """Creates a cache namespace, or returns the existing one with that name.
+
+    Arguments:
+        name -- the name of the namespace, also used as the prefix of the cache filenames.
+        ttl -- the number of seconds after which entries expire. Never expire if None.
+        max_entries -- the maximum number of entries kept in memory.
+        persistent -- if True, the entries are also written to and read from the disk.
+    """
+    with _lock:
+        if name not in _namespaces:
+            _namespaces[name] = Namespace(name, ttl, max_entries, persistent)
+        return _namespaces[name]
+
+
+def _store_in_memory(namespace: Namespace, key: any, entry: CacheEntry) -> None:
+    """Adds the entry to the memory tier, evicting the least recently used entries if needed."""
+    namespace.entries[key] = entry
+    namespace.entries.move_to_end(key)
+    while len(namespace.entries) > namespace.max_entries:
+        namespace.entries.popitem(last=False)
+        namespace.statistics["evictions"] += 1
+
+
+def _read_from_disk(namespace: Namespace, key: any) -> CacheEntry or None:
+    """Reads the entry from the disk tier. Returns None if it doesn't exist or is invalid."""
+    filename = namespace.get_filename(key)
+    try:
+        timestamp = os.path.getmtime(filename)
+        with open(filename, "r", encoding="UTF-8") as file:
+            data = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not data:
+        return None
+    return CacheEntry(data, timestamp)
+
+
+def _write_to_disk(namespace: Namespace, key: any, data: any, sequence: int) -> None:
+    """Serialises the data and writes it to the disk tier.
+
+    The file is replaced atomically, so a concurrent read never sees a partially written file.
+    The writes of each file are serialised, and a write is skipped if one with a later sequence
+    number, i.e. of newer data, has already been made, so the file is never older than the memory.
+    """
+    filename = namespace.get_filename(key)
+    with _lock:
+        disk_lock = _disk_locks.setdefault(filename, threading.Lock())
+    with disk_lock:
+        if _written_sequences.get(filename, 0) > sequence:
+            return
+        os.makedirs(file_manager.CACHE_DIRECTORY, exist_ok=True)
+        temporary_filename = filename + ".tmp"
+        with open(temporary_filename, "w", encoding="UTF-8") as file:
+            json.dump(data, file, indent=2, ensure_ascii=False)
+        os.replace(temporary_filename, filename)
+        _written_sequences[filename] = sequence
+
+
+def get_entry(namespace_name: str, key: any = None) -> CacheEntry or None:
+    """Returns the unexpired cache entry from memory, or from the disk if it's not in memory.
+
+    Returns None if the entry is not cached or has expired.
+    """
+    with _lock:
+        namespace = _namespaces[namespace_name]
+        entry = namespace.entries.get(key)
+        if entry is not None:
+            if not namespace.is_expired(entry):
+                namespace.entries.move_to_end(key)
+                namespace.statistics["memory_hits"] += 1
+                return entry
+            del namespace.entries[key]
+            namespace.statistics["expirations"] += 1
+        if not namespace.persistent:
+            namespace.statistics["misses"] += 1
+            return None
+    # Read without holding the lock, so that the other cache lookups don't wait for the disk
+    entry = _read_from_disk(namespace, key)
+    with _lock:
+        stored_entry = namespace.entries.get(key)
+        if stored_entry is not None and not namespace.is_expired(stored_entry):
+            # Stored by a concurrent `put` while the file was read, so it's at least as new
+            namespace.statistics["memory_hits"] += 1
+            return stored_entry
+        if entry is None or namespace.is_expired(entry):
+            namespace.statistics["misses"] += 1
+            return None
+        namespace.statistics["disk_hits"] += 1
+        _store_in_memory(namespace, key, entry)
+        return entry
+
+
+def get(namespace_name: str, key: any = None, default: any = None) -> any:
+    """Returns the cached data, or the default value if it's not cached or has expired."""
+    entry = get_entry(namespace_name, key)
+    return default if entry is None else entry.data
+
+
+def get_version(namespace_name: str, key: any = None) -> int or None:
+    """Returns the version of the entry in the memory tier, or None if it's not in memory.
+
+    The version only changes when different data is stored, so it can be compared instead of the
+    data itself. Read it before the data, so that a concurrent update can't pair a newer version
+    with older data.
+    """
+    with _lock:
+        entry = _namespaces[namespace_name].entries.get(key)
+        return None if entry is None else entry.version
+
+
+def put(namespace_name: str, key: any, data: any) -> CacheEntry:
+    """Stores the data in the cache under the given key and returns the new entry."""
+    with _lock:
+        namespace = _namespaces[namespace_name]
+        previous = namespace.entries.get(key)
+        # Keep the version if the data is unchanged, so that anything derived from it stays valid
+        unchanged = previous is not None and previous.data == data
+        entry = CacheEntry(data, time.time(), previous.version if unchanged else None)
+        _store_in_memory(namespace, key, entry)
+        sequence = next(_write_sequence)
+    # Written without holding the lock, so that the other cache lookups don't wait for the disk
+    if namespace.persistent:
+        _write_to_disk(namespace, key, data, sequence)
+    return entry
+
+
+def get_or_fetch(
+    namespace_name: str, key: any, fetch, force_update: bool = False
+) -> tuple[any, any]:
+    """Returns the cached data, calling the fetch function to update it if it's missing.
+
+    Arguments:
+        namespace_name -- the name of the namespace containing the data.
+        key -- the key identifying the data within the namespace.
+        fetch -- a function taking no arguments that returns the new data.
+        force_update -- if True, the data is fetched even if it's cached.
+
+    Returns a tuple consisting of the data and the old data (an empty dict if it wasn't cached).
+    If the data did not need to be fetched, both elements are the cached data.
+    """
+    entry = get_entry(namespace_name, key)
+    if entry is not None and not force_update:
+        return entry.data, entry.data
+    old_data = {} if entry is None else entry.data
+    # Fetch without holding the lock, so that other namespaces aren't blocked
+    data = fetch()
+    put(namespace_name, key, data)
+    return data, old_data
+
+
+def invalidate(namespace_name: str, key: any = None) -> None:
+    """Removes the entry from the memory tier, so that it's read from the disk again."""
+    with _lock:
+        _namespaces[namespace_name].entries.pop(key, None)
+
+
+def get_statistics() -> dict[str, dict[str, int]]:
+    """Returns the statistics and the number of entries in memory for each namespace."""
+    with _lock:
+        return {
+            name: {**namespace.statistics, "entries": len(namespace.entries)}
+            for name, namespace in _namespaces.items()
+        }
@@ -0,0 +1,64 @@
+"""The base URLs of the web services that the API modules make requests to.
+
+Each service's base URL can be overridden using the environment variable `<SERVICE>_BASE_URL`
+(e.g. `SCHOOL_BASE_URL`), or all of them at once using `API_BASE_URL`, such as to point the bot
+at the local fixture server in `benchmarks.fixture_server`. The environment is read on each
+request, so the overrides also apply if they are set after the modules are imported.
+"""
+
+# Standard library imports
+import os
+
+
+# The public base URLs of the services. These are also used in the links shown to the users.
+DEFAULT_BASE_URLS: dict[str, str] = {
+    # The school website, which hosts the lesson plans and the substitutions
+    "school": "http://www.lo1.gliwice.pl",
+    # The student council (SU ILO) API, which provides the lucky numbers
+    "suilo": "https://europe-west1-suilo-page.cloudfunctions.net",
+    # The Steam Community Market API
+    "steam": "https://steamcommunity.com",
+}
+# The environment variable that overrides the base URL of every service
+GLOBAL_OVERRIDE_VARIABLE = "API_BASE_URL"
+
+_overrides: dict[str, str] = {}
+
+
+def get_base_url(service: str) -> str:
+    """Returns the base URL of the service, without a trailing slash.
+
+    The base URL set using `set_base_url` takes precedence, followed by the service's environment
+    variable, then the global environment variable and finally the default base URL.
+    """
+    base_url = (
+        _overrides.get(service)
+        or os.environ.get(f"{service.upper()}_BASE_URL")
+        or os.environ.get(GLOBAL_OVERRIDE_VARIABLE)
+        or DEFAULT_BASE_URLS[service]
+    )
+    return base_url.rstrip("/")
+
+
+def get_url(service: str, path: str) -> str:
+    """Returns the URL of the resource with the given path, which should start with a slash."""
+    return get_base_url(service) + path
+
+
+def get_public_url(service: str, path: str) -> str:
+    """Returns the URL of the resource on the public service, ignoring any overrides."""
+    return DEFAULT_BASE_URLS[service] + path
+
+
+def set_base_url(base_url: str or None, *services: str) -> None:
+    """Overrides the base URL of the given services, or of all services if none are given.
+
+    Arguments:
+        base_url -- the new base URL, or None to remove the override.
+        services -- the names of the services, e.g. 'school'.
+    """
+    for service in services or DEFAULT_BASE_URLS:
+        if base_url is None:
+            _overrides.pop(service, None)
+        else:
+            _overrides[service] = base_url
@@ -5,11 +5,11 @@ import json
 import re
 
 # Third-party imports
-from corny_commons import file_manager
 from corny_commons.util import web
 
 # Local application imports
-from modules import Colour
+from modules import Colour, log_writer, metrics
+from modules.api import cache, endpoints, single_flight, snapshots
 from modules.util import OUR_CLASS
 
 PERIOD_PATTERN = re.compile(r"^<td class=\"nr\">(\d\d?)</td>$")
@@ -23,7 +23,15 @@ LESSON_PATTERN = re.compile(LESSON_PATTERN)
 
 # Tags that should not increment or decrement a line's tag depth
 IGNORED_TAGS = ["hr", "br"]
-SOURCE_URL = "http://www.lo1.gliwice.pl/wp-content/uploads/static/plan/plany/o{id}.html"
+SOURCE_PATH = "/wp-content/uploads/static/plan/plany/o{id}.html"
+SOURCE_URL = endpoints.get_public_url("school", SOURCE_PATH)
+
+# The lesson plans are refreshed by the snapshots, so they don't expire on their own
+cache.register("plan", max_entries=17)
+# The age in seconds after which a lesson plan is refreshed in the background
+REFRESH_AFTER = 24 * 60 * 60
+# The age in seconds after which the command waits for the lesson plan to be refreshed
+MAX_STALENESS = 7 * 24 * 60 * 60
 
 # Until the end of school year 2022-2023, classes ABC are non-IB and classes DE are IB.
 # Change this in sept 2023 when there are 4 non-IB classes and classes EF are IB.
@@ -265,14 +273,38 @@ def get_lesson_plan(
 
     def update_cache_callback() -> dict:
         ignore_limit: bool = force_update or force_update is None
-        plan_link: str = get_plan_link(plan_id)
-        html: str = web.get_html(plan_link, ignore_request_limit=ignore_limit)
+        plan_link: str = endpoints.get_url("school", SOURCE_PATH.format(id=plan_id))
+        with metrics.api_call("lesson_plan"):
+            html: str = web.get_html(plan_link, ignore_request_limit=ignore_limit)
         return parse_html(html)
 
     log_msg = f"Getting lesson plan with ID {plan_id} for class '{class_id}' ({force_update=}) ..."
     _log(log_msg)
-    return file_manager.get_cache(
-        f"plan_{plan_id}", force_update, update_cache_callback
+    # Concurrent requests for the same lesson plan share a single fetch
+    return single_flight.flights.call(
+        ("plan", plan_id, force_update),
+        cache.get_or_fetch,
+        "plan",
+        plan_id,
+        update_cache_callback,
+        bool(force_update),
+    )
+
+
+def get_lesson_plan_snapshot(class_id=OUR_CLASS) -> snapshots.Snapshot:
+    """Gets the last fetched lesson plan for a given class, refreshing it in the background if it
+    is stale. Waits for it to be fetched if there is none or it is older than `MAX_STALENESS` seconds.
+
+    Arguments:
+        `class_id` -- the lesson plan ID integer, or a string representing the name of the class.
+    """
+    plan_id = get_plan_id(class_id)
+    return snapshots.get_snapshot(
+        "plan",
+        plan_id,
+        lambda: get_lesson_plan(plan_id, force_update=True),
+        REFRESH_AFTER,
+        MAX_STALENESS,
     )
 
 
@@ -288,7 +320,7 @@ def _log(*args):
     if __name__ == "__main__":
         print(*args)
         return
-    file_manager.log(*args, filename="bot")
+    log_writer.log(*args, filename="bot")
 
 
 if __name__ == "__main__":
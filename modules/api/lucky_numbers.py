@@ -7,6 +7,10 @@ import json
 # Third-party imports
 from corny_commons.util import web
 
+# Local application imports
+from modules import metrics
+from modules.api import cache, endpoints, single_flight
+
 # Data JSON structure:
 # {
 #     "date": "dd/mm/YYYY",
@@ -14,27 +18,40 @@ from corny_commons.util import web
 #     "excludedClasses": ["X", "Y"]
 # }
 
-cached_data: dict[str, date or list[int or str]] = {}
+# The lucky numbers are saved in the data file, so they are only cached in memory. They expire
+# according to the date they are for rather than when they were fetched.
+cache.register("lucky_numbers", max_entries=1, persistent=False)
 
 MAX_CACHE_AGE = 1  # Days
-SOURCE_URL = "https://europe-west1-suilo-page.cloudfunctions.net/app/api/luckyNumbers/v2"
+SOURCE_PATH = "/app/api/luckyNumbers/v2"
+
+
+def get_cached_data() -> dict[str, date or list[int or str]]:
+    """Returns the cached lucky numbers data, or an empty dictionary if there is none."""
+    return cache.get("lucky_numbers", default={})
+
+
+def set_cached_data(data: dict[str, date or list[int or str]]) -> None:
+    """Replaces the cached lucky numbers data, e.g. with the data read from the data file."""
+    cache.put("lucky_numbers", None, data)
 
 
+@single_flight.coalesced("lucky_numbers")
 def get_lucky_numbers() -> dict[str, str or list[int or str]]:
     """Updates the cache if it is outdated then returns it."""
     current_date: date = date.today()
     try:
-        last_cache_date: date = cached_data["date"]
+        last_cache_date: date = get_cached_data()["date"]
         if (current_date - last_cache_date).days > MAX_CACHE_AGE:
             raise ValueError()
-    except (KeyError, ValueError):
+    except (KeyError, TypeError, ValueError):
         # If the cache is empty or too old
         try:
             update_cache()
         except web.InvalidResponseException:
             # Do not update the cache if new data could not be fetched
             pass
-    return cached_data
+    return get_cached_data()
 
 
 def update_cache() -> dict[str, str or list[int or str]]:
@@ -42,14 +59,16 @@ def update_cache() -> dict[str, str or list[int or str]]:
 
     Returns the old cache so that it can be compared with the new one.
     """
-    old_cache = dict(cached_data or {})
-    cached_data.clear()
-    res = web.make_request(SOURCE_URL, ignore_request_limit=True)
-    cached_data.update(res.json())
+    old_cache = dict(get_cached_data())
+    with metrics.api_call("lucky_numbers"):
+        url = endpoints.get_url("suilo", SOURCE_PATH)
+        res = web.make_request(url, ignore_request_limit=True)
+    data = res.json()
     # If the date string is present in the dictionary, convert it into a date object.
-    if cached_data["date"]:
-        data_timestamp = datetime.strptime(cached_data["date"], "%Y-%m-%d")
-        cached_data["date"] = data_timestamp.date()
+    if data["date"]:
+        data_timestamp = datetime.strptime(data["date"], "%Y-%m-%d")
+        data["date"] = data_timestamp.date()
+    set_cached_data(data)
     return old_cache
 
 
@@ -63,7 +82,7 @@ def serialise(data: dict = None, pretty: bool = False) -> dict or str:
     A dictionary with all values stringified using the str function, or the pretty-printed form of
     that dictionary.
     """
-    temp: dict = dict(data or cached_data or {})
+    temp: dict = dict(data or get_cached_data())
     for key, value in temp.items():
         try:
             json.dumps(value)
@@ -0,0 +1,107 @@
+"""Request coalescing for the web API functions.
+
+When several identical requests are made concurrently (e.g. many users running the same command
+within seconds of each other), only the first one performs the fetch. The others wait for it to
+finish and receive the same result, or the same exception.
+"""
+
+# Standard library imports
+import functools
+import threading
+
+
+class _Flight:
+    """A single in-flight call, shared by all callers with the same key."""
+
+    __slots__ = ("done", "result", "exception")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: any = None
+        self.exception: BaseException = None
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with identical keys into a single execution.
+
+    Attributes:
+        requests -- the number of calls made in each namespace.
+        executions -- the number of calls in each namespace that actually executed the function.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[tuple, _Flight] = {}
+        self.requests: dict[str, int] = {}
+        self.executions: dict[str, int] = {}
+
+    def call(self, key: tuple, function, *args, share=None, **kwargs) -> any:
+        """Calls the function, or waits for an identical call that is already in progress.
+
+        Arguments:
+            key -- a hashable tuple identifying the call. The first element is the namespace
+            under which the call is counted in the statistics.
+            function -- the function to call. The remaining arguments are passed to it.
+            share -- an optional function applied to the result before it is returned to the
+            callers that waited for the call instead of executing it.
+
+        Returns the result of the function. Raises the exception raised by the function, if any.
+        """
+        namespace = key[0]
+        with self._lock:
+            self.requests[namespace] = self.requests.get(namespace, 0) + 1
+            flight = self._flights.get(key)
+            is_leader = flight is None
+            if is_leader:
+                flight = self._flights[key] = _Flight()
+                self.executions[namespace] = self.executions.get(namespace, 0) + 1
+        if not is_leader:
+            flight.done.wait()
+            if flight.exception is not None:
+                raise flight.exception
+            return flight.result if share is None else share(flight.result)
+        try:
+            flight.result = function(*args, **kwargs)
+        except BaseException as exc:
+            flight.exception = exc
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def get_statistics(self) -> dict[str, dict[str, int]]:
+        """Returns the number of requests, executions and coalesced calls for each namespace."""
+        with self._lock:
+            return {
+                namespace: {
+                    "requests": requests,
+                    "executions": self.executions.get(namespace, 0),
+                    "coalesced": requests - self.executions.get(namespace, 0),
+                }
+                for namespace, requests in self.requests.items()
+            }
+
+
+# The instance shared by all of the API modules
+flights = SingleFlight()
+
+
+def coalesced(namespace: str):
+    """Decorator that coalesces concurrent calls of the function with identical arguments."""
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            key = (namespace, args, tuple(sorted(kwargs.items())))
+            return flights.call(key, function, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_statistics() -> dict[str, dict[str, int]]:
+    """Returns the coalescing statistics of the shared instance."""
+    return flights.get_statistics()
@@ -0,0 +1,159 @@
+"""Stale-while-revalidate access to the cached web API data.
+
+Commands that display scraped data answer instantly from the last good snapshot, while a
+background thread fetches a fresh copy. Only if the snapshot is missing or older than the maximum
+staleness does the caller block until the data is fetched.
+
+The caller that receives a snapshot served from the cache can't tell if the background refresh
+changed the data, so the data from before the change is kept until it's reported, either to the
+next caller that waits for a fetch or through `pop_unreported_old_data`, e.g. by a periodic check.
+"""
+
+# Standard library imports
+import threading
+import time
+
+# Third-party imports
+from corny_commons import util as ccutil
+
+# Local application imports
+from modules import bot
+from modules.api import cache, single_flight
+
+
+class Snapshot:
+    """The last successfully fetched version of some data.
+
+    Attributes:
+        data -- the data itself.
+        old_data -- the version of the data before it was last fetched.
+        timestamp -- the UNIX timestamp of when the data was fetched.
+        version -- the cache version of the data, or an older one. See `cache.get_version`.
+    """
+
+    __slots__ = ("data", "old_data", "timestamp", "version")
+
+    def __init__(self, data: dict, old_data: dict, timestamp: float, version: int = None) -> None:
+        self.data: dict = data
+        self.old_data: dict = old_data
+        self.timestamp: float = timestamp
+        self.version: int = version
+
+    @property
+    def age(self) -> float:
+        """The number of seconds since the data was fetched."""
+        return time.time() - self.timestamp
+
+    def format_age(self) -> str:
+        """Returns the age of the snapshot in a user-friendly format, in Polish."""
+        minutes = int(self.age // 60)
+        if minutes < 1:
+            return "przed chwilą"
+        if minutes < 60:
+            return f"{minutes} min temu"
+        hours = minutes // 60
+        if hours < 24:
+            return f"{hours} godz. temu"
+        return f"{hours // 24} dn. temu"
+
+
+# The cache entries that are currently being refreshed in the background
+_refreshing: set[tuple] = set()
+# The number of background refreshes started and failed for each namespace
+_statistics: dict[str, dict[str, int]] = {}
+# The data from before the changes found by the background refreshes that haven't been reported
+_unreported_old_data: dict[tuple, dict] = {}
+_lock = threading.Lock()
+
+
+def _fetch(namespace: str, key: any, fetch) -> Snapshot:
+    """Fetches the data and returns a snapshot containing it and the old data."""
+    # The version is read first, so at worst the new data is paired with the previous version
+    version = cache.get_version(namespace, key)
+    data, old_data = fetch()
+    # Report any change made by a background refresh along with this one
+    unreported_old_data = pop_unreported_old_data(namespace, key)
+    if unreported_old_data is not None:
+        old_data = unreported_old_data
+    return Snapshot(data, old_data, time.time(), version)
+
+
+def _refresh_in_background(namespace: str, key: any, fetch) -> None:
+    """Fetches the data in a background thread. Does nothing if a refresh is already running."""
+    with _lock:
+        if (namespace, key) in _refreshing:
+            return
+        _refreshing.add((namespace, key))
+        stats = _statistics.setdefault(namespace, {"refreshes": 0, "failures": 0})
+        stats["refreshes"] += 1
+
+    def refresh() -> None:
+        try:
+            data, old_data = fetch()
+        except Exception as exception:  # pylint: disable=broad-except
+            # Keep serving the last good snapshot; the next request will try again
+            with _lock:
+                _statistics[namespace]["failures"] += 1
+            fmt_exc = ccutil.format_exception_info(exception)
+            bot.send_log(f"Background refresh of '{namespace}' failed:\n{fmt_exc}", force=True)
+        else:
+            if data != old_data:
+                with _lock:
+                    # If several changes weren't reported, the earliest old data is kept
+                    _unreported_old_data.setdefault((namespace, key), old_data)
+        finally:
+            with _lock:
+                _refreshing.discard((namespace, key))
+
+    threading.Thread(target=refresh, name=f"refresh-{namespace}", daemon=True).start()
+
+
+def pop_unreported_old_data(namespace: str, key: any) -> dict or None:
+    """Returns the data from before the background refreshes changed it, if they did.
+
+    The change is only returned once, so that it's only reported once. Returns None if the data
+    wasn't changed by a background refresh since it was last reported.
+    """
+    with _lock:
+        return _unreported_old_data.pop((namespace, key), None)
+
+
+def get_statistics() -> dict[str, dict[str, int]]:
+    """Returns the number of background refreshes started and failed for each namespace."""
+    with _lock:
+        return {namespace: dict(stats) for namespace, stats in _statistics.items()}
+
+
+def get_snapshot(
+    namespace: str, key: any, fetch, refresh_after: float, max_staleness: float
+) -> Snapshot:
+    """Returns the snapshot of the cached data, refreshing it if necessary.
+
+    Arguments:
+        namespace -- the cache namespace containing the data.
+        key -- the key of the data within the namespace.
+        fetch -- a function that fetches the data, stores it in the cache and returns a tuple of the
+        new and the old data.
+        refresh_after -- the age in seconds after which the snapshot is refreshed in the background.
+        max_staleness -- the age in seconds after which the caller waits for the refresh instead.
+
+    Only the caller that waited for the data to be fetched receives the old data, so that a change
+    in the data is only reported once.
+    Raises any exception raised by the fetch function, but only if the caller had to wait for it.
+    """
+    entry = cache.get_entry(namespace, key)
+    if entry is None or entry.age > max_staleness:
+        # Concurrent callers share a single blocking fetch
+        return single_flight.flights.call(
+            ("snapshot", namespace, key),
+            _fetch,
+            namespace,
+            key,
+            fetch,
+            share=lambda result: Snapshot(
+                result.data, result.data, result.timestamp, result.version
+            ),
+        )
+    if entry.age > refresh_after:
+        _refresh_in_background(namespace, key, fetch)
+    return Snapshot(entry.data, entry.data, entry.timestamp, entry.version)
@@ -8,7 +8,8 @@ from urllib import parse
 from corny_commons.util import web
 
 # Local application imports
-from modules import bot
+from modules import bot, metrics
+from modules.api import cache, endpoints
 
 
 CURRENCY_IDS = [
@@ -46,17 +47,14 @@ CURRENCY_IDS = [
     "AED",  # Emirati Dirham
 ]
 
+# The responses are keyed by the request URL, so they are only cached in memory
+cache.register("steam", ttl=5 * 60, max_entries=256, persistent=False)
+
 COULD_NOT_FIND_PRICE_MSG = "Could not find item's lowest price. Check if this is true:"
 
-SOURCE_URL_A = (
-    "https://www.steamcommunity.com/market/priceoverview/"
-    "?appid={}&currency={}&market_hash_name="
-)
+SOURCE_PATH_A = "/market/priceoverview/?appid={}&currency={}&market_hash_name="
 
-SOURCE_URL_B = (
-    "https://steamcommunity.com/market/search/render/"
-    "?norender=1&start={}&count={}&query="
-)
+SOURCE_PATH_B = "/market/search/render/?norender=1&start={}&count={}&query="
 
 
 def get_currency_id(currency: str):
@@ -88,23 +86,27 @@ class NoSuchItemException(web.WebException):
 
 def _make_api_request(url_template, raw_query: str, force: bool) -> dict[str, any]:
     """Makes a query on the Steam API searching for market items with the given name.
+    Responses are cached for a few minutes, unless `force` is set.
 
     Returns a dictionary containing the JSON response.
     Raises NoSuchItemException if the item was not found.
     """
     query_encoded = parse.quote(raw_query)
-    try:
-        result = web.make_request(
-            url_template + query_encoded, ignore_request_limit=force
-        ).json()
-    except web.InvalidResponseException as not_found_exc:
-        raise NoSuchItemException(raw_query) from not_found_exc
-    else:
+    url = url_template + query_encoded
+
+    def fetch() -> dict[str, any]:
+        try:
+            with metrics.api_call("steam_market"):
+                result = web.make_request(url, ignore_request_limit=force).json()
+        except web.InvalidResponseException as not_found_exc:
+            raise NoSuchItemException(raw_query) from not_found_exc
         if not result.get("success"):
             raise NoSuchItemException(raw_query)
         result["query_encoded"] = query_encoded
         return result
 
+    return cache.get_or_fetch("steam", url, fetch, force)[0]
+
 
 def get_item(
     raw_query: str, app_id: int = 730, currency: str = "PLN", force: bool = False
@@ -132,7 +134,7 @@ def get_item(
     Raises NoSuchItemException if the item was not found.
     """
     currency_id = get_currency_id(currency)
-    url_template = SOURCE_URL_A.format(app_id, currency_id)
+    url_template = endpoints.get_url("steam", SOURCE_PATH_A.format(app_id, currency_id))
     return _make_api_request(url_template, raw_query, force)
 
 
@@ -148,7 +150,7 @@ def search_item(raw_query: str, force: bool = False) -> dict[str, any]:
     """
     start_index = 0
     max_results = 10
-    url_template = SOURCE_URL_B.format(start_index, max_results)
+    url_template = endpoints.get_url("steam", SOURCE_PATH_B.format(start_index, max_results))
     return _make_api_request(url_template, raw_query, force)
 
 
@@ -6,15 +6,14 @@ details.
 import json
 import re
 import datetime
-from sqlite3 import IntegrityError
 
 # Third-party imports
-import lxml.html
-from corny_commons import file_manager, util as ccutil
+from corny_commons import util as ccutil
 from corny_commons.util import web
 
 # Local application imports
-from modules import WEEKDAY_NAMES, Colour, util
+from modules import WEEKDAY_NAMES, Colour, log_writer, metrics, util
+from modules.api import cache, endpoints, single_flight, snapshots
 from modules.api.lesson_plan import get_lesson_plan
 
 
@@ -28,7 +27,27 @@ TEACHER_PATTERN = re.compile(
 )
 TEACHERS_PATTERN = re.compile(r"(?<=p. )[^\s,]+")
 
-SOURCE_URL = "http://www.lo1.gliwice.pl/zastepstwa-2/"
+SOURCE_PATH = "/zastepstwa-2/"
+SOURCE_URL = endpoints.get_public_url("school", SOURCE_PATH)
+
+# The substitutions are refreshed by the snapshots and the update loop, so they don't expire
+cache.register("subs", max_entries=1)
+# The age in seconds after which the substitutions are refreshed in the background
+REFRESH_AFTER = 10 * 60
+# The age in seconds after which the command waits for the substitutions to be refreshed
+MAX_STALENESS = 12 * 60 * 60
+
+
+class SubstitutionsParseError(Exception):
+    """Raised when the substitutions page could not be parsed.
+
+    Attributes:
+        trace -- the formatted exception raised by the parser.
+    """
+
+    def __init__(self, trace: str):
+        self.trace = trace
+        super().__init__("Substitutions data could not be parsed.")
 
 
 def get_int_ranges_from_string(lessons_string: str) -> list[int]:
@@ -74,7 +93,7 @@ def extract_from_table(elem, table: dict[str, any]) -> None:
             column_data[j].append(cell_text)
 
 
-def get_substituted_lessons(class_name: str, weekday: int, period: IntegrityError):
+def get_substituted_lessons(class_name: str, weekday: int, period: int):
     """Checks the lesson plan for the lessons that would normally have taken place."""
     class_id: str = util.format_class(class_name, reverse=True)
     try:
@@ -113,14 +132,14 @@ def extract_substitutions_text(elem_text: str, subs_data: dict) -> None:
         # The date is usually the first element in the page contents
         # This would mean that for some reason it's not included on the substitutions page
         # (which hasn't happened yet)
-        file_manager.log(
-            "No date provided in substitutions data. Defaulting to Monday."
+        log_writer.log(
+            "No date provided in substitutions data. Defaulting to Monday.", filename="bot"
         )
         weekday_int: int = 0
 
     match = SUB_INFO_PATTERN.match(info)
     if match is None:
-        file_manager.log("Could not find a lesson entry match for", info)
+        log_writer.log("Could not find a lesson entry match for", info, filename="bot")
         return
     class_year, classes, class_info, details = match.groups()
 
@@ -187,6 +206,9 @@ def parse_html(html: str) -> dict:
 
     Returns a dictionary containing the extracted data.
     """
+    # lxml is only imported once the substitutions are first parsed, as it's slow to import
+    import lxml.html  # pylint: disable=import-outside-toplevel
+
     root: lxml.html.Element = lxml.html.fromstring(html)
     post_xpath: str = "//div[@id='content']/div"
     try:
@@ -297,6 +319,9 @@ def parse_html_new(html: str) -> dict:
 
     Returns a dictionary containing the extracted data.
     """
+    # lxml is only imported once the substitutions are first parsed, as it's slow to import
+    import lxml.html  # pylint: disable=import-outside-toplevel
+
     root: lxml.html.Element = lxml.html.fromstring(html)
     post_xpath: str = "//div[@id='content']/div"
     try:
@@ -341,10 +366,33 @@ def get_substitutions(force_update: bool = False) -> tuple[dict, dict]:
     """
 
     def update_cache_callback() -> dict:
-        html: str = web.get_html(SOURCE_URL, ignore_request_limit=force_update)
+        with metrics.api_call("substitutions"):
+            url = endpoints.get_url("school", SOURCE_PATH)
+            html: str = web.get_html(url, ignore_request_limit=force_update)
         return parse_html_new(html)
 
-    return file_manager.get_cache("subs", force_update, update_cache_callback)
+    # Concurrent requests share a single fetch. Only the caller that made the request receives the
+    # old data, so that a change in the substitutions is only reported once.
+    return single_flight.flights.call(
+        ("subs", force_update),
+        cache.get_or_fetch,
+        "subs",
+        None,
+        update_cache_callback,
+        force_update,
+        share=lambda result: (result[0], result[0]),
+    )
+
+
+def get_substitutions_snapshot() -> snapshots.Snapshot:
+    """Gets the last fetched substitutions, refreshing them in the background if they are stale.
+
+    Waits for the substitutions to be fetched if there are none or they are older than
+    `MAX_STALENESS` seconds.
+    """
+    return snapshots.get_snapshot(
+        "subs", None, lambda: get_substitutions(force_update=True), REFRESH_AFTER, MAX_STALENESS
+    )
 
 
 if __name__ == "__main__":
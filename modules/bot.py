@@ -3,24 +3,28 @@
 # Standard library imports
 import asyncio
 import datetime
+import gzip
+import io
 import json
+import re
+import time
 from aiohttp import ClientConnectionError
 
 # Third-party imports
 import discord
-from discord.ext.tasks import loop
-from corny_commons import file_manager, util as ccutil
+from corny_commons import util as ccutil
 from corny_commons.util import web
 
 # Local application imports
-from modules import Month, data_manager, commands, util, api
-from modules import Emoji, Weekday, ROLE_CODES
+from modules import Month, data_manager, commands, util, api, metrics, periodic, startup, watchdog
+from modules import Emoji, Weekday, log_writer
 from modules.commands import (
     get_help,
     homework,
     steam_market,
     lucky_numbers,
     substitutions,
+    router,
 )
 
 
@@ -32,6 +36,15 @@ UPDATE_NUMBERS_EVERY = 20  # Seconds; i.e. only check 3 times a minute
 
 # Sets the maximum length of a message that can be sent without causing errors with the Discord API.
 MAX_MESSAGE_LENGTH = 4000  # Characters
+# The limits imposed by Discord on the contents of a single message
+MAX_MESSAGE_CONTENT_LENGTH = 2000  # Characters
+MAX_EMBED_LENGTH = 6000  # Characters
+MAX_EMBED_DESCRIPTION_LENGTH = 4096  # Characters
+MAX_EMBED_FIELDS = 25
+MAX_EMBED_FIELD_NAME_LENGTH = 256  # Characters
+MAX_EMBED_FIELD_VALUE_LENGTH = 1024  # Characters
+# Attachments larger than this are sent gzip-compressed.
+COMPRESS_ATTACHMENTS_ABOVE = 1024 * 1024  # Bytes
 
 MY_SERVER_ID: int = 766346477874053130
 
@@ -45,7 +58,7 @@ STATUS_LOG_TEMPLATE = (
 )
 INVALID_NUMBERS_TEMPLATE = (
     "Invalid lucky numbers message embed. "
-    "Run `{}exec bot.api.lucky_numbers.cached_data`."
+    "Run `{}exec bot.api.lucky_numbers.get_cached_data()`."
 )
 RESTARTED_BOT_MSG = "Restarted bot!"
 MESSAGE_SEND_FAIL_MSG = (
@@ -58,12 +71,17 @@ SUBSTITUTIONS_TOO_LONG_MSG = (
     "aby je móc wysłać w formie wiadomości Rich Text. Załączam je jako plik JSON."
 )
 STATUS_UPDATE_UNNECESSARY_MSG = "The status message does not need updating."
+PERMISSIONS_ERROR_TEMPLATE = f"{Emoji.WARNING} Nie posiadasz uprawnień do {{}}."
 
 HOMEWORK_EMOJI = Emoji.UNICODE_CHECK, Emoji.UNICODE_ALARM_CLOCK
+# Discord messages can have up to 5 rows of buttons; each row holds the buttons of 2 events.
+MAX_DIGEST_EVENTS = 10
 
 # If a message starts with any of the below keys, the bot will reply appropriately.
 # noinspection SpellCheckingInspection
 AUTOMATIC_BOT_REPLIES = {MY_SERVER_ID: {"co jest?": "nie wjem"}}
+# Messages must be at least this long to trigger an automatic reply.
+MIN_AUTO_REPLY_LENGTH = 3
 
 DAYS_IN_WEEKEND = len([Weekday.SATURDAY, Weekday.SUNDAY])
 
@@ -123,6 +141,13 @@ restart_on_exit: bool = True
 # If this is set, it will override most output channels to be the channel with the given ID.
 testing_channel: int = None
 
+# The event loop that the client runs on, set once it's ready. Used to send the log messages
+# logged from other threads, e.g. by the threaded commands and the web requests they make.
+client_loop: asyncio.AbstractEventLoop = None
+# The background refresh of the static data started by `on_ready`. A reference is kept so that the
+# task isn't garbage collected before it finishes.
+static_data_task: asyncio.Task = None
+
 
 def send_log(*raw_message, force: bool = False) -> None:
     """Determine if the message should actually be logged.
@@ -131,11 +156,25 @@ def send_log(*raw_message, force: bool = False) -> None:
     if not (VERBOSE_LOG_MESSAGES or force):
         return
 
-    msg = file_manager.log(*raw_message, filename="bot")
+    msg = log_writer.log(*raw_message, filename="bot")
     too_long_msg = f"Log message too long ({len(msg)} characters). Check 'bot' file."
     msg_to_log = msg if len(msg) <= MAX_MESSAGE_LENGTH else too_long_msg
 
-    log_loop = asyncio.get_event_loop()
+    try:
+        log_loop = asyncio.get_running_loop()
+    except RuntimeError:
+        log_loop = None
+    if log_loop is None and client_loop is not None and not client_loop.is_closed():
+        # Called from a worker thread; the message is sent by the client's event loop
+        asyncio.run_coroutine_threadsafe(send_log_message(msg_to_log), client_loop)
+        return
+    if log_loop is None:
+        try:
+            # Before the bot connects, the message is sent once the event loop is started
+            log_loop = asyncio.get_event_loop()
+        except RuntimeError:
+            # A thread without an event loop before the bot is ready; only the file is written
+            return
     log_loop.create_task(send_log_message(msg_to_log))
 
 
@@ -153,34 +192,34 @@ async def send_log_message(message) -> None:
     ) as log_exc:
         fmt_exc = ccutil.format_exception_info(log_exc)
         could_not_log_msg = f"Could not log message: '{message}'. Exception: {fmt_exc}"
-        file_manager.log(could_not_log_msg, filename="bot")
+        log_writer.log(could_not_log_msg, filename="bot")
 
 
 @client.event
 async def on_ready() -> None:
     """Initialise the bot when it comes online."""
+    global client_loop, static_data_task  # pylint: disable=global-statement
+    client_loop = asyncio.get_running_loop()
 
     # Redefine the 'web' module's internal 'send_log' function to enable Discord channel logging.
     web.send_log = send_log
 
+    startup.end_phase("connect")
     # Report information about logged in guilds
     guilds = {guild.id: guild.name for guild in client.guilds}
+    with startup.phase("group roles"):
+        for guild in client.guilds:
+            util.refresh_group_roles(guild)
     login_message = f"Successfully connected as {client.user}.\nActive guilds:"
     send_log(login_message, guilds, force=True)
 
-    # Initialise lesson plan forcefully; force_update switch bypasses checking for cache.
-    try:
-        plan = api.lesson_plan.get_lesson_plan_dp()
-    except web.InvalidResponseException as web_exc:
-        exc = ccutil.format_exception_info(web_exc)
-        send_log(f"{BAD_RESPONSE}{exc}", force=True)
+    if util.lesson_plan_dp:
+        # The warm-start snapshot was loaded; refresh it without delaying the start-up
+        static_data_task = asyncio.create_task(refresh_static_data(), name="refresh-static-data")
+        static_data_task.add_done_callback(log_task_failure)
     else:
-        send_log(f"Initialised lesson plan as {type(plan)}.")
-        util.lesson_plan_dp = plan
-
-    with open("teachers.json", "r", encoding="utf-8") as file:
-        data = json.load(file)
-        util.teacher_subjects = data
+        with startup.phase("static data"):
+            await refresh_static_data()
 
     # Intialise array of schooldays
     # schooldays = [key for key in plan if key in WEEKDAY_NAMES]
@@ -196,23 +235,161 @@ async def on_ready() -> None:
     # for lesson_name in sorted(lesson_names):
     #     util.get_lesson_link(lesson_name)
 
-    # Starts loops that run continuously
-    main_update_loop.start()
+    watchdog.start()
+    with startup.phase("metrics server"):
+        metrics_port = await metrics.start_http_server()
+    if metrics_port is not None:
+        send_log(f"Serving the metrics at http://127.0.0.1:{metrics_port}/metrics.", force=True)
+
+    # Starts the periodic tasks; on_ready is called again after reconnecting, so only do it once
+    if not periodic.is_running():
+        with startup.phase("periodic tasks"):
+            await prepare_periodic_tasks()
+            periodic.start_all()
+    if not startup.is_finished():
+        send_log(f"Start-up phases:\n{startup.finish()}", force=True)
+
+
+def log_task_failure(task: asyncio.Task) -> None:
+    """Done callback of the background tasks, which logs the exception the task raised, if any."""
+    if task.cancelled() or task.exception() is None:
+        return
+    fmt_exc = ccutil.format_exception_info(task.exception())
+    send_log(f"Background task '{task.get_name()}' failed:\n{fmt_exc}", force=True)
+
+
+async def refresh_static_data() -> None:
+    """Fetches the DP lesson plan and reads the teacher index, then updates the warm-start snapshot.
+
+    If the lesson plan can't be fetched or parsed, the error is logged and the lesson plan loaded
+    from the snapshot, if any, is kept, so that a failure doesn't abort the start-up.
+    """
+    try:
+        with open("teachers.json", "r", encoding="utf-8") as file:
+            util.teacher_subjects = json.load(file)
+        # The period times are scraped from a lesson plan, so this may make a web request
+        plan = await asyncio.to_thread(api.lesson_plan.get_lesson_plan_dp)
+        startup.apply_static_data(plan, util.teacher_subjects)
+        send_log(f"Initialised lesson plan as {type(plan)}.")
+        startup.save_warm_start()
+    except web.WebException as web_exc:
+        exc = ccutil.format_exception_info(web_exc)
+        send_log(f"{BAD_RESPONSE}{exc}", force=True)
+    except Exception as exc:  # pylint: disable=broad-except
+        fmt_exc = ccutil.format_exception_info(exc)
+        send_log(f"Could not refresh the static data:\n{fmt_exc}", force=True)
+
+
+def build_auto_reply_trie(replies: dict[str, str]) -> dict[str, any]:
+    """Builds a character trie of the lowercase automatic reply triggers.
+
+    Each node maps the next character to its child node, and stores the reply of the first
+    trigger that passes through it under the `None` key.
+    """
+    root: dict[str, any] = {}
+    for trigger, reply in replies.items():
+        node = root
+        for char in trigger.lower():
+            node = node.setdefault(char, {})
+            node.setdefault(None, reply)
+    return root
+
+
+def get_auto_reply(guild_id: int, content: str) -> str or None:
+    """Returns the automatic reply for a message whose content is the start of a trigger."""
+    if len(content) < MIN_AUTO_REPLY_LENGTH:
+        return None
+    node = AUTO_REPLY_TRIES.get(guild_id)
+    if node is None:
+        return None
+    for char in content:
+        node = node.get(char)
+        if node is None:
+            return None
+    return node.get(None)
+
+
+def compile_fast_path_pattern() -> None:
+    """Compiles the pattern matching the start of any message that the bot could respond to,
+    i.e. commands with the current prefix and the beginnings of automatic reply triggers.
+    """
+    global fast_path_pattern, fast_path_prefix  # pylint: disable=global-statement
+    starts = {re.escape(prefix)}
+    for replies in AUTOMATIC_BOT_REPLIES.values():
+        for trigger in replies:
+            starts.add(re.escape(trigger.lower()[:MIN_AUTO_REPLY_LENGTH]))
+    fast_path_pattern = re.compile("|".join(sorted(starts)))
+    fast_path_prefix = prefix
+
+
+AUTO_REPLY_TRIES = {
+    guild_id: build_auto_reply_trie(replies)
+    for guild_id, replies in AUTOMATIC_BOT_REPLIES.items()
+}
+fast_path_pattern: re.Pattern = None
+fast_path_prefix: str = None
+compile_fast_path_pattern()
+
+
+async def execute_command(
+    command_info: dict[str, any], message: discord.Message, command: router.ParsedCommand
+) -> discord.Message or None:
+    """Runs the command's handler and replies with its result, or with the error it raised.
+
+    Returns the reply message, or None if the handler didn't succeed or returned no reply.
+    """
+    try:
+        if command_info.get("threaded"):
+            # Commands that make web requests are run in a separate thread so that they don't
+            # block the event loop, which also lets concurrent identical requests be coalesced
+            reply = await asyncio.to_thread(command_info["function"], message, command)
+        else:
+            reply = command_info["function"](message, command)
+    except MissingPermissionsException as invalid_perms_exc:
+        await message.reply(PERMISSIONS_ERROR_TEMPLATE.format(invalid_perms_exc))
+        return None
+    except Exception as exc:  # pylint: disable=broad-except
+        await ping_owner()
+        send_log(ccutil.format_exception_info(exc), force=True)
+        await message.reply(
+            ":x: Nastąpił błąd przy wykonaniu tej komendy. "
+            "Administrator bota (Konrad) został o tym powiadomiony."
+        )
+        return None
+    if reply is None:
+        return None
+    # Handlers may return a view with message components alongside the reply
+    view = None
+    if isinstance(reply, tuple):
+        reply, view = reply
+    return await try_send_message(message.channel, reply, message.reply, view=view)
 
 
 # This function is called when someone sends a message in the server
 @client.event
 async def on_message(message: discord.Message) -> None:
     """Handle the commands sent by users."""
+    received_time = time.perf_counter()
+    # Fast path: reject the messages that are not commands, mentions or automatic reply triggers
+    # before doing any other work, since this is called for every message in the server.
+    if fast_path_prefix is not prefix:
+        # The prefix has been changed since the pattern was compiled
+        compile_fast_path_pattern()
+    mentioned = bool(message.mentions) and client.user in message.mentions
+    if not (mentioned or fast_path_pattern.match(message.content)):
+        return
+    if message.author == client.user:
+        return
     await client.wait_until_ready()
-    if client.user in message.mentions:
-        message.content = "!help " + message.content
-    for reply in AUTOMATIC_BOT_REPLIES.get(message.guild.id, {}):
-        if reply.lower().startswith(message.content) and len(message.content) >= 3:
-            await message.reply(AUTOMATIC_BOT_REPLIES[reply], mention_author=False)
-            return
+    if mentioned:
+        message.content = f"{prefix}help " + message.content
+    guild_id = message.guild.id if message.guild else None
+    auto_reply = get_auto_reply(guild_id, message.content)
+    if auto_reply is not None:
+        await message.reply(auto_reply, mention_author=False)
+        return
     author_role_names = [str(role) for role in message.author.roles]
-    if message.author == client.user or "Bot" in author_role_names:
+    if "Bot" in author_role_names:
         return
     if not message.content.startswith(prefix):
         return
@@ -226,37 +403,41 @@ async def on_message(message: discord.Message) -> None:
             f"odpowiedniej grupy.**\n"
             f"Możesz sobie tam też ustawić język, na który chodzisz oraz inne rangi."
         )
-    msg_first_word = message.content.lower().lstrip(prefix).split(" ")[0]
-
-    if msg_first_word not in get_help.INFO:
+    try:
+        command = router.parse_invocation(
+            message.content, prefix, get_help.ALIASES, get_help.INFO
+        )
+    except router.ArgumentError as invalid_args_exc:
+        if get_help.INFO[invalid_args_exc.command_name]["description"] is None:
+            # The hidden commands are restricted, so their usage is only shown to the owner
+            try:
+                commands.ensure_user_authorised(message, owner_only=True)
+            except MissingPermissionsException as invalid_perms_exc:
+                await message.reply(PERMISSIONS_ERROR_TEMPLATE.format(invalid_perms_exc))
+                return
+        usage = get_help.get_usage_message(invalid_args_exc.command_name)
+        await message.reply(f"{Emoji.WARNING} {invalid_args_exc.message}\n{usage}")
+        return
+    if command is None:
         return
 
     received_command_msg = f"Received command '{message.content}' from {message.author}"
     send_log(received_command_msg, force=True)
-    command_info = get_help.INFO[msg_first_word]
+    command_info = get_help.INFO[command.name]
 
     async def run_command():
+        # Name the task after the command so that it can be identified in the watchdog reports
+        asyncio.current_task().set_name(f"command:{command.name}")
         try:
-            reply = command_info["function"](message)
-        except MissingPermissionsException as invalid_perms_exc:
-            error_message = (
-                f"{Emoji.WARNING} Nie posiadasz uprawnień do {invalid_perms_exc}."
-            )
-            await message.reply(error_message)
-        except Exception as exc:  # pylint: disable=broad-except
-            await ping_owner()
-            send_log(ccutil.format_exception_info(exc), force=True)
-            await message.reply(
-                ":x: Nastąpił błąd przy wykonaniu tej komendy. "
-                "Administrator bota (Konrad) został o tym powiadomiony."
-            )
-        else:
-            if reply is None:
-                return
-            reply_msg = await try_send_message(message.channel, reply, message.reply)
-            on_success_coroutine = command_info.get("on_completion")
-            if on_success_coroutine:
-                await on_success_coroutine(message, reply_msg)
+            reply_msg = await execute_command(command_info, message, command)
+        finally:
+            # Also record the commands that failed, so that the slow failures are visible
+            metrics.observe_command(command.name, time.perf_counter() - received_time)
+        if reply_msg is None:
+            return
+        on_success_coroutine = command_info.get("on_completion")
+        if on_success_coroutine:
+            await on_success_coroutine(message, reply_msg, command)
 
     if command_info["description"]:
         async with message.channel.typing():
@@ -265,6 +446,45 @@ async def on_message(message: discord.Message) -> None:
         await run_command()
 
 
+@client.event
+async def on_guild_role_create(role: discord.Role) -> None:
+    """Updates the cached group role mappings when a role is created."""
+    util.refresh_group_roles(role.guild)
+
+
+@client.event
+async def on_guild_role_update(_: discord.Role, role: discord.Role) -> None:
+    """Updates the cached group role mappings when a role is renamed or otherwise changed."""
+    util.refresh_group_roles(role.guild)
+
+
+@client.event
+async def on_guild_role_delete(role: discord.Role) -> None:
+    """Updates the cached group role mappings when a role is deleted."""
+    util.refresh_group_roles(role.guild)
+
+
+@client.event
+async def on_interaction(interaction: discord.Interaction) -> None:
+    """Handles the message component interactions (e.g. button clicks) for all bot messages.
+
+    The state of each component is encoded in its custom ID, so the handlers keep working for
+    messages sent before the bot was restarted.
+    """
+    if interaction.type != discord.InteractionType.component:
+        return
+    custom_id: str = (interaction.data or {}).get("custom_id", "")
+    handler_name, *args = custom_id.split(":")
+    handler = INTERACTION_HANDLERS.get(handler_name)
+    if handler is None:
+        return
+    try:
+        await handler(interaction, *args)
+    except Exception as exc:  # pylint: disable=broad-except
+        await ping_owner()
+        send_log(ccutil.format_exception_info(exc), force=True)
+
+
 def get_new_status_msg(query_time: datetime.datetime = None) -> str or False:
     """Determine the current lesson status message.
 
@@ -371,33 +591,8 @@ def get_new_status_msg(query_time: datetime.datetime = None) -> str or False:
     return new_status_msg
 
 
-def validate_reaction(
-    test_reaction: discord.Reaction, reaction_user: discord.Member
-) -> bool:
-    """Checks whether or not the reaction contains the correct emoji."""
-    emoji_valid = str(test_reaction.emoji) in HOMEWORK_EMOJI
-    return reaction_user != client.user and emoji_valid
-
-
-async def remind_about_homework_event(
-    event: homework.HomeworkEvent, tense: str
-) -> None:
-    """Send a message reminding about the homework event."""
-
-    # Initialise server reference, Konrad's Discord Server
-    my_server: discord.Guild = client.get_guild(MY_SERVER_ID)
-
-    mention_text = "@everyone"  # To be used at the beginning of the reminder message
-    event_name = event.title
-    for role, name in ROLE_CODES.items():
-        if role != event.group:
-            continue
-        mention_role = discord.utils.get(my_server.roles, name=name)
-        if role != "grupa_0":
-            mention_text = my_server.get_role(mention_role.id).mention
-        break
-    chnl: int = testing_channel or ChannelID.NAUKA
-    target_channel: discord.TextChannel = client.get_channel(chnl)
+def get_reminder_line(line_number: int, event: homework.HomeworkEvent, tense: str) -> str:
+    """Returns the line describing the homework event in a reminder digest message."""
     # Which tense to use in the reminder message
     when = {
         "today": "dziś jest",
@@ -408,42 +603,101 @@ async def remind_about_homework_event(
     }[
         tense
     ]  # tense can have a value of 'today', 'tomorrow' or 'past'
-    reminder_message = f"{mention_text} Na {when} zadanie: **{event_name}**."
-    message: discord.Message = await target_channel.send(reminder_message)
-    for emoji in HOMEWORK_EMOJI:
-        await message.add_reaction(emoji)
-
-    async def snooze_event() -> None:
-        """Increases the event's due date by one hour."""
-        new_reminder_time = datetime.datetime.now() + datetime.timedelta(hours=1)
-        event.reminder_date = new_reminder_time.strftime("%d.%m.%Y %H")
-        snoozed_message = (
-            f":alarm_clock: Przełożono powiadomienie dla zadania `{event_name}`"
-            f" na {str(new_reminder_time.hour).zfill(2)}:00."
-        )
-        await message.edit(content=snoozed_message)
+    return f"{line_number}. Na {when} zadanie: **{event.title}**."
 
-    try:
-        reaction, _ = await client.wait_for(
-            "reaction_add", timeout=120.0, check=validate_reaction
+
+async def send_homework_digest(
+    group: str, due_events: list[tuple[homework.HomeworkEvent, str]]
+) -> None:
+    """Sends a single message reminding about all the given homework events for one group.
+
+    Each event gets its own pair of buttons for marking it as completed or snoozing it.
+    The events are snoozed by an hour as soon as the reminder is sent, so no waiting is necessary;
+    clicking the buttons is handled by `handle_homework_reminder_button`.
+    """
+    # Initialise server reference, Konrad's Discord Server
+    my_server: discord.Guild = client.get_guild(MY_SERVER_ID)
+    # To be used at the beginning of the reminder message
+    mention_text = util.get_group_mention(my_server, group)
+    chnl: int = testing_channel or ChannelID.NAUKA
+    target_channel: discord.TextChannel = client.get_channel(chnl)
+
+    lines = [f"{mention_text} Przypomnienie o zadaniach:"]
+    view = discord.ui.View(timeout=None)
+    for line_number, (event, tense) in enumerate(due_events, start=1):
+        lines.append(get_reminder_line(line_number, event, tense))
+        for action, emoji in zip(("done", "snooze"), HOMEWORK_EMOJI):
+            button = discord.ui.Button(
+                label=str(line_number),
+                emoji=emoji,
+                custom_id=f"homework:{action}:{event.stable_id}:{line_number}",
+                # Keep both buttons of each event in the same row
+                row=(line_number - 1) // 2,
+            )
+            view.add_item(button)
+    await target_channel.send("\n".join(lines), view=view)
+
+
+async def handle_homework_reminder_button(
+    interaction: discord.Interaction, action: str, stable_id: str, line_number: str
+) -> None:
+    """Marks the homework event as completed or snoozes it, then updates the digest message.
+
+    The event is identified by its `stable_id`, since the event IDs are reassigned on restart.
+    """
+    for event in homework.homework_events:
+        if event.stable_id == stable_id:
+            break
+    else:
+        await interaction.response.send_message(
+            f"{Emoji.WARNING} To zadanie już nie istnieje.", ephemeral=True
+        )
+        return
+    if not util.is_in_group(interaction.guild, interaction.user, event.group):
+        await interaction.response.send_message(
+            f"{Emoji.WARNING} To zadanie nie jest dla Twojej grupy.", ephemeral=True
+        )
+        return
+    if action == "done":
+        event.reminder_is_active = False
+        new_line = (
+            f"{line_number}. {Emoji.CHECK_2} Zaznaczono zadanie `{event.title}` jako odrobione."
         )
-    except asyncio.TimeoutError:  # 120 seconds have passed with no user input
-        await snooze_event()
     else:
-        if str(reaction.emoji) == HOMEWORK_EMOJI[0]:
-            # Reaction emoji is ':ballot_box_with_check:'
-            event.reminder_is_active = False
-            completed_msg = (
-                f"{Emoji.CHECK_2} Zaznaczono zadanie `{event_name}` jako odrobione."
-            )
-            await message.edit(content=completed_msg)
-        else:  # Reaction emoji is :alarm_clock:
-            await snooze_event()
-    await message.clear_reactions()
+        event.reminder_time = datetime.datetime.now() + datetime.timedelta(hours=1)
+        new_line = (
+            f"{line_number}. :alarm_clock: Przełożono powiadomienie dla zadania `{event.title}`"
+            f" na {event.reminder_time.hour:02}:00."
+        )
+    lines = interaction.message.content.split("\n")
+    lines[int(line_number)] = new_line
+    # Remove the buttons of the event that has just been handled
+    view = discord.ui.View.from_message(interaction.message, timeout=None)
+    for item in list(view.children):
+        if getattr(item, "custom_id", "").endswith(f":{stable_id}:{line_number}"):
+            view.remove_item(item)
+    await interaction.response.edit_message(content="\n".join(lines), view=view)
     # Updates data.json so that if the bot is restarted the event's parameters are saved
     data_manager.save_data_file()
 
 
+# Maps the first segment of a message component's custom ID to the coroutine that handles it.
+# The remaining segments are passed to the coroutine as positional arguments.
+INTERACTION_HANDLERS = {}
+
+
+def rebuild_interaction_handlers() -> None:
+    """Fills the interaction handler table, e.g. again after the command modules were reloaded."""
+    INTERACTION_HANDLERS.clear()
+    INTERACTION_HANDLERS.update(
+        homework=handle_homework_reminder_button,
+        zadania=homework.handle_homework_page_button,
+    )
+
+
+rebuild_interaction_handlers()
+
+
 def check_is_summer_holidays(current_time: datetime.datetime) -> bool:
     """Returns a boolean indicating if it is currently the summer holidays."""
     current_year = current_time.year
@@ -457,42 +711,15 @@ def check_is_summer_holidays(current_time: datetime.datetime) -> bool:
     return current_time >= holidays_start
 
 
-@loop(seconds=1)
-async def main_update_loop() -> None:
-    """Routinely fetches data from various APIs to ensure the cache is up-to-date.
-    And also regularly performs non-resource-intensive tasks that do not connect to APIs.
-
-    API updates:
-        - Steam Community Market item prices -- every 30 min
-        - The substitutions from the I LO website -- every 1 h
-        - The lucky numbers from the SUI LO API -- according to the settings
+def should_update_lucky_numbers(current_time: datetime.datetime) -> bool:
+    """Checks if the lucky numbers should be updated at the given time.
 
-    Non-API updates:
-        - The bot status -- every 1 min
-        - Homework event deadlines-- every 1 min
+    They are only updated during the update window if the cached data is outdated, and not during
+    the summer holidays.
     """
-    current_time = datetime.datetime.now()  # Today's time
-    await check_for_due_homework(current_time)
-
-    # Tasks that only update on the first second of a given minute
-    if current_time.second == 0:
-        # Update the bot status once a minute
-        status_update_msg: str = await check_for_status_updates(current_time)
-        if status_update_msg != STATUS_UPDATE_UNNECESSARY_MSG:
-            send_log(status_update_msg)
-
-        if current_time.minute % 30 == 0:
-            # Update the Steam Market prices every half hour
-            await check_for_steam_market_updates()
-
-            if current_time.minute == 0:
-                # Update the substitutions cache every hour
-                await check_for_substitutions_updates(use_debug_channel=False)
-
-    # Check if the lucky numbers data is outdated
     try:
         # Try to parse the lucky numbers data date
-        cached_date: datetime.datetime = api.lucky_numbers.cached_data["date"]
+        cached_date: datetime.datetime = api.lucky_numbers.get_cached_data()["date"]
     except (TypeError, KeyError) as exception:
         # Lucky numbers data does not contain a date
         # await ping_owner()
@@ -501,32 +728,80 @@ async def main_update_loop() -> None:
     else:
         if cached_date == current_time.date() or current_time.hour != UPDATE_NUMBERS_AT:
             # Data does not need to be updated; only update at the given time
-            return
-            # The bot will update every x seconds so that it doesn't exceed the max
-        if (
-            current_time.minute >= UPDATE_NUMBERS_FOR
-            or current_time.second % UPDATE_NUMBERS_EVERY
-        ):
+            return False
+        if current_time.minute >= UPDATE_NUMBERS_FOR:
             # Initial update period of API update window; don't update more than the maximum
-            return
-    if check_is_summer_holidays(current_time):
-        return
-    # Lucky numbers data is not current; update it
+            return False
+    return not check_is_summer_holidays(current_time)
+
+
+# The periodic tasks run independently of each other, so a slow task doesn't delay the others.
+#
+# API updates:
+#     - Steam Community Market item prices -- every 30 min
+#     - The substitutions from the I LO website -- every 1 h
+#     - The lucky numbers from the SUI LO API -- according to the settings
+#
+# Non-API updates:
+#     - The bot status -- every 1 min
+#     - Homework event deadlines -- every 1 s
+#     - Archiving expired homework events -- every day at midnight
+
+
+@periodic.register("homework", interval=1, timeout=60)
+async def check_for_due_homework_task(current_time: datetime.datetime) -> None:
+    """Periodic task that sends the due homework reminders."""
+    await check_for_due_homework(current_time)
+
+
+@periodic.register("status", interval=60, timeout=30)
+async def check_for_status_updates_task(current_time: datetime.datetime) -> None:
+    """Periodic task that updates the bot status."""
+    status_update_msg: str = await check_for_status_updates(current_time)
+    if status_update_msg != STATUS_UPDATE_UNNECESSARY_MSG:
+        send_log(status_update_msg)
+
+
+@periodic.register("steam_market", interval=30 * 60, timeout=25 * 60)
+async def check_for_steam_market_updates_task(_: datetime.datetime) -> None:
+    """Periodic task that checks the tracked Steam Market items."""
+    await check_for_steam_market_updates()
+
+
+@periodic.register("substitutions", interval=60 * 60, timeout=5 * 60)
+async def check_for_substitutions_updates_task(_: datetime.datetime) -> None:
+    """Periodic task that updates the substitutions cache."""
+    await check_for_substitutions_updates(use_debug_channel=False)
+
+
+@periodic.register(
+    "archive_homework",
+    interval=60,
+    timeout=5 * 60,
+    predicate=lambda current_time: current_time.hour == current_time.minute == 0,
+)
+async def archive_homework_events_task(current_time: datetime.datetime) -> None:
+    """Periodic task that moves the expired homework events to the archive."""
+    data_manager.archive_expired_homework_events(current_time)
+
+
+@periodic.register(
+    "lucky_numbers",
+    interval=UPDATE_NUMBERS_EVERY,
+    timeout=60,
+    predicate=should_update_lucky_numbers,
+)
+async def check_for_lucky_numbers_updates_task(_: datetime.datetime) -> None:
+    """Periodic task that updates the lucky numbers if they are outdated."""
     await check_for_lucky_numbers_updates()
 
 
 async def check_for_status_updates(current_time: datetime.datetime, force=False) -> str:
     """Checks if the current hour and minute is in any time slot for the lesson plan timetable."""
     now = current_time.hour, current_time.minute
-    # Loop throught each period to see if the current time is the same as either start or end time
-    if not force:
-        for start_end_times in util.lesson_plan_dp["times"]:
-            if now in start_end_times:
-                # Current time is either the period's start or end time; stop checking further times
-                break
-        else:
-            # We have reached the end of the loop without finding a match
-            return STATUS_UPDATE_UNNECESSARY_MSG
+    # The status only changes at the start or end of a period
+    if not force and now not in util.period_boundaries:
+        return STATUS_UPDATE_UNNECESSARY_MSG
     # Check is successful; update bot's Discord status
     msg: str = get_new_status_msg(current_time)
     if not msg:
@@ -538,30 +813,43 @@ async def check_for_status_updates(current_time: datetime.datetime, force=False)
 
 
 async def check_for_due_homework(current_time: datetime.datetime) -> None:
-    """Checks if the bot should make a reminder about due homework."""
+    """Checks if the bot should make a reminder about due homework.
+
+    The due events are grouped by the group they are for, and each group receives a single digest
+    message with up to `MAX_DIGEST_EVENTS` events.
+    """
     tomorrow = current_time.date() + datetime.timedelta(days=1)  # Today's date + 1 day
+    due_events: dict[str, list[tuple[homework.HomeworkEvent, str]]] = {}
     for event in homework.homework_events:
-        reminder_time = datetime.datetime.strptime(event.reminder_date, "%d.%m.%Y %H")
-        event_time = datetime.datetime.strptime(event.deadline, "%d.%m.%Y")
-        if not event.reminder_is_active or reminder_time > current_time:
+        if not event.reminder_is_active or event.reminder_time > current_time:
             # This piece of homework has already had a reminder issued; ignore it
             continue
-        if event_time.date() > tomorrow:
+        event_date = event.deadline_time.date()
+        if event_date > tomorrow:
             tense = "future"
-        elif event_time.date() == tomorrow:
+        elif event_date == tomorrow:
             tense = "tomorrow"
-        elif event_time.date() == current_time.date():
+        elif event_date == current_time.date():
             tense = "today"
         else:
             tense = "past"
-        await remind_about_homework_event(event, tense)
+        due_events.setdefault(event.group, []).append((event, tense))
+        # Remind again in an hour unless the event is marked as completed in the meantime
+        event.reminder_time = current_time + datetime.timedelta(hours=1)
+    if not due_events:
+        return
+    for group, events in due_events.items():
+        for start in range(0, len(events), MAX_DIGEST_EVENTS):
+            await send_homework_digest(group, events[start : start + MAX_DIGEST_EVENTS])
+    # Updates data.json so that if the bot is restarted the reminder times are saved
+    data_manager.save_data_file()
 
 
-@main_update_loop.before_loop
-async def wait_before_starting_loop() -> None:
-    """Wait for the client to initialise before starting loops."""
+async def prepare_periodic_tasks() -> None:
+    """Performs the start-up work that has to be done before the periodic tasks are started."""
     await client.wait_until_ready()
     await check_for_status_updates(datetime.datetime.now(), force=True)
+    data_manager.archive_expired_homework_events()
 
     # If there was a message sent the last time the bot closed, edit or reply to it.
     msg_info = data_manager.on_exit_msg
@@ -592,7 +880,7 @@ async def check_for_steam_market_updates() -> None:
     for item in steam_market.tracked_market_items:
         await asyncio.sleep(3)
         try:
-            result = api.steam_market.get_item(item.name)
+            result = await periodic.to_thread(api.steam_market.get_item, item.name)
             price = api.steam_market.get_item_price(result)
         except web.WebException as web_exc:
             await ping_owner()
@@ -618,13 +906,13 @@ async def check_for_lucky_numbers_updates() -> None:
     If it has changed, announces announces the new numbers in the specified channel.
     """
     try:
-        old_cache = api.lucky_numbers.update_cache()
+        old_cache = await periodic.to_thread(api.lucky_numbers.update_cache)
     except web.InvalidResponseException as web_exc:
         await ping_owner()
         exc: str = ccutil.format_exception_info(web_exc)
         send_log(f"Lucky numbers update: {BAD_RESPONSE}{exc}", force=True)
     else:
-        if old_cache != api.lucky_numbers.cached_data:
+        if old_cache != api.lucky_numbers.get_cached_data():
             old_str: str = api.lucky_numbers.serialise(old_cache, pretty=True)
             send_log(f"Lucky numbers data updated! Old data:\n{old_str}", force=True)
             target_channel = testing_channel or ChannelID.NUMERKI
@@ -693,9 +981,11 @@ async def announce_substitutions(
 async def check_for_substitutions_updates(use_debug_channel: bool = True) -> None:
     """Updates the substitutions cache and checks if it's changed."""
     try:
-        new_cache, old_cache = api.substitutions.get_substitutions(force_update=True)
+        new_cache, old_cache = await periodic.to_thread(
+            api.substitutions.get_substitutions, force_update=True
+        )
         if "error" in new_cache:
-            raise RuntimeError("Substitutions data could not be parsed.")
+            raise api.substitutions.SubstitutionsParseError(new_cache["error"])
     except web.InvalidResponseException as web_exc:
         # The web request returned an invalid response; log the error details
         if web_exc.status_code == 403:
@@ -703,11 +993,14 @@ async def check_for_substitutions_updates(use_debug_channel: bool = True) -> Non
             return
         exc: str = ccutil.format_exception_info(web_exc)
         exception_message = f"Substitutions update: {BAD_RESPONSE}{exc}"
-    except RuntimeError as err_desc:
+    except api.substitutions.SubstitutionsParseError as parse_exc:
         # The HTML parser returned an error; log the error details
-        exc: str = new_cache.get("error")
-        exception_message = f"Error! {err_desc} Exception trace:\n{exc}"
+        exception_message = f"Error! {parse_exc} Exception trace:\n{parse_exc.trace}"
     else:
+        # The change may have been found by a background refresh started by the 'zast' command
+        unreported_old_cache = api.snapshots.pop_unreported_old_data("subs", None)
+        if unreported_old_cache is not None:
+            old_cache = unreported_old_cache
         send_log("Substitutions cache equality:", new_cache == old_cache)
         if new_cache == old_cache:
             # The cache was not updated. Do nothing.
@@ -730,6 +1023,8 @@ async def close() -> None:
     await client.wait_until_ready()
     await client.change_presence(status=discord.Status.offline)
     send_log("Bot is offline.")
+    # The event loop is stopped once the client is closed, and reused if the bot is restarted
+    watchdog.stop()
     # Sleep for 500 ms to ensure that the client.close() coroutine is the last to execute.
     await asyncio.sleep(0.5)
     await client.close()
@@ -747,52 +1042,117 @@ async def ping_owner(channel_id: int = ChannelID.BOT_LOGS) -> None:
     await chnl.send(owner.mention)
 
 
-async def try_send_message(
-    channel: discord.TextChannel,
-    content: str or discord.Embed,
-    reply_method=None,
-    edit_method=None,
-    on_fail_options: dict[str, str or dict] = None,
-) -> discord.Message:
-    """Attempts to send a message. If it's too long, sends a text file with the contents instead.
+def split_text(text: str, limit: int = MAX_MESSAGE_CONTENT_LENGTH) -> list[str] or None:
+    """Splits the text into chunks of at most `limit` characters at line boundaries.
 
-    Arguments:
-        channel -- the channel reference that the message should be sent in.
-        content -- the message content, which can either be a string or a `discord.Embed`.
-        reply_method -- an optional `discord.Message.reply` instance method reference to be used.
-        edit_method -- an optional `discord.Message.edit` instance method reference to be used.
-        on_fail_options -- a dictionary containing keys 'data', 'msg' and 'filename'.
-            - to_send -- the data to send in the text file if sending fails. Default: `content`
-            - msg -- the message to send on failure.
-            - filename -- the name of the file to send when sending fails. Default: `result.txt`
+    Code blocks that span multiple chunks are closed at the end of each chunk and reopened with
+    the same language at the start of the next one.
+
+    Returns the list of chunks, or None if a single line is too long to fit in a message.
     """
-    if reply_method is None:
-        reply_method = channel.send
+    chunks: list[str] = []
+    current: list[str] = []
+    current_length = 0
+    # The opening fence of the code block that the current line is in, e.g. '```py'
+    open_fence = None
+    for line in text.split("\n"):
+        # Reserve space for closing the code block at the end of the chunk
+        reserved = len("\n```") if open_fence else 0
+        if current and current_length + len(line) + 1 + reserved > limit:
+            chunk = "\n".join(current)
+            chunks.append(chunk + "\n```" if open_fence else chunk)
+            current = [open_fence] if open_fence else []
+            current_length = len(open_fence) + 1 if open_fence else 0
+        if current_length + len(line) + 1 + reserved > limit:
+            return None
+        current.append(line)
+        current_length += len(line) + 1
+        if line.count("```") % 2:
+            # The line opens or closes a code block
+            open_fence = None if open_fence else line[line.rindex("```"):]
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def split_embed(embed: discord.Embed) -> list[discord.Embed] or None:
+    """Splits the embed's description and fields into multiple embeds that are each within
+    Discord's limits.
+
+    The first embed keeps the original title, URL and the start of the description; the rest
+    continue it, first with the remainder of the description and then with the fields.
+    The footer is kept on the last embed.
+
+    Returns the list of embeds, or None if a single field or line of the description is too long to
+    fit in an embed.
+    """
+    data = embed.to_dict()
+    fields = data.pop("fields", [])
+    footer = data.pop("footer", None)
+    description = data.pop("description", "")
+    footer_length = len((footer or {}).get("text", ""))
+    continued_title = data.get("title", "")[:MAX_EMBED_FIELD_NAME_LENGTH - 6] + " (cd.)"
+    descriptions = split_text(description, MAX_EMBED_DESCRIPTION_LENGTH) if description else [""]
+    if descriptions is None:
+        return None
+    if description:
+        data["description"] = descriptions[0]
+    embeds = [discord.Embed.from_dict(data)]
+    for chunk in descriptions[1:]:
+        embeds.append(discord.Embed(title=continued_title, description=chunk, colour=embed.colour))
+    if any(len(part) + footer_length > MAX_EMBED_LENGTH for part in embeds):
+        return None
+    # The length of each embed is counted from its own title and description
+    current_length = len(embeds[-1])
+    for field in fields:
+        field_length = len(field["name"]) + len(field["value"])
+        if (
+            field_length > MAX_EMBED_FIELD_VALUE_LENGTH + MAX_EMBED_FIELD_NAME_LENGTH
+            or len(continued_title) + field_length + footer_length > MAX_EMBED_LENGTH
+        ):
+            return None
+        if (
+            len(embeds[-1].fields) == MAX_EMBED_FIELDS
+            or current_length + field_length + footer_length > MAX_EMBED_LENGTH
+        ):
+            embeds.append(discord.Embed(title=continued_title, colour=embed.colour))
+            current_length = len(embeds[-1])
+        embeds[-1].add_field(**field)
+        current_length += field_length
+    if footer:
+        embeds[-1].set_footer(text=footer.get("text"), icon_url=footer.get("icon_url"))
+    return embeds
+
+
+def exceeds_message_limits(content: str or discord.Embed) -> bool:
+    """Checks if the message content would be rejected by Discord for being too long."""
+    if isinstance(content, discord.Embed):
+        return (
+            len(content) > MAX_EMBED_LENGTH
+            or len(content.fields) > MAX_EMBED_FIELDS
+            or len(content.description or "") > MAX_EMBED_DESCRIPTION_LENGTH
+        )
+    return len(str(content)) > MAX_MESSAGE_CONTENT_LENGTH
 
-    if on_fail_options is None:
-        on_fail_options = {}
 
-    args = {"embed" if isinstance(content, discord.Embed) else "content": content}
-    try:
-        reply_msg = await (edit_method or reply_method)(**args)
-    except discord.errors.HTTPException as http_exc:
-        send_log(ccutil.format_exception_info(http_exc))
-    else:
-        # Message sent successfully; return its reference
-        return reply_msg
-    # The message could not be sent successfully
+def make_attachment(data: str, filename: str) -> discord.File:
+    """Creates an in-memory file attachment containing the given data.
 
-    on_fail_data = on_fail_options.get("to_send", content)
-    send_log("Message too long. Length of data:", len(str(content)))
+    The data is gzip-compressed if it is larger than `COMPRESS_ATTACHMENTS_ABOVE` bytes.
+    """
+    raw = data.encode("UTF-8")
+    if len(raw) > COMPRESS_ATTACHMENTS_ABOVE:
+        raw = gzip.compress(raw)
+        filename += ".gz"
+    return discord.File(io.BytesIO(raw), filename=filename)
 
-    # Send the specified error message, or the default template if not provided
-    reply_msg = await reply_method(on_fail_options.get("msg", MESSAGE_SEND_FAIL_MSG))
 
+def serialise_failure_data(on_fail_data: any) -> str:
+    """Generates the text that should be sent in the attachment when a message is too long."""
     if isinstance(on_fail_data, discord.Embed):
         # Serialise the embed as a dictionary
         on_fail_data = {"embed": on_fail_data.to_dict()}
 
-    # Generate the data that should be written to the file
     results: list[str] = []
     for element in on_fail_data if isinstance(on_fail_data, list) else [on_fail_data]:
         processing_element_msg = (
@@ -812,12 +1172,84 @@ async def try_send_message(
             results.append(element.decode("UTF-8"))
         else:
             results.append(str(element))
+    return "\n".join(results)
 
-    # Write the file
-    filename = on_fail_options.get("filename", "result.txt")
-    with open(filename, "w", encoding="UTF-8") as file:
-        file.write("\n".join(results))
+
+async def try_send_message(
+    channel: discord.TextChannel,
+    content: str or discord.Embed,
+    reply_method=None,
+    edit_method=None,
+    on_fail_options: dict[str, str or dict] = None,
+    view: discord.ui.View = None,
+) -> discord.Message:
+    """Attempts to send a message. If it's too long, it is first split into multiple messages at
+    line or field boundaries. If that isn't possible, a text file with the contents is sent instead.
+    The file is generated in memory, so no files are written to the disk.
+
+    Arguments:
+        channel -- the channel reference that the message should be sent in.
+        content -- the message content, which can either be a string or a `discord.Embed`.
+        reply_method -- an optional `discord.Message.reply` instance method reference to be used.
+        edit_method -- an optional `discord.Message.edit` instance method reference to be used.
+        on_fail_options -- a dictionary containing keys 'data', 'msg' and 'filename'.
+            - to_send -- the data to send in the text file if sending fails. Default: `content`
+            - msg -- the message to send on failure.
+            - filename -- the name of the file to send when sending fails. Default: `result.txt`
+        view -- an optional `discord.ui.View` with message components to send with the message.
+
+    If only some of the parts could be sent, the attachment contains the remaining parts.
+
+    Returns the reference to the first message that was sent.
+    """
+    if reply_method is None:
+        reply_method = channel.send
+
+    if on_fail_options is None:
+        on_fail_options = {}
+
+    is_embed = isinstance(content, discord.Embed)
+    if exceeds_message_limits(content):
+        parts = split_embed(content) if is_embed else split_text(str(content))
+        send_log(f"Message too long; split into {len(parts or [])} part(s).")
+    else:
+        parts = [content]
+
+    reply_msg = None
+    num_sent_parts = 0
+    if parts:
+        try:
+            for part in parts:
+                args = {"embed" if is_embed else "content": part}
+                if reply_msg is None:
+                    # Only the first message is a reply and has the view attached
+                    if view is not None:
+                        args["view"] = view
+                    reply_msg = await (edit_method or reply_method)(**args)
+                else:
+                    await channel.send(**args)
+                num_sent_parts += 1
+        except discord.errors.HTTPException as http_exc:
+            send_log(ccutil.format_exception_info(http_exc))
+        else:
+            # Message sent successfully; return its reference
+            return reply_msg
+    # The message could not be sent successfully
+
+    if num_sent_parts:
+        # Only attach the parts that weren't sent, since the others are already in the channel
+        on_fail_data = parts[num_sent_parts:]
+        if is_embed:
+            on_fail_data = [{"embed": part.to_dict()} for part in on_fail_data]
+    else:
+        on_fail_data = on_fail_options.get("to_send", content)
+    send_log("Message too long. Length of data:", len(str(content)))
+
+    # Send the specified error message, or the default template if not provided
+    fail_msg = await reply_method(on_fail_options.get("msg", MESSAGE_SEND_FAIL_MSG))
 
     # Send the file in the specified channel
-    await channel.send(file=discord.File(filename))
-    return reply_msg
+    filename = on_fail_options.get("filename", "result.txt")
+    attachment = make_attachment(serialise_failure_data(on_fail_data), filename)
+    await channel.send(file=attachment)
+    return reply_msg or fail_msg
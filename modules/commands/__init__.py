@@ -1,22 +1,61 @@
 """__init__.py file for all modules responsible for functionality behind each user command."""
 
 # Standard library imports
+import hashlib
+from bisect import bisect_right
 from datetime import datetime, timedelta
+from operator import attrgetter
 
 # Third-party imports
 from discord import Role, Message, TextChannel
 
 # Local application imports
-from modules import Weekday, Emoji, WEEKDAY_NAMES, ROLE_CODES, bot, util
+from modules import Weekday, WEEKDAY_NAMES, ROLE_CODES, bot, util
+from modules.commands.router import ParsedCommand
+
+
+REMINDER_FORMAT = "%d.%m.%Y %H"
+
+
+def parse_event_time(time_str: str) -> datetime:
+    """Parses a string in the 'DD.MM.YYYY' or 'DD.MM.YYYY HH' format.
+
+    This is considerably faster than `datetime.strptime`, which matters when loading many events.
+    Raises ValueError if the string is not of either format.
+    """
+    date_str, _, hour = time_str.partition(" ")
+    day, month, year = date_str.split(".")
+    if len(day) != 2 or len(month) != 2 or len(year) != 4:
+        raise ValueError(f"time data '{time_str}' does not match format '{REMINDER_FORMAT}'")
+    return datetime(int(year), int(month), int(day), int(hour or 0))
 
 
 class HomeworkEvent:
-    """Custom object type for homework events."""
+    """Custom object type for homework events.
+
+    The deadline and reminder are stored as parsed `datetime` objects; their string forms and the
+    JSON serialisation are generated once and cached until the reminder state changes.
+    Equality and hashing use the event's identity key (title, group, author and deadline).
+    """
+
+    __slots__ = (
+        "event_id",
+        "title",
+        "group",
+        "author_id",
+        "deadline_time",
+        "_reminder_time",
+        "_reminder_is_active",
+        "_key",
+        "_stable_id",
+        "_deadline_str",
+        "_serialised",
+    )
 
     def __init__(
         self,
         title: str,
-        group: int,
+        group: str,
         author_id: int,
         deadline: str,
         reminder_date_str: str = None,
@@ -24,28 +63,94 @@ class HomeworkEvent:
     ):
         self.event_id: int = None
         self.title: str = title
-        self.group: int = group
+        self.group: str = group
         self.author_id: int = author_id
-        self.deadline: str = deadline.split(" ")[0]
-        if not reminder_date_str:
-            deadline = datetime.strptime(deadline, "%d.%m.%Y %H")
-            reminder_date = deadline - timedelta(days=1)
-            reminder_date_str = datetime.strftime(reminder_date, "%d.%m.%Y %H")
-        self.reminder_date = reminder_date_str
-        self.reminder_is_active = reminder_is_active
+        # The deadline hour is only used to generate the default reminder time
+        deadline_str = deadline.split(" ")[0]
+        self.deadline_time: datetime = parse_event_time(deadline_str)
+        if reminder_date_str:
+            reminder_time = parse_event_time(reminder_date_str)
+        else:
+            reminder_time = parse_event_time(deadline) - timedelta(days=1)
+        self._deadline_str: str = deadline_str
+        self._key: tuple = (title, group, author_id, self.deadline_time)
+        self._stable_id: str = None
+        self._reminder_time: datetime = reminder_time
+        self._reminder_is_active: bool = reminder_is_active
+        self._serialised: dict[str, str or int or bool] = None
+
+    @property
+    def deadline(self) -> str:
+        """The deadline date in the 'DD.MM.YYYY' format."""
+        return self._deadline_str
+
+    @property
+    def reminder_time(self) -> datetime:
+        """The time at which the next reminder should be sent."""
+        return self._reminder_time
+
+    @reminder_time.setter
+    def reminder_time(self, value: datetime) -> None:
+        self._reminder_time = value.replace(minute=0, second=0, microsecond=0)
+        self._serialised = None
+
+    @property
+    def reminder_date(self) -> str:
+        """The reminder time in the 'DD.MM.YYYY HH' format."""
+        return self.serialised["reminder_date"]
+
+    @reminder_date.setter
+    def reminder_date(self, value: str) -> None:
+        self.reminder_time = parse_event_time(value)
+
+    @property
+    def reminder_is_active(self) -> bool:
+        """Indicates if the event has not yet been marked as completed."""
+        return self._reminder_is_active
+
+    @reminder_is_active.setter
+    def reminder_is_active(self, value: bool) -> None:
+        self._reminder_is_active = value
+        self._serialised = None
+
+    @property
+    def key(self) -> tuple[str, str, int, datetime]:
+        """The tuple uniquely identifying this event, used for equality and hashing."""
+        return self._key
+
+    @property
+    def stable_id(self) -> str:
+        """A short hash of the identity key, which stays the same across restarts and reloads.
+
+        Unlike `event_id`, which is reassigned each time the data file is read, this can be used to
+        refer to the event from outside of the bot's memory, e.g. in a button's custom ID.
+        """
+        if self._stable_id is None:
+            raw_key = "\0".join(map(str, (self.title, self.group, self.author_id, self.deadline)))
+            self._stable_id = hashlib.sha1(raw_key.encode("UTF-8")).hexdigest()[:12]
+        return self._stable_id
+
+    @property
+    def state(self) -> tuple:
+        """The identity key extended with the mutable reminder state."""
+        return self._key + (self._reminder_time, self._reminder_is_active)
 
     @property
     def serialised(self) -> dict[str, str or int or bool]:
-        """Serialises the instance' attributes so that it can be saved in JSON format."""
-        event_details = {
-            "title": self.title,
-            "group": self.group,
-            "author_id": self.author_id,
-            "deadline": self.deadline,
-            "reminder_date": self.reminder_date,
-            "reminder_is_active": self.reminder_is_active,
-        }
-        return event_details
+        """Serialises the instance' attributes so that it can be saved in JSON format.
+
+        Returns a copy of the cached dictionary, so that the callers can't modify the cache.
+        """
+        if self._serialised is None:
+            self._serialised = {
+                "title": self.title,
+                "group": self.group,
+                "author_id": self.author_id,
+                "deadline": self._deadline_str,
+                "reminder_date": self._reminder_time.strftime(REMINDER_FORMAT),
+                "reminder_is_active": self._reminder_is_active,
+            }
+        return dict(self._serialised)
 
     @property
     def id_string(self) -> str:
@@ -53,33 +158,52 @@ class HomeworkEvent:
         return "event-id-" + str(self.event_id)
 
     def sort_into_container(self, event_container: list) -> None:
-        """Places the the event into homework_events in chronological order."""
-        try:
-            self.event_id = event_container[-1].event_id + 1
-        except (IndexError, TypeError):
-            self.event_id = 1
-        for comparison_event in event_container:
-            new_event_time = datetime.strptime(self.deadline, "%d.%m.%Y")
-            comp_deadline: str = comparison_event.deadline
-            old_event_time = datetime.strptime(comp_deadline, "%d.%m.%Y")
-            # Dumps debugging data
-            if new_event_time < old_event_time:
-                # The new event should be placed before the one it is currently being compared to
-                # Inserts event ID in the place of the one it's being compared to, so every event
-                #   after this event (including the comparison one) is pushed ahead by one spot.
-                event_container.insert(event_container.index(comparison_event), self)
-                return
-            # The new event should not be placed before; continue evaluating.
-        # Algorithm was unable to place the event before any others, so it shall be put at the end.
-        event_container.append(self)
+        """Places the the event into homework_events in chronological order.
+
+        The event is given the next unused ID. The last event in the container isn't necessarily
+        the one added most recently, so the highest ID is tracked by the container.
+        """
+        if isinstance(event_container, HomeworkEventContainer):
+            self.event_id = event_container.allocate_event_id()
+        else:
+            used_ids = (event.event_id for event in event_container)
+            self.event_id = max(filter(None, used_ids), default=0) + 1
+        # The new event is placed after all events with the same or an earlier deadline
+        index = bisect_right(
+            event_container, self.deadline_time, key=attrgetter("deadline_time")
+        )
+        event_container.insert(index, self)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, HomeworkEvent):
+            return self._key == other._key
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __repr__(self) -> str:
+        return f"<HomeworkEvent {self.id_string} {self.title!r} ({self._deadline_str})>"
 
 
 class HomeworkEventContainer(list[HomeworkEvent]):
     """Custom object class that derives from the list base type.
     This object serves as a container for HomeworkEvent objects.
     Defines methods for JSON serialisation as well as contents optimisation.
+
+    Attributes:
+        last_event_id -- the highest ID given to an event sorted into the container.
     """
 
+    def __init__(self, *args) -> None:
+        super().__init__(*args)
+        self.last_event_id: int = max(filter(None, (event.event_id for event in self)), default=0)
+
+    def allocate_event_id(self) -> int:
+        """Returns a new ID that is higher than that of any event sorted into the container."""
+        self.last_event_id += 1
+        return self.last_event_id
+
     @property
     def serialised(self) -> list[dict[str, str or int or bool]]:
         """Serialises each event in the container."""
@@ -88,8 +212,9 @@ class HomeworkEventContainer(list[HomeworkEvent]):
     def remove_disjunction(self, reference_container: list) -> None:
         """Removes events from this container that are not present in the reference container."""
         assert isinstance(reference_container, HomeworkEventContainer)
-        for event in self:
-            if event.serialised not in reference_container.serialised:
+        reference_states = {event.state for event in reference_container}
+        for event in list(self):
+            if event.state not in reference_states:
                 rm_obsolete_event_msg = (
                     f"Removing obsolete event '{event.title}' from container"
                 )
@@ -100,6 +225,8 @@ class HomeworkEventContainer(list[HomeworkEvent]):
 class TrackedItem:
     """Custom object type that contains information about a tracked item on the Steam Market."""
 
+    __slots__ = ("name", "min_price", "max_price", "author_id", "_key", "_serialised")
+
     def __init__(
         self, name: str, min_price: int, max_price: int, author_id: int
     ) -> None:
@@ -107,22 +234,31 @@ class TrackedItem:
         self.min_price: int = min_price
         self.max_price: int = max_price
         self.author_id: int = author_id
+        self._key: tuple[str, int, int, int] = (name, min_price, max_price, author_id)
+        self._serialised: dict[str, int or str] = None
 
     @property
     def serialised(self) -> dict[str, int or str]:
-        """Serialises the instance's attributes so that it can be saved in JSON format."""
-        return {
-            "name": self.name,
-            "min_price": self.min_price,
-            "max_price": self.max_price,
-            "author_id": self.author_id,
-        }
+        """Serialises the instance's attributes so that it can be saved in JSON format.
+
+        Returns a copy of the cached dictionary, so that the callers can't modify the cache.
+        """
+        if self._serialised is None:
+            self._serialised = {
+                "name": self.name,
+                "min_price": self.min_price,
+                "max_price": self.max_price,
+                "author_id": self.author_id,
+            }
+        return dict(self._serialised)
 
     def __eq__(self, other) -> bool:
-        if isinstance(other, type(self)):
-            # return self.name.lower() == other.name.lower()
-            return self.serialised == other.serialised
-        return False
+        if isinstance(other, TrackedItem):
+            return self._key == other._key
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash(self._key)
 
 
 def ensure_user_authorised(
@@ -255,45 +391,46 @@ def get_lessons_dp(query_period: int, weekday: int) -> list[str]:
     return lessons
 
 
-def get_datetime_from_input(message: Message, calling_command: str) -> datetime or str:
-    """Parses the message content and returns a datetime object if it contains a valid time.
+TIME_USAGE = (
+    "Należy napisać po komendzie `{p}{name}` godzinę i ewentualnie minutę "
+    "oddzieloną spacją, lub zostawić parametry komendy puste."
+)
+
+
+def parse_hour(value: str) -> int:
+    """Argument converter for hours. Raises ValueError if the value is not an hour."""
+    try:
+        hour = int(value)
+    except ValueError:
+        raise ValueError(f"`{value}` nie jest godziną.") from None
+    if not 0 <= hour < 24:
+        raise ValueError(f"Godzina *'{value}'* nie mieści się w przedziale `0, 23`.")
+    return hour
+
+
+def parse_minute(value: str) -> int:
+    """Argument converter for minutes. Raises ValueError if the value is not a minute."""
+    try:
+        minute = int(value)
+    except ValueError:
+        raise ValueError(f"`{value}` nie jest minutą.") from None
+    if not 0 <= minute < 60:
+        raise ValueError(f"Minuta *'{value}'* nie mieści się w przedziale `0, 59`.")
+    return minute
+
+
+def get_datetime_from_input(command: ParsedCommand) -> datetime:
+    """Returns today's date with the time given in the command's 'hour' and 'minute' parameters.
 
-    Returns the current date and time if there are no valid time parameters in the message content.
+    Returns the current date and time if the hour was not specified.
     """
-    args: list[str] = message.content.split(" ")
     current_time = datetime.now()
-    if len(args) == 1:
+    if command.params["hour"] is None:
         # No input parameters; return the current time as-is
         return current_time
-    try:
-        # Input validation
-        try:
-            if 0 <= int(args[1]) < 24:
-                if not 0 <= int(args[2]) < 60:
-                    raise RuntimeError(
-                        f"Minuta *'{args[2]}'* nie mieści się w przedziale `0, 59`."
-                    )
-            else:
-                raise RuntimeError(
-                    f"Godzina *'{args[1]}'* nie mieści się w przedziale `0, 23`."
-                )
-        except IndexError:
-            # Minute not specified by user; use default of :00.
-            args.append("00")
-        except ValueError:
-            # NaN
-            error_description = f"`{':'.join(args[1:])}` nie jest godziną."
-            raise RuntimeError(error_description) from None
-    except RuntimeError as invalid_arg_exc:
-        invalid_arg_msg = (
-            f"{Emoji.WARNING} {invalid_arg_exc}\nNależy napisać po komendzie "
-            f"`{bot.prefix}{calling_command}` godzinę i ewentualnie minutę "
-            f"oddzieloną spacją, lub zostawić parametry komendy puste."
-        )
-        return invalid_arg_msg
     params = {
-        "hour": int(args[1]),
-        "minute": int(args[2]),
+        "hour": command.params["hour"],
+        "minute": command.params["minute"],
         "second": 0,
         "microsecond": 0,
     }
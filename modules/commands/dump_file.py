@@ -8,17 +8,17 @@ from discord import Message
 
 # Local application imports
 from modules import bot, util
+from modules.commands.router import ParsedCommand
 
 DESC = None
 
 DEFAULT_FILENAME = "data.json"
 
 
-def read_file_contents(message: Message) -> str:
+def read_file_contents(_: Message, command: ParsedCommand) -> str:
     """Command handler for the 'dumpfile' command."""
-    args: list[str] = message.content.split(" ")
+    filename = command.params["filename"]
     try:
-        filename = args[1] if len(args) >= 2 else DEFAULT_FILENAME
         bot.send_log(f"Reading file '{filename}'...", force=True)
         # if not filename.endswith(".json"):
         #     raise FileNotFoundError
@@ -2,15 +2,16 @@
 
 
 # Standard library imports
-import ast
+import copy
 
 # Third-party imports
 import discord
 from corny_commons import util as ccutil
 
 # Local application imports
-from modules import bot, util
+from modules import bot, util, data_manager
 from modules.commands import ensure_user_authorised
+from modules.commands.router import ParsedCommand
 
 
 DESC = None
@@ -20,12 +21,37 @@ MISSING_ARGUMENTS_MSG = "Type an expression or command to execute."
 # Takes an argument of 'message' so that the object is available to the user for convenience.
 EXPRESSION_TEMPLATE = "async def __execute(message):\n    {}\n    return locals()"
 
+# The execution modes. The code is run directly in the event loop by default, so that it can await
+# coroutines. The other modes run blocking code in a separate thread or process with a timeout.
+MODES = ("loop", "thread", "process")
+DEFAULT_TIMEOUT = 10.0
 
-def inject_code(expression: str) -> str:
+
+def parse_mode(value: str) -> str:
+    """Converts the 'mode' argument, ensuring that it's a valid execution mode."""
+    mode = value.lower()
+    if mode not in MODES:
+        raise ValueError(f"Invalid mode `{value}`. Valid modes: {', '.join(MODES)}.")
+    return mode
+
+
+def parse_timeout(value: str) -> float:
+    """Converts the 'timeout' argument into a positive number of seconds."""
+    try:
+        timeout = float(value)
+    except ValueError:
+        raise ValueError(f"`{value}` is not a valid timeout.") from None
+    if timeout <= 0:
+        raise ValueError("The timeout must be positive.")
+    return timeout
+
+
+def inject_code(expression: str, template: str = EXPRESSION_TEMPLATE) -> str:
     """Attempts to inject code so that the evaluation result of the expression is saved in memory.
 
     Arguments:
         expression -- a string containing the raw code to be executed.
+        template -- the code defining the '__execute()' function, into which the code is inserted.
 
     Returns a string that may or may not contain injected code, depending on the input structure.
     """
@@ -39,6 +65,9 @@ def inject_code(expression: str) -> str:
     else:
         # No user-specified return value
         # Attempt to inject code so that the evaluation of the first line is returned
+        # Imported lazily along with the other machinery only needed for executing code
+        import ast  # pylint: disable=import-outside-toplevel
+
         try:
             # Check if such a code injection would be valid Python code
             ast.parse("_ = " + expression)
@@ -50,29 +79,44 @@ def inject_code(expression: str) -> str:
             # No syntax error; initialise the '__temp' local variable in code injection
             expression = "__temp = " + expression
 
-    expression = EXPRESSION_TEMPLATE.format(expression.replace("\n", "\n    "))
+    expression = template.format(expression.replace("\n", "\n    "))
     bot.send_log(f"Executing code:\n{expression}", force=True)
     return expression
 
 
-async def process_execution(message: discord.Message) -> str:
+def compile_execution(expression: str):
+    """Injects the result-storing code into the expression and defines the '__execute()' function.
+
+    Returns the coroutine function, which takes the message as its only argument.
+    Raises any compile-time exceptions (such as SyntaxError).
+    """
+    # Defines the '__execute()' function according to the template above.
+    exec(inject_code(expression))  # pylint: disable=exec-used
+    return locals()["__execute"]
+
+
+async def process_execution(message: discord.Message, expression: str, wrapper=None) -> str:
     """Executes the code and returns the message that should be sent to the user.
 
+    Arguments:
+        message -- the message containing the command, made available to the executed code.
+        expression -- the code to execute.
+        wrapper -- an optional async function taking the '__execute()' coroutine, which should
+        await it and return its result. Used to instrument the execution, e.g. by the profiler.
+
     Returns the message that should be sent back directly to the user.
     """
-    msg_content: str = message.content
-    expression = msg_content.split(" ", maxsplit=1)[1]
 
     # Inject result-storing code to the user input and execute it.
     try:
-
-        # Defines the '__execute()' function according to the template on line 22.
-        # This raises any compile-time exceptions (such as SyntaxError).
-        exec(inject_code(expression))  # pylint: disable=exec-used
+        coroutine = compile_execution(expression)(message)
 
         # The __execute() injected function returns its locals() dictionary.
         # This raises any run-time exceptions (such as ValueError).
-        execute_locals: dict[str, any] = await locals()["__execute"](message) or {}
+        if wrapper is None:
+            execute_locals: dict[str, any] = await coroutine or {}
+        else:
+            execute_locals: dict[str, any] = await wrapper(coroutine) or {}
     except Exception as exec_exc:  # pylint: disable=broad-except
         # If the code logic is malformed or otherwise raises an exception, return the error info.
         exec_result = ccutil.format_exception_info(exec_exc)
@@ -91,26 +135,72 @@ async def process_execution(message: discord.Message) -> str:
     return "\n".join(formatted_results)
 
 
-def exec_command_handler(message: discord.Message) -> str:
+def get_message_snapshot(message: discord.Message) -> dict[str, any]:
+    """Returns the picklable attributes of the message, which are passed to the worker process."""
+    return {
+        "id": message.id,
+        "content": message.content,
+        "author_id": message.author.id,
+        "channel_id": message.channel.id,
+        "guild_id": message.guild and message.guild.id,
+    }
+
+
+async def process_sandboxed_execution(
+    message: discord.Message, expression: str, mode: str, timeout: float
+) -> str:
+    """Executes the blocking code outside of the event loop and returns the message to send.
+
+    Arguments:
+        message -- the message containing the command, made available to the executed code.
+        expression -- the code to execute.
+        mode -- 'thread' to run the code in a thread with access to the live bot state, or 'process'
+        to run it in a worker process with a read-only snapshot of the state.
+        timeout -- the number of seconds after which the execution is interrupted.
+    """
+    # The sandbox imports multiprocessing, so it's only imported when it's first used
+    from modules import sandbox  # pylint: disable=import-outside-toplevel
+
+    source = inject_code(expression, sandbox.EXPRESSION_TEMPLATE)
+    # The state is serialised up front so that the executed code doesn't see partial updates
+    state = copy.deepcopy(data_manager.get_serialised_data())
+    if mode == "thread":
+        formatted_results = await sandbox.run_in_thread(
+            source, dict(globals()), message, state, timeout
+        )
+    else:
+        formatted_results = await sandbox.run_in_process(
+            source, get_message_snapshot(message), state, timeout
+        )
+    bot.send_log(f"Sandboxed execution results:\n{formatted_results}", force=True)
+    return "\n".join(formatted_results)
+
+
+def exec_command_handler(message: discord.Message, command: ParsedCommand) -> str:
     """Event handler for the 'exec' command."""
-    msg_content: str = message.content
-    args = msg_content.split(' ', maxsplit=1)
     ensure_user_authorised(message, owner_only=True)
-    try:
-        expression = args[1]
-    except IndexError:
+    expression = command.params["expression"]
+    if expression is None:
         return MISSING_ARGUMENTS_MSG
     fmt_expr = expression.replace("\n", "\n>>> ")
     return f"Code executing...\n```py\n>>> {fmt_expr}```"
 
 
-async def execute_code(original_msg: discord.Message, reply_msg: discord.Message) -> None:
+async def execute_code(
+    original_msg: discord.Message, reply_msg: discord.Message, command: ParsedCommand
+) -> None:
     """Callback function for the 'exec' command. Executes after the bot replies initially."""
     if reply_msg.content == MISSING_ARGUMENTS_MSG:
         return
     chnl: discord.TextChannel = reply_msg.channel
     async with chnl.typing():
-        exec_result = await process_execution(original_msg)
+        mode = command.params["mode"]
+        expression = command.params["expression"]
+        if mode == "loop":
+            exec_result = await process_execution(original_msg, expression)
+        else:
+            timeout = command.params["timeout"]
+            exec_result = await process_sandboxed_execution(original_msg, expression, mode, timeout)
     new_content = reply_msg.content.replace("executing...", "executed!")
     await reply_msg.edit(content=new_content)
     await bot.try_send_message(chnl, exec_result)
@@ -12,18 +12,32 @@ from modules.commands import (
     homework,
     steam_market,
     lucky_numbers,
+    router,
+    render_cache,
 )
-from modules.commands import substitutions, meet, exec as execute, terminate, dump_file
+from modules.commands import substitutions, meet, exec as execute, terminate, dump_file, stats
+from modules.commands import logs, profile, reload
+from modules.commands import TIME_USAGE, parse_hour, parse_minute
+from modules.commands.router import Parameter, ParsedCommand
 
 
-def get_help_message(message: Message) -> Embed or None:
+def get_help_message(_: Message, command: ParsedCommand) -> Embed or None:
     """Event handler for the 'help' command."""
+    # Use the last argument, since mentioning the bot prepends the help command to the message
+    queried_command = ALIASES.get(command.args[-1].lower()) if command.args else None
+    # The command information doesn't change while the bot is running
+    return render_cache.get_embed(
+        "help", (queried_command,), None, lambda: render_help_embed(queried_command)
+    )
+
+
+def render_help_embed(queried_command: str or None) -> Embed:
+    """Renders the help embed for the given command, or for all commands if it's None."""
     desc = f"*Prefiks dla komend:* `{bot.prefix}`"
-    args: str = message.content.strip().lower().split(" ")
-    if len(args) >= 2 and args[-1] in INFO:
+    if queried_command:
         # Display help for specific command
         title = "Pomoc w obsłudze komendy"
-        commands_to_iterate = [(args[-1], INFO[args[-1]])]
+        commands_to_iterate = [(queried_command, INFO[queried_command])]
     else:
         # Display help for all commands
         title = "Lista komend"
@@ -34,6 +48,9 @@ def get_help_message(message: Message) -> Embed or None:
         if not command_description:
             continue
         cmd_desc = command_description.format(p=bot.prefix)
+        aliases = info.get("aliases")
+        if aliases:
+            cmd_desc += "\nAliasy: " + ", ".join(f"`{bot.prefix}{alias}`" for alias in aliases)
         embed.add_field(name=command_name, value=cmd_desc, inline=False)
     footer = (
         f"Użyj komendy {bot.prefix}help lub mnie @oznacz, aby pokazać tą wiadomość."
@@ -42,58 +59,120 @@ def get_help_message(message: Message) -> Embed or None:
     return embed
 
 
+def get_usage_message(command_name: str) -> str:
+    """Returns the text explaining how to use the given command, displayed on invalid arguments."""
+    info = INFO[command_name]
+    usage = info.get("usage") or info.get("description") or ""
+    return usage.format(p=bot.prefix, name=command_name)
+
+
+TIME_ARGUMENTS = (
+    Parameter("hour", parse_hour, None),
+    Parameter("minute", parse_minute, 0),
+)
+
 INFO: dict[str, dict[str, any]] = {
     "help": {"description": "Wyświetla tą wiadomość.", "function": get_help_message},
-    "nl": {"description": next_lesson.DESC, "function": next_lesson.get_next_lesson},
-    "nb": {"description": next_break.DESC, "function": next_break.get_next_break},
-    "plan": {"description": plan.DESC, "function": plan.get_lesson_plan},
-    "zad": {
-        "description": homework.DESC,
-        "function": homework.process_homework_events_alias,
+    "nl": {
+        "description": next_lesson.DESC,
+        "function": next_lesson.get_next_lesson,
+        "arguments": TIME_ARGUMENTS,
+        "usage": TIME_USAGE,
+    },
+    "nb": {
+        "description": next_break.DESC,
+        "function": next_break.get_next_break,
+        "arguments": TIME_ARGUMENTS,
+        "usage": TIME_USAGE,
+    },
+    "plan": {
+        "description": plan.DESC,
+        "function": plan.get_lesson_plan,
+        "arguments": (
+            Parameter("day", plan.parse_weekday, None),
+            Parameter("class_name", plan.parse_class_name, None),
+        ),
+        "usage": plan.USAGE,
+        "threaded": True,
     },
     "zadanie": {
         "description": homework.DESC_CREATE,
-        "function": homework.create_homework_event,
+        "function": homework.process_homework_events_alias,
+        "aliases": ("zad",),
+        "arguments": (
+            Parameter("action", str.lower, None),
+            Parameter("group", str, None),
+            Parameter("title", str, None, greedy=True),
+        ),
     },
     "zadania": {
         "description": homework.DESC_LIST,
         "function": homework.get_homework_events,
-        "on_completion": homework.wait_for_zadania_reaction,
     },
     "cena": {
         "description": steam_market.DESC,
         "function": steam_market.get_market_price,
+        "arguments": (
+            Parameter("item", greedy=True, label="przedmiot"),
+            Parameter("currency", str.upper, "PLN", keyword="waluta"),
+        ),
     },
     "sledz": {
         "description": steam_market.DESC_TRACK,
         "function": steam_market.start_market_tracking,
+        "arguments": (
+            Parameter("item", greedy=True, label="przedmiot"),
+            Parameter("min_price", steam_market.parse_price, keyword="min"),
+            Parameter("max_price", steam_market.parse_price, keyword="max"),
+        ),
+        "usage": steam_market.USAGE_TRACK,
     },
     "odsledz": {
         "description": steam_market.DESC_UNTRACK,
         "function": steam_market.stop_market_tracking,
+        "arguments": (Parameter("item", greedy=True, label="przedmiot"),),
     },
     "wyszukaj": {
         "description": steam_market.DESC_SEARCH,
         "function": steam_market.search_for_item,
+        "arguments": (Parameter("query", greedy=True, label="przedmiot"),),
     },
     "numerki": {
         "description": lucky_numbers.DESC,
         "function": lucky_numbers.get_lucky_numbers_embed,
-    },
-    "num": {
-        "description": "Alias komendy `{p}numerki`.",
-        "function": lucky_numbers.get_lucky_numbers_embed,
+        "aliases": ("num",),
+        "threaded": True,
     },
     "zast": {
         "description": substitutions.DESC,
         "function": substitutions.get_new_substitutions_embed,
         "on_completion": substitutions.announce_new_substitutions,
+        "threaded": True,
+    },
+    "meet": {
+        "description": meet.DESC,
+        "function": meet.update_meet_link,
+        "arguments": (Parameter("lesson", str, None), Parameter("link", str, None)),
     },
-    "meet": {"description": meet.DESC, "function": meet.update_meet_link},
     "exec": {
         "description": execute.DESC,
         "function": execute.exec_command_handler,
         "on_completion": execute.execute_code,
+        "arguments": (
+            Parameter("mode", execute.parse_mode, "loop", keyword="mode"),
+            Parameter("timeout", execute.parse_timeout, execute.DEFAULT_TIMEOUT, keyword="timeout"),
+            Parameter("expression", str, None, greedy=True),
+        ),
+    },
+    "profile": {
+        "description": profile.DESC,
+        "function": profile.profile_command_handler,
+        "on_completion": profile.profile_code,
+        "arguments": (
+            Parameter("top", profile.parse_top, profile.DEFAULT_TOP, keyword="top"),
+            Parameter("memory", profile.parse_flag, False, keyword="memory"),
+            Parameter("expression", str, None, greedy=True),
+        ),
     },
     "restart": {
         "description": terminate.DESC,
@@ -108,5 +187,22 @@ INFO: dict[str, dict[str, any]] = {
     "dumpfile": {
         "description": dump_file.DESC,
         "function": dump_file.read_file_contents,
+        "arguments": (Parameter("filename", str, dump_file.DEFAULT_FILENAME),),
     },
+    "logs": {
+        "description": logs.DESC,
+        "function": logs.search_logs_command_handler,
+        "on_completion": logs.send_matching_logs,
+        "arguments": (
+            Parameter("since", logs.parse_since, None, keyword="since"),
+            Parameter("until", logs.parse_until, None, keyword="until"),
+            Parameter("level", logs.parse_level, logs.DEFAULT_LEVEL, keyword="level"),
+            Parameter("text", str, None, greedy=True),
+        ),
+    },
+    "stats": {"description": stats.DESC, "function": stats.get_stats_embed},
+    "reload": {"description": reload.DESC, "function": reload.reload_command_modules},
 }
+
+# Maps each command name and alias to the name of the command
+ALIASES: dict[str, str] = router.compile_alias_table(INFO)
@@ -2,14 +2,16 @@
 
 # Standard library imports
 import datetime
-import asyncio
+from math import ceil
 
 # Third-party imports
-from discord import Member, Message, Embed, Reaction
+from discord import Guild, Interaction, Message, Embed
+from discord.ui import Button, View
 
 # Local application imports
-from modules import bot, Emoji, data_manager, ROLE_CODES, GROUP_NAMES
+from modules import bot, util, Emoji, data_manager, GROUP_NAMES
 from modules.commands import HomeworkEvent, HomeworkEventContainer
+from modules.commands.router import ParsedCommand
 
 
 DESC_CREATE = """Tworzy nowe zadanie i automatycznie ustawia powiadomienie na dzień przed.
@@ -19,72 +21,153 @@ DESC_CREATE = """Tworzy nowe zadanie i automatycznie ustawia powiadomienie na dz
     `{p}zad 31.12.2024 @Grupa 1 Zrób ćwiczenie 5` - stworzyłoby się zadanie na __31.12.2024__\
     dla grupy **pierwszej** z treścią: *Zrób ćwiczenie 5*.
     `{p}zad del 4` - usunęłoby się zadanie z ID: *event-id-4*."""
-DESC_LIST = "Wyświetla listę wszystkich zadań domowych utworzonych za pomocą komendy `{p}zad`."
-DESC = "Alias komendy `{p}zadanie` lub `{p}zadania`, w zależności od podanych argumentów."
+DESC_LIST = """Wyświetla listę wszystkich zadań domowych utworzonych za pomocą komendy `{p}zad`.
+    `{p}zadania archiwum [fraza]` - wyświetliłyby się zadania przeniesione do archiwum."""
+
+# Discord embeds can contain a maximum of 25 fields and 6000 characters,
+# so the events are listed in pages with limited title lengths.
+EVENTS_PER_PAGE = 10
+MAX_TITLE_LENGTH = 256
 
 
 homework_events = HomeworkEventContainer()
 
 
-def process_homework_events_alias(message: Message) -> str or Embed:
-    """Event handler for the 'zad' command."""
-    args = message.content.split()
-    if len(args) == 1:
-        return get_homework_events(message)
-    return create_homework_event(message)
+def process_homework_events_alias(
+    message: Message, command: ParsedCommand
+) -> str or Embed or tuple[Embed, View]:
+    """Event handler for the 'zadanie' command and its 'zad' alias.
+    Lists the homework events if no arguments are given, otherwise creates or deletes an event.
+    """
+    if command.params["action"] in (None, "archiwum"):
+        return get_homework_events(message, command)
+    return create_homework_event(message, command)
+
+
+def add_event_field(
+    embed: Embed, homework_event: HomeworkEvent, guild: Guild, with_event_ids: bool
+) -> None:
+    """Adds an embed field describing the given homework event."""
+    role_mention = util.get_group_mention(guild, homework_event.group)
+    if homework_event.reminder_is_active:
+        # The homework hasn't been marked as completed yet
+        event_reminder_hour = homework_event.reminder_time.hour
+        if event_reminder_hour == 17:
+            # The homework event hasn't been snoozed
+            field_name = homework_event.deadline
+        else:
+            # Shows an alarm clock emoji next to the event if it has been snoozed.
+            field_name = f"{homework_event.deadline} :alarm_clock: {event_reminder_hour:02}:00"
+    else:
+        # Show a check mark emoji next to the event if it has been marked as complete
+        field_name = f"~~{homework_event.deadline}~~ :ballot_box_with_check:"
 
+    title = homework_event.title
+    if len(title) > MAX_TITLE_LENGTH:
+        title = title[:MAX_TITLE_LENGTH - 1] + "…"
+    field_value = f"**{title}**\n"\
+                  f"Zadanie dla {role_mention} (stworzone przez <@{homework_event.author_id}>)"
+    if with_event_ids:
+        field_value += f"\n*ID: {homework_event.id_string}*"
+    embed.add_field(name=field_name, value=field_value, inline=False)
 
-def get_homework_events(message: Message, with_event_ids=False) -> str or Embed:
-    """Event handler for the 'zadania' command."""
-    data_manager.read_data_file()
+
+def render_homework_page(
+    guild: Guild, page: int, with_event_ids: bool = False
+) -> str or tuple[Embed, View]:
+    """Renders a single page of the homework events list.
+
+    Only the events on the requested page are formatted. The page number is clamped to the valid
+    range, since the list may have changed since the page buttons were sent.
+
+    Returns the embed along with the view containing the page navigation buttons.
+    """
     amount_of_homeworks = len(homework_events)
-    if amount_of_homeworks > 0:
-        embed = Embed(
-            title="Zadania", description=f"Lista zadań ({amount_of_homeworks}) jest następująca:")
-    else:
+    if amount_of_homeworks == 0:
         return (f"{Emoji.INFO} Nie ma jeszcze żadnych zadań. "
                 f"Możesz je tworzyć za pomocą komendy `{bot.prefix}zadanie`.")
+    num_pages = ceil(amount_of_homeworks / EVENTS_PER_PAGE)
+    page = min(max(page, 0), num_pages - 1)
+    embed = Embed(
+        title="Zadania", description=f"Lista zadań ({amount_of_homeworks}) jest następująca:")
+
+    # Adds an embed field for each event on the page
+    first_event = page * EVENTS_PER_PAGE
+    for homework_event in homework_events[first_event:first_event + EVENTS_PER_PAGE]:
+        add_event_field(embed, homework_event, guild, with_event_ids)
+    embed.set_footer(text=f"Strona {page + 1}/{num_pages}. "
+                          f"Użyj komendy {bot.prefix}zadania, aby pokazać tą wiadomość.")
+
+    # The button states are encoded in their custom IDs; see `handle_homework_page_button`
+    ids_flag = int(with_event_ids)
+    view = View(timeout=None)
+    view.add_item(Button(emoji="\N{BLACK LEFT-POINTING TRIANGLE}", disabled=page == 0,
+                         custom_id=f"zadania:{page - 1}:{ids_flag}"))
+    view.add_item(Button(emoji="\N{BLACK RIGHT-POINTING TRIANGLE}",
+                         disabled=page == num_pages - 1,
+                         custom_id=f"zadania:{page + 1}:{ids_flag}"))
+    view.add_item(Button(emoji=Emoji.UNICODE_DETECTIVE, label="ID",
+                         custom_id=f"zadania:{page}:{1 - ids_flag}"))
+    return embed, view
+
+
+def get_homework_events(
+    message: Message, command: ParsedCommand, with_event_ids=False
+) -> str or Embed or tuple[Embed, View]:
+    """Event handler for the 'zadania' command."""
+    if command.args and command.args[0] == "archiwum":
+        return get_archived_homework_events(message, command, with_event_ids)
+    data_manager.read_data_file()
+    return render_homework_page(message.guild, 0, with_event_ids)
 
-    # Adds an embed field for each event
-    for homework_event in homework_events:
-        group_role_name = ROLE_CODES[homework_event.group]
-        # Defaults to setting @everyone as the group the homework event is for
-        role_mention = "@everyone"
-        if group_role_name != "everyone":
-            # Adjusts the mention string if the homework event is not for everyone
-            for role in message.guild.roles:
-                if str(role) == group_role_name:
-                    # Sets the role_mention variable to a valid Discord user mention string.
-                    role_mention = f"<@&{role.id}>"
-                    break
-        if homework_event.reminder_is_active:
-            # The homework hasn't been marked as completed yet
-            event_reminder_hour = homework_event.reminder_date.split()[1]
-            if event_reminder_hour == '17':
-                # The homework event hasn't been snoozed
-                field_name = homework_event.deadline
-            else:
-                # Shows an alarm clock emoji next to the event if it has been snoozed.
-                field_name = f"{homework_event.deadline} :alarm_clock: {event_reminder_hour}:00"
-        else:
-            # Show a check mark emoji next to the event if it has been marked as complete
-            field_name = f"~~{homework_event.deadline}~~ :ballot_box_with_check:"
-
-        field_value = f"**{homework_event.title}**\n"\
-                      f"Zadanie dla {role_mention} (stworzone przez <@{homework_event.author_id}>)"
-        if with_event_ids:
-            field_value += f"\n*ID: event-id-{homework_event.event_id}*"
-        embed.add_field(name=field_name, value=field_value, inline=False)
+
+async def handle_homework_page_button(
+    interaction: Interaction, page: str, with_event_ids: str
+) -> None:
+    """Interaction handler for the page navigation buttons of the homework events list."""
+    reply = render_homework_page(interaction.guild, int(page), with_event_ids == "1")
+    if isinstance(reply, str):
+        await interaction.response.edit_message(content=reply, embed=None, view=None)
+        return
+    embed, view = reply
+    await interaction.response.edit_message(embed=embed, view=view)
+
+
+def get_archived_homework_events(
+    message: Message, command: ParsedCommand, with_event_ids=False
+) -> str or Embed:
+    """Event handler for the 'zadania archiwum' command.
+
+    Lists the most recently archived homework events, optionally filtered by a phrase contained
+    in their titles.
+    """
+    query = command.text.split(maxsplit=1)[1:]
+    query = query[0].lower() if query else ""
+    archived_events = []
+    for record in data_manager.read_homework_archive():
+        homework_event = HomeworkEvent(*record["event"].values())
+        if query not in homework_event.title.lower():
+            continue
+        homework_event.event_id = record["event_id"].replace("event-id-", "")
+        archived_events.append(homework_event)
+    if not archived_events:
+        return f"{Emoji.INFO} W archiwum nie ma żadnych pasujących zadań."
+    shown_events = archived_events[-EVENTS_PER_PAGE:]
+    desc = (f"Zadania przeniesione do archiwum {data_manager.ARCHIVE_AFTER_DAYS} dni po terminie "
+            f"(pokazuję {len(shown_events)} z {len(archived_events)}):")
+    embed = Embed(title="Archiwum zadań", description=desc)
+    for homework_event in reversed(shown_events):
+        add_event_field(embed, homework_event, message.guild, with_event_ids)
     embed.set_footer(
-        text=f"Użyj komendy {bot.prefix}zadania, aby pokazać tą wiadomość.")
+        text=f"Użyj komendy {bot.prefix}zadania archiwum [fraza], aby pokazać tą wiadomość.")
     return embed
 
 
-def create_homework_event(message: Message) -> str:
-    """Event handler for the 'zadanie' command."""
-    args = message.content.split()
-    if args[1] == "del":
-        user_inputted_id = args[2].replace("event-id-", "")
+def create_homework_event(message: Message, command: ParsedCommand) -> str:
+    """Creates or deletes a homework event according to the 'zadanie' command's arguments."""
+    deadline, group, title = (command.params[key] for key in ("action", "group", "title"))
+    if deadline == "del":
+        user_inputted_id = (group or "").replace("event-id-", "")
         try:
             deleted_event = delete_homework_event(int(user_inputted_id))
         except ValueError:
@@ -94,40 +177,36 @@ def create_homework_event(message: Message) -> str:
             msg = f"{Emoji.CHECK} Usunięto zadanie z treścią: `{deleted_event}`"
         return msg
     try:
-        datetime.datetime.strptime(args[1], "%d.%m.%Y")
+        datetime.datetime.strptime(deadline, "%d.%m.%Y")
     except ValueError:
         return f"{Emoji.WARNING} Pierwszym argumentem musi być data o formacie: `DD.MM.YYYY`."
 
-    if len(args) < 4:
+    if title is None:
         return (f"{Emoji.WARNING} Należy napisać po komendzie `{bot.prefix}zad` termin "
                 f"oddania zadania, oznaczenie grupy, dla której jest zadanie oraz jego "
                 f"treść, lub 'del' i ID zadania, którego się chce usunąć.")
     group_text: str = ""
-    if args[2] == "@everyone":
+    if group == "@everyone":
         group_id = "grupa_0"
     else:
         # Removes redundant characters from the second argument in order to have just the role id
-        group_id: str = "".join(filter(str.isdigit, args[2]))
+        group_id: str = "".join(filter(str.isdigit, group))
         try:
-            role = message.guild.get_role(int(group_id))  # Can raise ValueError
-            for group_code, role_name in ROLE_CODES.items():
-                if role_name == str(role):
-                    group_id = group_code
-                    group_text = GROUP_NAMES[group_code] + " "
-                    break
-            else:
+            group_code = util.get_group_code(message.guild, int(group_id))  # Can raise ValueError
+            if group_code is None:
                 raise KeyError
+            group_id = group_code
+            group_text = GROUP_NAMES[group_code] + " "
         except (ValueError, KeyError):
             bot.send_log("Invalid homework event group ID", group_id, force=True)
             return (f"{Emoji.WARNING} Drugim argumentem musi być oznaczenie grupy,"
                     f" dla której jest zadanie. Podana grupa jest niedozwolona.")
-    title = " ".join(args[3:])
-    new_event = HomeworkEvent(title, group_id, message.author.id, args[1] + " 17")
-    if new_event.serialised in homework_events:
+    new_event = HomeworkEvent(title, group_id, message.author.id, deadline + " 17")
+    if new_event in homework_events:
         return f"{Emoji.WARNING} Takie zadanie już istnieje."
     new_event.sort_into_container(homework_events)
     data_manager.save_data_file()
-    return (f"{Emoji.CHECK} Stworzono zadanie na __{args[1]}__ z tytułem: `{title}`"
+    return (f"{Emoji.CHECK} Stworzono zadanie na __{deadline}__ z tytułem: `{title}`"
             f" {group_text}z powiadomieniem na dzień przed o **17:00.**")
 
 
@@ -143,27 +222,3 @@ def delete_homework_event(event_id: int) -> str:
             data_manager.save_data_file()
             return event.title
     raise ValueError
-
-
-async def wait_for_zadania_reaction(original_msg: Message, reply_msg: Message) -> None:
-    """Callback function for the 'zadania' command.
-
-    Reacts to the previously sent embedwith the detective emoji.
-    If somebody else reacts with that emoji, it edits that embed to contain homework event IDs.
-    """
-    def check_for_valid_reaction(test_reaction: Reaction, reaction_author: Member) -> bool:
-        """Util function for validating the reaction.
-        Returns a boolean indicating if the emoji was correct and the user was someone else."""
-        reaction_valid = str(test_reaction.emoji) == Emoji.UNICODE_DETECTIVE
-        return reaction_valid and reaction_author != bot.client.user
-
-    await reply_msg.add_reaction(Emoji.UNICODE_DETECTIVE)
-    try:
-        await bot.client.wait_for('reaction_add', timeout=10.0, check=check_for_valid_reaction)
-    except asyncio.TimeoutError:
-        # 10 seconds have passed with no user input
-        await reply_msg.clear_reactions()
-    else:
-        # Someone has added detective reaction to message
-        await reply_msg.clear_reactions()
-        await reply_msg.edit(embed=get_homework_events(original_msg, True))
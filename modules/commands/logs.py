@@ -0,0 +1,126 @@
+"""Module containing the code pertaining to the 'logs' command.
+
+Searches the bot's log files by time range, level and substring, and sends the matching entries as
+an attachment. The files are searched using `log_index`, so only the parts of them covering the time
+range are read.
+"""
+
+# Standard library imports
+import asyncio
+import re
+from datetime import datetime, timedelta
+
+# Third-party imports
+import discord
+
+# Local application imports
+from modules import bot, log_index
+from modules.commands import ensure_user_authorised
+from modules.commands.router import ParsedCommand
+
+
+DESC = None
+SEARCHING_MSG = "Searching the logs..."
+NO_MATCHES_MSG = "No matching log entries."
+DEFAULT_LEVEL = log_index.LEVELS[0]
+RELATIVE_TIME_PATTERN = re.compile(r"(\d+)([mhd])")
+RELATIVE_TIME_UNITS = {"m": "minutes", "h": "hours", "d": "days"}
+ABSOLUTE_TIME_FORMATS = ("%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%M", "%Y-%m-%d")
+
+
+def parse_time(value: str, end_of_day: bool = False) -> datetime:
+    """Converts a time argument into a datetime.
+
+    Arguments:
+        value -- a duration before now (e.g. '30m', '2h', '1d'), a time today (e.g. '08:00'), or a
+        date optionally followed by a time (e.g. '2022-09-01' or '2022-09-01T08:00').
+        end_of_day -- if True, a date without a time means the end of that day instead of its start.
+    """
+    match = RELATIVE_TIME_PATTERN.fullmatch(value)
+    if match:
+        amount, unit = match.groups()
+        return datetime.now() - timedelta(**{RELATIVE_TIME_UNITS[unit]: int(amount)})
+    try:
+        time_today = datetime.strptime(value, "%H:%M").time()
+    except ValueError:
+        pass
+    else:
+        return datetime.combine(datetime.now(), time_today)
+    for time_format in ABSOLUTE_TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(value, time_format)
+        except ValueError:
+            continue
+        if end_of_day and time_format == "%Y-%m-%d":
+            parsed += timedelta(days=1, seconds=-1)
+        return parsed
+    raise ValueError(
+        f"`{value}` is not a valid time. "
+        "Use e.g. `2h`, `08:00`, `2022-09-01` or `2022-09-01T08:00`."
+    )
+
+
+def parse_since(value: str) -> datetime:
+    """Converts the 'since' argument into a datetime."""
+    return parse_time(value)
+
+
+def parse_until(value: str) -> datetime:
+    """Converts the 'until' argument into a datetime. A date includes the whole day."""
+    return parse_time(value, end_of_day=True)
+
+
+def parse_level(value: str) -> str:
+    """Checks that the 'level' argument is a valid level."""
+    level = value.lower()
+    if level not in log_index.LEVELS:
+        raise ValueError(f"The level must be one of: {', '.join(log_index.LEVELS)}.")
+    return level
+
+
+def format_criteria(command: ParsedCommand) -> str:
+    """Returns the description of the search criteria."""
+    params = command.params
+    criteria = [f"level >= {params['level']}"]
+    if params["since"] is not None:
+        criteria.append(f"since {params['since']:%Y-%m-%d %H:%M:%S}")
+    if params["until"] is not None:
+        criteria.append(f"until {params['until']:%Y-%m-%d %H:%M:%S}")
+    if params["text"]:
+        criteria.append(f"containing '{params['text']}'")
+    return ", ".join(criteria)
+
+
+def search_logs_command_handler(message: discord.Message, command: ParsedCommand) -> str:
+    """Event handler for the 'logs' command."""
+    ensure_user_authorised(message, owner_only=True)
+    params = command.params
+    if params["since"] and params["until"] and params["since"] > params["until"]:
+        return "The start of the time range must be before its end."
+    return f"{SEARCHING_MSG} ({format_criteria(command)})"
+
+
+async def send_matching_logs(
+    _: discord.Message, reply_msg: discord.Message, command: ParsedCommand
+) -> None:
+    """Callback function for the 'logs' command. Executes after the bot replies initially."""
+    if not reply_msg.content.startswith(SEARCHING_MSG):
+        return
+    params = command.params
+    chnl: discord.TextChannel = reply_msg.channel
+    async with chnl.typing():
+        # The files are read in a separate thread so that the event loop isn't blocked
+        result = await asyncio.to_thread(
+            log_index.search, params["since"], params["until"], params["level"], params["text"]
+        )
+    summary = (
+        f"Found {result.num_matches} matching entries in {result.files_searched} log file(s); "
+        f"skipped {result.files_skipped} file(s) outside of the time range."
+    )
+    if result.num_omitted:
+        summary += f" The earliest {result.num_omitted} entries were omitted."
+    await reply_msg.edit(content=f"{reply_msg.content}\n{summary}")
+    if result.num_matches == 0:
+        await chnl.send(NO_MATCHES_MSG)
+        return
+    await chnl.send(file=bot.make_attachment(result.text, "logs.txt"))
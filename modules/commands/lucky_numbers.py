@@ -4,26 +4,42 @@
 from datetime import datetime
 
 # Third-party imports
-from discord import Message, Embed
+from discord import Embed, Message
 from corny_commons import util as ccutil
 from corny_commons.util import web
 
 # Local application imports
 from modules import bot, util, MEMBER_IDS
+from modules.api import cache
 from modules.api.lucky_numbers import get_lucky_numbers
+from modules.commands import render_cache
+from modules.commands.router import ParsedCommand
 
 
 DESC = """Podaje aktualne szczęśliwe numerki oraz klasy, które są z nich wykluczone."""
 
 
-def get_lucky_numbers_embed(_: Message = None) -> Embed or str:
-    """Event handler for the 'num' command."""
+# pylint: disable-next=unused-argument
+def get_lucky_numbers_embed(
+    _: Message = None, command: ParsedCommand = None
+) -> Embed or str:
+    """Event handler for the 'num' command.
+
+    Also called without arguments when the lucky numbers are updated.
+    """
+    # The version is read first, so at worst the new data is paired with the previous version
+    data_version = cache.get_version("lucky_numbers")
     try:
         data = get_lucky_numbers()
     except web.WebException as web_exc:
         exc: str = ccutil.format_exception_info(web_exc)
         bot.send_log(f"{bot.BAD_RESPONSE}{exc}", force=True)
         return util.get_error_message(web_exc)
+    return render_cache.get_embed("numerki", (), data_version, lambda: render_embed(data))
+
+
+def render_embed(data: dict[str, any]) -> Embed:
+    """Renders the embed containing the given lucky numbers data."""
     date_str: str = datetime.strftime(data["date"], "%d.%m.%Y")
     msg = f"Szczęśliwe numerki na {date_str}:"
     embed = Embed(title="Szczęśliwe numerki", description=msg)
@@ -9,6 +9,7 @@ from discord import Message
 # Local application imports
 from modules import bot, util, data_manager, Emoji
 from modules.commands import ensure_user_authorised
+from modules.commands.router import ParsedCommand
 
 
 DESC = None
@@ -24,36 +25,36 @@ class InvalidFormatException(Exception):
         super().__init__(self.message)
 
 
-def update_meet_link(message: Message) -> str:
+def update_meet_link(message: Message, command: ParsedCommand) -> str:
     """Event handler for the 'meet' command."""
-    args = message.content.split(" ")[1:]
+    lesson_code, new_link = command.params["lesson"], command.params["link"]
     try:
-        if not args:
+        if not lesson_code:
             # Display codes list if there are no arguments specified
             raise ValueError
-        if args[0] not in util.lesson_links:
+        if lesson_code not in util.lesson_links:
             # Display codes list if the code is invalid
             raise ValueError
-        lesson_name = util.get_lesson_name(args[0])
-        link = util.get_lesson_link(args[0])
-        if len(args) == 1:
+        lesson_name = util.get_lesson_name(lesson_code)
+        link = util.get_lesson_link(lesson_code)
+        if new_link is None:
             link_desc = f"to <https://meet.google.com/{link}>" if link else "nie jest ustawiony"
             return f"{Emoji.INFO} Link do Meeta dla lekcji '__{lesson_name}__' {link_desc}."
         else:
             ensure_user_authorised(message, "zmieniania linków Google Meet")
-            if not re.match(LINK_PATTERN, args[1]):
+            if not re.match(LINK_PATTERN, new_link):
                 # Display codes list if the specified link is of invalid format
-                raise InvalidFormatException(args[1])
+                raise InvalidFormatException(new_link)
             # User-given link is valid
-            util.lesson_links[args[0]] = args[1]
+            util.lesson_links[lesson_code] = new_link
             data_manager.save_data_file()
             return (f"{Emoji.CHECK} Zmieniono link dla lekcji '__{lesson_name}__'"
-                    f" z `{link}` na **{args[1]}**.")
+                    f" z `{link}` na **{new_link}**.")
     except InvalidFormatException:
         # noinspection SpellCheckingInspection
         invalid_format_msg = (f":warning: Uwaga: link do Meeta powinien mieć formę `xxx-xxxx-xxx`"
                               f" bądź `lookup/xxxxxxxxxx`.\n"
-                              f"Argument '__{args[1]}__' nie spełnia tego wymogu.")
+                              f"Argument '__{new_link}__' nie spełnia tego wymogu.")
         return invalid_format_msg
     except ValueError:
         msg = f"Należy napisać po komendzie `{bot.prefix}meet` kod lekcji, " + \
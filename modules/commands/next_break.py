@@ -1,7 +1,6 @@
 """Module containing code relating to the 'nb' command."""
 
 # Standard library imports
-from datetime import datetime
 from math import ceil
 
 # Third-party imports
@@ -15,6 +14,7 @@ from modules.commands import (
     get_lesson_by_roles,
     get_next_period,
 )
+from modules.commands.router import ParsedCommand
 
 
 DESC = """Mówi kiedy jest następna przerwa.
@@ -23,13 +23,9 @@ DESC = """Mówi kiedy jest następna przerwa.
     *Domyślnie pokazana jest najbliższa przerwa od aktualnego czasu*"""
 
 
-def get_next_break(message: Message) -> str:
+def get_next_break(message: Message, command: ParsedCommand) -> str:
     """Event handler for the 'nb' command."""
-    time = get_datetime_from_input(message, "nb")
-    if not isinstance(time, datetime):
-        # The get_datetime_from_input() function returned an error message
-        return time
-
+    time = get_datetime_from_input(command)
     next_period_is_today, lesson_period = get_next_period(time)[:2]
 
     if next_period_is_today:
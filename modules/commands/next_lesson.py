@@ -15,6 +15,7 @@ from modules.commands import (
     get_next_period,
     get_lesson_by_roles,
 )
+from modules.commands.router import ParsedCommand
 
 
 DESC = """Mówi jaką mamy następną lekcję.
@@ -23,12 +24,9 @@ DESC = """Mówi jaką mamy następną lekcję.
     *Domyślnie pokazana jest najbliższa lekcja od aktualnego czasu*"""
 
 
-def get_next_lesson(message: Message) -> str or Embed:
+def get_next_lesson(message: Message, command: ParsedCommand) -> str or Embed:
     """Event handler for the 'nl' command."""
-    time = get_datetime_from_input(message, "nl")
-    if not isinstance(time, datetime):
-        return time
-
+    time = get_datetime_from_input(command)
     def process(time: datetime) -> tuple[str, str]:
         # next_lesson_is_today, lesson_period, weekday_index = get_next_period(time)
         next_lesson = get_next_period(time)
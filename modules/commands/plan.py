@@ -10,9 +10,14 @@ from corny_commons.util import web
 # Local application imports
 from modules import bot, util, Weekday, Emoji, WEEKDAY_NAMES
 from modules.api import lesson_plan
-from modules.commands import get_lessons_dp
+from modules.commands import get_lessons_dp, render_cache
+from modules.commands.router import ParsedCommand
 
 
+USAGE = (
+    "Należy napisać po komendzie `{p}plan` numer dnia (1-5) bądź dzień tygodnia, "
+    "lub zostawić parametry komendy puste. Drugim opcjonalnym argumentem jest nazwa klasy."
+)
 DESC = """Pokazuje plan lekcji dla danego dnia, domyślnie dla naszej klasy na dzień dzisiejszy.
     Parametry: __dzień tygodnia__, __nazwa klasy__
     Przykłady:
@@ -79,7 +84,19 @@ def format_lesson_plan(
 
 
 def format_lesson_plan_dp(query_day: int) -> str or Embed:
-    """Formats the lesson plan for DP."""
+    """Formats the lesson plan for DP, reusing the rendered embed if the plan has not changed."""
+    # The current lesson is highlighted, so the embed for today also depends on the current period
+    current_period = util.current_period if query_day == datetime.now().weekday() else None
+    return render_cache.get_embed(
+        "plan",
+        (query_day, current_period),
+        util.static_data_version,
+        lambda: render_lesson_plan_dp(query_day),
+    )
+
+
+def render_lesson_plan_dp(query_day: int) -> Embed:
+    """Renders the embed containing the lesson plan for DP."""
     embed = Embed(
         title=f"Plan lekcji dla {util.OUR_CLASS}",
         description=f"Wyświetlam plan na **{get_weekday(query_day)}**.",
@@ -95,58 +112,59 @@ def format_lesson_plan_dp(query_day: int) -> str or Embed:
     return embed
 
 
-def get_lesson_plan(message: Message) -> str or Embed:
+def parse_weekday(value: str) -> int:
+    """Argument converter for the day of the week. Accepts a day number (1-5), an abbreviation
+    such as 'pn' or the start of a weekday name.
+
+    Returns the index of the weekday. Raises ValueError if the input is invalid.
+    """
+    try:
+        return {"pn": 0, "śr": 2, "sr": 2, "pt": 4}[value]
+    except KeyError:
+        pass
+    try:
+        # Check if the input is a number
+        day_number = int(value)
+    except ValueError:
+        # The input is not a number.
+        # Check if it is a day of the week
+        for i, weekday in enumerate(WEEKDAY_NAMES):
+            if weekday.lower().startswith(value.lower()):
+                # The input is a valid weekday name.
+                return i
+        raise ValueError(f"`{value}` nie jest dniem tygodnia.") from None
+    if not 1 <= day_number <= 5:
+        # It is, but of invalid format
+        raise ValueError(f"`{value}` nie jest liczbą od 1 do 5.")
+    return day_number - 1
+
+
+def parse_class_name(value: str) -> str:
+    """Argument converter for class names. Raises ValueError if the class does not exist."""
+    try:
+        lesson_plan.get_plan_id(value)
+    except ValueError:
+        raise ValueError(f"Klasa `{value}` nie istnieje.") from None
+    return value.lower()
+
+
+def get_lesson_plan(message: Message, command: ParsedCommand) -> str or Embed:
     """Event handler for the 'plan' command."""
-    args: list[str] = message.content.split(" ")
-    today = datetime.now().weekday()
-    query_day = today if today < Weekday.SATURDAY else Weekday.MONDAY
-    if len(args) > 1:
-        query_day = -1
-        # This 'try' clause raises RuntimeError if the input is invalid for whatever reason
+    query_day = command.params["day"]
+    if query_day is None:
+        today = datetime.now().weekday()
+        query_day = today if today < Weekday.SATURDAY else Weekday.MONDAY
+    class_code = command.params["class_name"]
+    if class_code is not None:
         try:
-            try:
-                query_day = {"pn": 0, "śr": 2, "sr": 2, "pt": 4}[args[1]]
-            except KeyError:
-                try:
-                    # Check if the input is a number
-                    if not 1 <= int(args[1]) <= 5:
-                        # It is, but of invalid format
-                        err_msg = f"{args[1]} is not a number between 1 and 5."
-                        raise RuntimeError(err_msg) from None
-                    # It is, and of correct format
-                    query_day = int(args[1]) - 1
-                except ValueError:
-                    # The input is not a number.
-                    # Check if it is a day of the week
-                    for i, weekday in enumerate(WEEKDAY_NAMES):
-                        if weekday.lower().startswith(args[1].lower()):
-                            # The input is a valid weekday name.
-                            query_day = i
-                            break
-                    # 'query_day' == -1 if there are no matched lessons from the above loop.
-                    if query_day == -1:
-                        # The input is not a valid weekday name.
-                        # ValueError can't be used since it has already been caught
-                        err_msg = f"invalid weekday name: {args[1]}"
-                        raise RuntimeError(err_msg) from None
-            if len(args) > 2:
-                try:
-                    plan_id = lesson_plan.get_plan_id(args[2])
-                except ValueError:
-                    raise RuntimeError(f"invalid class name: {args[2]}") from None
-                else:
-                    class_code = args[2].lower()
-                    try:
-                        plan, _ = lesson_plan.get_lesson_plan(plan_id)
-                    except web.WebException as web_exc:
-                        # Invalid web response
-                        return util.get_error_message(web_exc)
-                    return format_lesson_plan(plan, query_day, class_code)
-        except RuntimeError:
-            return (
-                f"{Emoji.WARNING} Należy napisać po komendzie `{bot.prefix}plan` numer "
-                f"dnia (1-5) bądź dzień tygodnia, lub zostawić parametry komendy puste."
-                f" Drugim opcjonalnym argumentem jest nazwa klasy."
-            )
-
+            snapshot = lesson_plan.get_lesson_plan_snapshot(class_code)
+        except web.WebException as web_exc:
+            # Invalid web response
+            return util.get_error_message(web_exc)
+        embed = format_lesson_plan(snapshot.data, query_day, class_code)
+        if isinstance(embed, Embed):
+            # The age is shown since the plan may be served while it's being refreshed
+            footer = f"{embed.footer.text} Dane pobrano {snapshot.format_age()}."
+            embed.set_footer(text=footer)
+        return embed
     return format_lesson_plan_dp(query_day)
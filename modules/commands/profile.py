@@ -0,0 +1,154 @@
+"""Module containing the code pertaining to the 'profile' command.
+
+The code is executed in the same way as by the 'exec' command, but under cProfile and optionally
+tracemalloc. The profiler is enabled for as long as the code is awaited, so any other tasks that
+run on the event loop in the meantime also appear in the report.
+
+The profiling modules are only imported when the command is first used, to keep the start-up fast.
+"""
+
+# Standard library imports
+import io
+import time
+
+# Third-party imports
+import discord
+
+# Local application imports
+from modules import bot
+from modules.commands import ensure_user_authorised, exec as execute
+from modules.commands.router import ParsedCommand
+
+
+DESC = None
+MISSING_ARGUMENTS_MSG = "Type an expression or command to profile."
+ALREADY_PROFILING_MSG = "Another profile is already in progress."
+# The default number of functions and allocation sites included in the report
+DEFAULT_TOP = 25
+# The number of stack frames stored for each allocation when tracing memory
+TRACEMALLOC_FRAMES = 5
+
+_is_profiling: bool = False
+
+
+def parse_top(value: str) -> int:
+    """Converts the 'top' argument into a positive integer."""
+    try:
+        top = int(value)
+    except ValueError:
+        raise ValueError(f"`{value}` is not a valid number of entries.") from None
+    if top < 1:
+        raise ValueError("The number of entries must be positive.")
+    return top
+
+
+def parse_flag(value: str) -> bool:
+    """Converts a boolean keyword argument such as 'memory=yes' into a boolean."""
+    return value.lower() in ("1", "true", "yes", "on", "tak")
+
+
+class Profiler:
+    """Wraps the execution of the code in cProfile and optionally tracemalloc.
+
+    Attributes:
+        top -- the number of functions and allocation sites included in the report.
+        trace_memory -- a boolean indicating if the memory allocations are traced.
+        report -- the text of the report, generated once the code has been executed.
+    """
+
+    def __init__(self, top: int, trace_memory: bool) -> None:
+        self.top: int = top
+        self.trace_memory: bool = trace_memory
+        self.report: str = None
+
+    async def __call__(self, coroutine) -> any:
+        """Awaits the coroutine under the profilers and generates the report."""
+        import cProfile  # pylint: disable=import-outside-toplevel
+        import tracemalloc  # pylint: disable=import-outside-toplevel
+
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        memory_before = tracemalloc.take_snapshot() if self.trace_memory else None
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            return await coroutine
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - start
+            memory_after = tracemalloc.take_snapshot() if self.trace_memory else None
+            if started_tracing:
+                tracemalloc.stop()
+            self.report = self.format_report(profiler, duration, memory_before, memory_after)
+
+    def format_report(
+        self,
+        profiler: "cProfile.Profile",
+        duration: float,
+        memory_before: "tracemalloc.Snapshot" = None,
+        memory_after: "tracemalloc.Snapshot" = None,
+    ) -> str:
+        """Returns the text of the report containing the top functions and allocation sites."""
+        import pstats  # pylint: disable=import-outside-toplevel
+        import tracemalloc  # pylint: disable=import-outside-toplevel
+
+        stream = io.StringIO()
+        stream.write(f"Wall time: {duration:.3f} s\n\n")
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        if memory_before is not None:
+            # Excludes the allocations made by the profiler itself from the report
+            filters = (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            )
+            memory_before = memory_before.filter_traces(filters)
+            memory_after = memory_after.filter_traces(filters)
+            differences = memory_after.compare_to(memory_before, "lineno")
+            stream.write(f"\nTop {self.top} allocation sites by size difference:\n")
+            for difference in differences[: self.top]:
+                stream.write(f"{difference}\n")
+        return stream.getvalue()
+
+
+def profile_command_handler(message: discord.Message, command: ParsedCommand) -> str:
+    """Event handler for the 'profile' command."""
+    ensure_user_authorised(message, owner_only=True)
+    expression = command.params["expression"]
+    if expression is None:
+        return MISSING_ARGUMENTS_MSG
+    if _is_profiling:
+        return ALREADY_PROFILING_MSG
+    fmt_expr = expression.replace("\n", "\n>>> ")
+    return f"Code profiling...\n```py\n>>> {fmt_expr}```"
+
+
+async def profile_code(
+    original_msg: discord.Message, reply_msg: discord.Message, command: ParsedCommand
+) -> None:
+    """Callback function for the 'profile' command. Executes after the bot replies initially."""
+    global _is_profiling  # pylint: disable=global-statement
+    if reply_msg.content in (MISSING_ARGUMENTS_MSG, ALREADY_PROFILING_MSG):
+        return
+    # Only one profiler can be active at a time. Another profile may have started after the handler
+    # checked the flag, so it's checked again; there is no await between the check and setting it.
+    if _is_profiling:
+        await reply_msg.edit(content=ALREADY_PROFILING_MSG)
+        return
+    _is_profiling = True
+    profiler = Profiler(command.params["top"], command.params["memory"])
+    chnl: discord.TextChannel = reply_msg.channel
+    try:
+        async with chnl.typing():
+            exec_result = await execute.process_execution(
+                original_msg, command.params["expression"], wrapper=profiler
+            )
+    finally:
+        _is_profiling = False
+    new_content = reply_msg.content.replace("profiling...", "profiled!")
+    await reply_msg.edit(content=new_content)
+    await bot.try_send_message(chnl, exec_result)
+    if profiler.report is not None:
+        await chnl.send(file=bot.make_attachment(profiler.report, "profile.txt"))
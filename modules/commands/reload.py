@@ -0,0 +1,174 @@
+"""Module containing the code pertaining to the 'reload' command.
+
+Reloads the command and web API modules in place, so that code changes take effect without
+restarting the bot and reconnecting to Discord. The modules are reloaded with `importlib.reload`,
+which updates the existing module objects, so the references held by the modules that aren't
+reloaded (e.g. `bot`) stay valid and the command handlers are looked up in the new `get_help.INFO`.
+
+The client, the web API caches, the periodic tasks and the metrics are kept, since the modules
+that hold them are not reloaded. The state held by the reloaded modules is carried over: the
+module-level variables in `PRESERVED_VARIABLES` are restored, and the homework events and tracked
+items are re-created in memory as instances of the reloaded classes. The tables of the functions
+held by the modules that aren't reloaded, i.e. the interaction handlers and the periodic tasks, are
+rebuilt so that they call the reloaded code.
+"""
+
+# Standard library imports
+import importlib
+import sys
+import time
+
+# Third-party imports
+from corny_commons import util as ccutil
+from discord import Message
+
+# Local application imports
+from modules import bot, commands, periodic, startup, util
+from modules.commands import ensure_user_authorised, render_cache
+from modules.commands.router import ParsedCommand
+
+DESC = None
+
+# The modules that are reloaded before the command modules, in dependency order
+RELOADED_MODULES = (
+    "modules.util",
+    "modules.api.endpoints",
+    "modules.api.lesson_plan",
+    "modules.api.substitutions",
+    "modules.api.lucky_numbers",
+    "modules.api.steam_market",
+    "modules.commands.router",
+    "modules.commands",
+)
+# The modules that hold state which can't be carried over, and this module itself
+NOT_RELOADED_MODULES = (
+    "modules.api.cache",
+    "modules.api.single_flight",
+    "modules.api.snapshots",
+    "modules.commands.render_cache",
+    "modules.commands.reload",
+)
+# Reloaded last, since it builds the command information from the other command modules
+HELP_MODULE = "modules.commands.get_help"
+# The module-level variables of the reloaded modules that are restored after reloading
+PRESERVED_VARIABLES = {
+    "modules.util": (
+        "lesson_plan",
+        "lesson_plan_dp",
+        "lesson_links",
+        "teacher_subjects",
+        "period_boundaries",
+        "static_data_version",
+        "current_period",
+        "next_period",
+        "group_role_ids",
+        "role_group_codes",
+    ),
+    "modules.api.endpoints": ("_overrides",),
+    "modules.commands.profile": ("_is_profiling",),
+}
+# The number of slowest modules listed in the report
+REPORT_SLOWEST = 5
+
+
+def get_module_names() -> list[str]:
+    """Returns the names of the modules to reload, in the order they should be reloaded."""
+    command_modules = sorted(
+        name
+        for name in sys.modules
+        if name.startswith("modules.commands.")
+        and name not in NOT_RELOADED_MODULES
+        and name != HELP_MODULE
+    )
+    return [*RELOADED_MODULES, *command_modules, HELP_MODULE]
+
+
+def save_state() -> dict[str, dict[str, any]]:
+    """Returns the values of the preserved variables and the serialised homework events and
+    tracked items.
+    """
+    state = {
+        module_name: {name: getattr(sys.modules[module_name], name) for name in names}
+        for module_name, names in PRESERVED_VARIABLES.items()
+        if module_name in sys.modules
+    }
+    state["homework_events"] = [
+        (event.event_id, event.serialised) for event in commands.homework.homework_events
+    ]
+    state["tracked_market_items"] = [
+        item.serialised for item in commands.steam_market.tracked_market_items
+    ]
+    return state
+
+
+def restore_models(state: dict[str, any]) -> None:
+    """Re-creates the homework events and tracked items as instances of the reloaded classes.
+
+    The events keep their IDs and order, so the container doesn't need to be sorted again.
+    """
+    events = []
+    for event_id, attributes in state.pop("homework_events"):
+        event = commands.HomeworkEvent(*attributes.values())
+        event.event_id = event_id
+        events.append(event)
+    commands.homework.homework_events = commands.HomeworkEventContainer(events)
+    commands.steam_market.tracked_market_items = [
+        commands.TrackedItem(*attributes.values())
+        for attributes in state.pop("tracked_market_items")
+    ]
+
+
+def restore_state(state: dict[str, any]) -> None:
+    """Restores the preserved variables and the models, and rebuilds the compiled indexes and the
+    tables of functions held by the modules that aren't reloaded.
+    """
+    restore_models(state)
+    for module_name, variables in state.items():
+        vars(sys.modules[module_name]).update(variables)
+    bot.rebuild_interaction_handlers()
+    periodic.rebind_functions()
+    if util.lesson_plan_dp:
+        startup.compile_lookup_tables()
+    bot.compile_fast_path_pattern()
+    # The embeds may have been rendered by the old code
+    render_cache.clear()
+
+
+def reload_modules() -> tuple[dict[str, float], Exception or None]:
+    """Reloads the modules, stopping at the first one that raises an exception.
+
+    Returns a tuple consisting of the number of seconds taken to reload each module, and the
+    exception raised, if any.
+    """
+    durations = {}
+    for module_name in get_module_names():
+        start = time.perf_counter()
+        try:
+            importlib.reload(sys.modules[module_name])
+        except Exception as exception:  # pylint: disable=broad-except
+            return durations, exception
+        durations[module_name] = time.perf_counter() - start
+    return durations, None
+
+
+def reload_command_modules(message: Message, _: ParsedCommand) -> str:
+    """Event handler for the 'reload' command."""
+    ensure_user_authorised(message, owner_only=True)
+    start = time.perf_counter()
+    state = save_state()
+    try:
+        durations, exception = reload_modules()
+    finally:
+        restore_state(state)
+    total = time.perf_counter() - start
+    if exception is not None:
+        failed_module = get_module_names()[len(durations)]
+        return (
+            f"Failed to reload `{failed_module}` after {total * 1000:.0f} ms; the modules after "
+            f"it were not reloaded.\n```py\n{ccutil.format_exception_info(exception)}```"
+        )
+    slowest = sorted(durations.items(), key=lambda item: item[1], reverse=True)[:REPORT_SLOWEST]
+    lines = [f"`{name}`: {duration * 1000:.1f} ms" for name, duration in slowest]
+    bot.send_log(f"Reloaded {len(durations)} modules in {total * 1000:.1f} ms.", force=True)
+    lines.insert(0, f"Reloaded {len(durations)} modules in {total * 1000:.0f} ms. Slowest:")
+    return "\n".join(lines)
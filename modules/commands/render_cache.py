@@ -0,0 +1,61 @@
+"""Module containing the cache of rendered command embeds.
+
+Commands such as 'plan' or 'zast' would otherwise rebuild identical embeds from unchanged data on
+every invocation. The cache stores the embed as a dictionary, keyed by the command and its
+arguments. Each entry also records the version of the data it was rendered from and the command
+prefix, so it's replaced automatically as soon as either of those changes. The data versions are
+counters maintained by the layers that store the data (see `cache.get_version` and
+`util.static_data_version`), so checking them doesn't require serialising the data.
+
+The embeds are looked up from the worker threads of the threaded commands, so the cache and its
+statistics are guarded by a lock.
+"""
+
+# Standard library imports
+import threading
+
+# Third-party imports
+from discord import Embed
+
+# Local application imports
+from modules import bot
+
+
+# Maps (command name, arguments) to a tuple containing the version key and the embed dictionary
+_cache: dict[tuple, tuple[tuple, dict]] = {}
+
+statistics: dict[str, int] = {"hits": 0, "misses": 0}
+_lock = threading.Lock()
+
+
+def get_embed(command_name: str, arguments: tuple, data_version: any, render) -> Embed or str:
+    """Returns the embed from the cache, or renders and caches it if it's missing or outdated.
+
+    Arguments:
+        command_name -- the name of the command the embed is rendered for.
+        arguments -- a hashable tuple of the arguments that affect the embed's contents.
+        data_version -- a hashable value identifying the version of the data used to render it.
+        render -- a function taking no arguments that renders the embed. If it returns anything
+        other than an embed (e.g. an error message), the result is returned without being cached.
+    """
+    key = (command_name, arguments)
+    version = (data_version, bot.prefix)
+    with _lock:
+        cached = _cache.get(key)
+        is_hit = cached is not None and cached[0] == version
+        statistics["hits" if is_hit else "misses"] += 1
+    if is_hit:
+        # Return a new object since the caller might modify it
+        return Embed.from_dict(cached[1])
+    # Rendered without holding the lock, so that other commands aren't blocked
+    embed = render()
+    if isinstance(embed, Embed):
+        with _lock:
+            _cache[key] = (version, embed.to_dict())
+    return embed
+
+
+def clear() -> None:
+    """Removes all of the rendered embeds from the cache."""
+    with _lock:
+        _cache.clear()
@@ -0,0 +1,176 @@
+"""Module containing the command router, which parses each command invocation once.
+
+The command schemas are declared in `get_help.INFO` using the `Parameter` class. The router resolves
+the command name through a precompiled alias table and converts the arguments according to the
+schema, so the handlers receive a `ParsedCommand` instead of re-splitting the message content.
+"""
+
+# Standard library imports
+import re
+
+TOKEN_PATTERN = re.compile(r"\S+")
+
+# Sentinel value indicating that a parameter has no default value, i.e. that it is required
+REQUIRED = object()
+
+
+class ArgumentError(Exception):
+    """Raised when the arguments of a command invocation do not match the command's schema.
+
+    Attributes:
+        message -- explanation of the error, which is displayed to the user
+        command_name -- the name of the command whose arguments are invalid, set by the router
+    """
+
+    def __init__(self, message: str):
+        self.message = message
+        self.command_name: str = None
+        super().__init__(self.message)
+
+
+class Parameter:
+    """Declaration of a single parameter in a command's schema.
+
+    Attributes:
+        name -- the key under which the converted value is stored in `ParsedCommand.params`.
+        converter -- a function converting the raw string into the desired type. It should raise
+        ValueError with a user-friendly explanation if the value is invalid.
+        default -- the value used when the argument is not given. Required if not specified.
+        greedy -- if True, the parameter consumes the rest of the argument text, whitespace included.
+        keyword -- if specified, the value is given as a `keyword=value` token anywhere in the text.
+        label -- the name of the parameter displayed to the user. Defaults to the name.
+    """
+
+    __slots__ = ("name", "converter", "default", "greedy", "keyword", "label", "pattern")
+
+    def __init__(
+        self,
+        name: str,
+        converter=str,
+        default: any = REQUIRED,
+        greedy: bool = False,
+        keyword: str = None,
+        label: str = None,
+    ) -> None:
+        self.name: str = name
+        self.converter = converter
+        self.default: any = default
+        self.greedy: bool = greedy
+        self.keyword: str = keyword
+        self.label: str = label or name
+        self.pattern: re.Pattern = None
+        if keyword:
+            self.pattern = re.compile(rf"(?:^|\s){re.escape(keyword)}=(\S*)")
+
+    def convert(self, value: str) -> any:
+        """Converts the raw value using the converter. Raises ArgumentError if it's invalid."""
+        try:
+            return self.converter(value)
+        except ValueError as invalid_value_exc:
+            message = str(invalid_value_exc) or f"Niepoprawna wartość argumentu `{value}`."
+            raise ArgumentError(message) from None
+
+
+class ParsedCommand:
+    """The result of parsing a command invocation.
+
+    Attributes:
+        name -- the name of the command, with aliases resolved.
+        invoked_with -- the name or alias that the user typed, lowercase.
+        text -- the raw argument text following the command name.
+        args -- the whitespace-separated argument tokens.
+        params -- the converted argument values, keyed by the parameter names in the schema.
+        state -- the values passed from the command's handler to its completion callback. Each
+        invocation has its own, so concurrent invocations of the same command don't interfere.
+    """
+
+    __slots__ = ("name", "invoked_with", "text", "args", "params", "state")
+
+    def __init__(
+        self, name: str, invoked_with: str, text: str, params: dict[str, any] = None
+    ) -> None:
+        self.name: str = name
+        self.invoked_with: str = invoked_with
+        self.text: str = text
+        self.args: list[str] = text.split()
+        self.params: dict[str, any] = params or {}
+        self.state: dict[str, any] = {}
+
+    def __repr__(self) -> str:
+        return f"<ParsedCommand {self.name} ({self.invoked_with}) {self.params}>"
+
+
+def compile_alias_table(info: dict[str, dict[str, any]]) -> dict[str, str]:
+    """Creates a dictionary mapping each command name and alias to the command name."""
+    aliases: dict[str, str] = {}
+    for name, command_info in info.items():
+        aliases[name] = name
+        for alias in command_info.get("aliases", ()):
+            aliases[alias] = name
+    return aliases
+
+
+def parse_arguments(
+    text: str, schema: tuple[Parameter] or list[Parameter]
+) -> dict[str, any]:
+    """Converts the argument text according to the given schema.
+
+    Returns a dictionary containing the converted values. Arguments not in the schema are ignored.
+    Raises ArgumentError if an argument is invalid or a required argument is missing.
+    """
+    params: dict[str, any] = {}
+    positional = []
+    for parameter in schema:
+        if not parameter.keyword:
+            positional.append(parameter)
+            continue
+        match = parameter.pattern.search(text)
+        if match is None:
+            params[parameter.name] = parameter.default
+            continue
+        params[parameter.name] = parameter.convert(match.group(1))
+        # Remove the keyword argument so that it isn't treated as a positional argument
+        text = text[: match.start()] + text[match.end() :]
+    tokens = TOKEN_PATTERN.finditer(text)
+    for parameter in positional:
+        token = next(tokens, None)
+        if token is None:
+            params[parameter.name] = parameter.default
+            continue
+        value = text[token.start() :].strip() if parameter.greedy else token.group()
+        params[parameter.name] = parameter.convert(value)
+    for parameter in schema:
+        if params[parameter.name] is REQUIRED:
+            name = parameter.keyword + "=" if parameter.keyword else parameter.label
+            raise ArgumentError(f"Brakuje argumentu __{name}__.")
+    return params
+
+
+def parse_invocation(
+    content: str,
+    prefix: str,
+    aliases: dict[str, str],
+    info: dict[str, dict[str, any]],
+) -> ParsedCommand or None:
+    """Parses the message content into a command invocation.
+
+    Returns None if the content is not an invocation of a known command.
+    Raises ArgumentError if the arguments do not match the command's schema.
+    """
+    if not content.startswith(prefix):
+        return None
+    body = content[len(prefix) :]
+    match = TOKEN_PATTERN.match(body)
+    if match is None:
+        return None
+    invoked_with = match.group().lower()
+    name = aliases.get(invoked_with)
+    if name is None:
+        return None
+    text = body[match.end() :].strip()
+    try:
+        params = parse_arguments(text, info[name].get("arguments", ()))
+    except ArgumentError as invalid_args_exc:
+        invalid_args_exc.command_name = name
+        raise
+    return ParsedCommand(name, invoked_with, text, params)
@@ -0,0 +1,89 @@
+"""Module containing the code pertaining to the 'stats' command."""
+
+# Third-party imports
+from discord import Message, Embed
+
+# Local application imports
+from modules import bot, metrics, periodic, startup, watchdog
+from modules.api import single_flight, snapshots
+from modules.commands import ensure_user_authorised
+from modules.commands.router import ParsedCommand
+
+DESC = None
+
+
+def format_seconds(seconds: float) -> str:
+    """Formats the duration in milliseconds, or as '>10 s' for the unbounded histogram bucket."""
+    if seconds == float("inf"):
+        return f">{metrics.LATENCY_BUCKETS[-2]:g} s"
+    return f"{seconds * 1000:.0f} ms"
+
+
+def format_ratio(ratio: float or None) -> str:
+    """Formats the ratio as a percentage, or 'n/a' if there were no lookups."""
+    return "n/a" if ratio is None else f"{ratio:.0%}"
+
+
+def add_lines_field(embed: Embed, name: str, lines: list[str]) -> None:
+    """Adds the lines to the embed, split across several fields if they're too long for one.
+
+    The fields after the first are named e.g. 'Command latency (cd.)'.
+    """
+    text = "\n".join(lines) or "*None*"
+    limit = bot.MAX_EMBED_FIELD_VALUE_LENGTH
+    # A single line longer than the limit can't be split at line boundaries, so it's truncated
+    chunks = bot.split_text(text, limit) or [text[:limit - 1] + "…"]
+    for i, chunk in enumerate(chunks):
+        embed.add_field(name=name if i == 0 else f"{name} (cd.)", value=chunk, inline=False)
+
+
+def get_stats_embed(message: Message, _: ParsedCommand) -> Embed:
+    """Event handler for the 'stats' command."""
+    ensure_user_authorised(message, owner_only=True)
+    embed = Embed(title="Bot statistics")
+
+    lines = [
+        f"`{name}`: {hist.count}× p50 ≤ {format_seconds(hist.quantile(0.5))}, "
+        f"p95 ≤ {format_seconds(hist.quantile(0.95))}"
+        for name, hist in sorted(metrics.command_latency.items())
+    ]
+    add_lines_field(embed, "Command latency", lines)
+
+    lines = [
+        f"`{name}`: {api.calls} calls, {api.errors} errors, "
+        f"p95 ≤ {format_seconds(api.latency.quantile(0.95))}"
+        for name, api in sorted(metrics.get_api_metrics().items())
+    ]
+    coalesced = single_flight.get_statistics()
+    lines += [
+        f"`{name}`: {stats['coalesced']}/{stats['requests']} calls coalesced"
+        for name, stats in sorted(coalesced.items())
+    ]
+    lines += [
+        f"`{name}`: {stats['failures']}/{stats['refreshes']} background refreshes failed"
+        for name, stats in sorted(snapshots.get_statistics().items())
+    ]
+    add_lines_field(embed, "API calls", lines)
+
+    lines = [
+        f"`{name}`: {format_ratio(ratio)}"
+        for name, ratio in sorted(metrics.get_cache_hit_ratios().items())
+    ]
+    add_lines_field(embed, "Cache hit ratios", lines)
+
+    lines = [
+        f"`{name}`: {stats['runs']} runs, {stats['skips']} skipped, "
+        f"{stats['failures']} failed, {stats['timeouts']} timed out"
+        for name, stats in periodic.get_statistics().items()
+    ]
+    add_lines_field(embed, "Periodic tasks", lines)
+
+    loop_stats = watchdog.statistics
+    embed.add_field(
+        name="Event loop lag",
+        value=f"Last: {format_seconds(loop_stats['last_lag'])}, "
+        f"max: {format_seconds(loop_stats['max_lag'])}, stalls: {loop_stats['stalls']}",
+        inline=False,
+    )
+    embed.add_field(name="Start-up", value=startup.format_report() or "*None*", inline=False)
+    return embed
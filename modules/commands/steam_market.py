@@ -5,8 +5,9 @@ from discord import Message, Embed
 from corny_commons.util import web
 
 # Local application imports
-from modules import bot, util, data_manager, Emoji
+from modules import util, data_manager, Emoji
 from modules.commands import TrackedItem, ensure_user_authorised
+from modules.commands.router import ParsedCommand
 from modules.api import steam_market
 
 
@@ -30,31 +31,47 @@ Parametry: __nazwa przedmiotu__
 Przykład: `{p}odsledz Operation Broken Fang Case` - zaprzestaje śledzenie ceny tego przedmiotu."""
 
 STEAM_URL = "https://www.steamcommunity.com/market/search/?q="
+# noinspection SpellCheckingInspection
+USAGE_TRACK = ("Należy wpisać po nazwie przedmiotu cenę minimalną oraz cenę maksymalną. "
+               "Przykład: `{p}sledz Operation Broken Fang Case min=1 max=3`.")
 
 
 tracked_market_items: list[TrackedItem] = []
 
 
-def get_market_price(message: Message or str, result_override=None) -> str:
-    """Event handler for the 'cena' command."""
-    if result_override is None:
-        args: list[str] = message.content[len(f"{bot.prefix}cena "):].split(" waluta=")
-    else:
-        args: list[str] = [message]
-    currency = args[-1].strip() if len(args) > 1 else 'PLN'
+def parse_price(value: str) -> int:
+    """Converts the price given in the command arguments into the number of hundredths."""
+    try:
+        return int(float(value) * 100)
+    except ValueError:
+        raise ValueError(f"Niepoprawna cena: `{value}`.") from None
+
+
+def get_item_price_message(item_name: str, currency: str = "PLN", result=None) -> str:
+    """Returns the message containing the current price of the given item.
+
+    Arguments:
+        item_name -- the name of the item on the Steam Community Market.
+        currency -- the ISO abbreviation of the currency to display the price in.
+        result -- the item's market listing, if it has already been requested.
+    """
     try:
-        params = args[0], 730, currency
-        result = result_override or steam_market.get_item(*params)
+        result = result or steam_market.get_item(item_name, 730, currency)
         price = steam_market.get_item_price(result)
     except web.WebException as web_exc:
         return util.get_error_message(web_exc)
     else:
-        return f"{Emoji.INFO} Aktualna cena dla *{args[0]}* to `{price}`."
+        return f"{Emoji.INFO} Aktualna cena dla *{item_name}* to `{price}`."
+
+
+def get_market_price(_: Message, command: ParsedCommand) -> str:
+    """Event handler for the 'cena' command."""
+    return get_item_price_message(command.params["item"], command.params["currency"])
 
 
-def search_for_item(message: Message) -> Embed:
+def search_for_item(_: Message, command: ParsedCommand) -> Embed:
     """Event handler for the 'wyszukaj' command."""
-    raw_query = message.content[len(f"{bot.prefix}wyszukaj "):]
+    raw_query = command.params["query"]
     try:
         response: dict[str, any] = steam_market.search_item(raw_query)
     except web.WebException as web_exc:
@@ -75,49 +92,37 @@ def search_for_item(message: Message) -> Embed:
 
 
 # Returns the message to send when the user wishes to track an item on the Steam Community Market
-def start_market_tracking(message: Message):
+def start_market_tracking(message: Message, command: ParsedCommand):
     """Event handling for the 'sledz' command."""
-    # noinspection SpellCheckingInspection
-    args = message.content[len(f"{bot.prefix}sledz "):].split(" min=")
-    min_price = args[-1].split(" max=")[0].strip()
-    max_price = args[-1].split(" max=")[-1].strip()
+    item_name, min_price, max_price = (
+        command.params[key] for key in ("item", "min_price", "max_price")
+    )
     try:
-        min_price = int(float(min_price) * 100)
-        max_price = int(float(max_price) * 100)
-    except ValueError:
-        # noinspection SpellCheckingInspection
-        return (f"{Emoji.WARNING} Należy wpisać po nazwie przedmiotu cenę minimalną oraz "
-                f"cenę maksymalną. Przykład: `{bot.prefix}sledz Operation Broken Fang Case "
-                f"min=1 max=3`.")
-    else:
-        item_name = args[0].strip()
-        try:
-            result = steam_market.get_item(item_name)
-        except web.WebException as web_exc:
-            return util.get_error_message(web_exc)
-        author_id = message.author.id
-        item = TrackedItem(item_name, min_price, max_price, author_id)
-        for existing_item in tracked_market_items:
-            if existing_item.serialised != item.serialised:
-                continue
-            # There is already an identical market track request
-            if existing_item.author_id == author_id:
-                other_author_description = "Ciebie"
-            else:
-                other_author_description = f"użytkownika <@{existing_item.author_id}>"
-            return (f"{Emoji.WARNING} Przedmiot *{item_name}* jest już śledzony"
-                    f"przez {other_author_description}.")
-        tracked_market_items.append(item)
-        data_manager.save_data_file()
-        price = get_market_price(item_name, result_override=result)
-        return (f"{Emoji.CHECK} Stworzono zlecenie śledzenia przedmiotu *{item_name}* w"
-                f" przedziale `{min_price/100:.2f}zł - {max_price/100:.2f}zł`.\n{price}")
-
-
-def stop_market_tracking(message: Message) -> str:
+        result = steam_market.get_item(item_name)
+    except web.WebException as web_exc:
+        return util.get_error_message(web_exc)
+    author_id = message.author.id
+    item = TrackedItem(item_name, min_price, max_price, author_id)
+    for existing_item in tracked_market_items:
+        if existing_item != item:
+            continue
+        # There is already an identical market track request
+        if existing_item.author_id == author_id:
+            other_author_description = "Ciebie"
+        else:
+            other_author_description = f"użytkownika <@{existing_item.author_id}>"
+        return (f"{Emoji.WARNING} Przedmiot *{item_name}* jest już śledzony"
+                f"przez {other_author_description}.")
+    tracked_market_items.append(item)
+    data_manager.save_data_file()
+    price = get_item_price_message(item_name, result=result)
+    return (f"{Emoji.CHECK} Stworzono zlecenie śledzenia przedmiotu *{item_name}* w"
+            f" przedziale `{min_price/100:.2f}zł - {max_price/100:.2f}zł`.\n{price}")
+
+
+def stop_market_tracking(message: Message, command: ParsedCommand) -> str:
     """Event handling for the 'odsledz' command."""
-    # noinspection SpellCheckingInspection
-    item_name = message.content.lstrip(f"{bot.prefix}odsledz ")
+    item_name = command.params["item"]
     for item in tracked_market_items:
         if item.name.lower() == item_name.lower():
             if item.author_id != message.author.id:
@@ -11,6 +11,8 @@ from corny_commons.util import web
 # Local application imports
 from modules import bot, util, WEEKDAY_NAMES
 from modules.api import substitutions
+from modules.commands import render_cache
+from modules.commands.router import ParsedCommand
 
 
 DESC = """Podaje zastępstwa na dany dzień."""
@@ -19,13 +21,10 @@ BAD_SUBSTITUTIONS_MSG = (
     ":x: Nie udało się odzyskać zastępstw. Proszę spróbowac ponownie w krótce."
 )
 FOOTER_TEMPLATE = "Użyj komendy {}zast, aby pokazać tą wiadomość."
+AGE_FOOTER_TEMPLATE = FOOTER_TEMPLATE + " Dane pobrano {}."
 DESC_TEMPLATE = "Liczba zastępstw dla klasy {}: **{}**"
 
 
-# Data to be stored between functions while the command is executing
-temp_data: dict[str, bool] = {}
-
-
 def get_all_lessons_on_day(weekday: int) -> list[dict[str, str]]:
     """Gets all the lessons taking place on a given day of the week."""
     plan = util.lesson_plan_dp["weekdays"][weekday]
@@ -101,7 +100,9 @@ def add_substitution_text_fields(
     return our_substitutions
 
 
-def get_substitutions_embed(_: discord.Message = None) -> discord.Embed or str:
+def get_substitutions_embed(
+    _: discord.Message = None, command: ParsedCommand = None
+) -> discord.Embed or str:
     """Event handler for the 'zast' command."""
     try:
         data, old_data = substitutions.get_substitutions()
@@ -114,8 +115,9 @@ def get_substitutions_embed(_: discord.Message = None) -> discord.Embed or str:
         if "error" in data or not {"teachers", "date", "events"}.issubset(data):
             return BAD_SUBSTITUTIONS_MSG
         # Check if the data was updated
-        if data != old_data:
-            temp_data["updated_for_same_day"] = data.get("date") == old_data.get("date")
+        if data != old_data and command is not None:
+            same_day = data.get("date") == old_data.get("date")
+            command.state["updated_for_same_day"] = same_day
 
     # Initialise the embed
     url = f"{substitutions.SOURCE_URL}#{data['post'].get('id', 'content')}"
@@ -165,19 +167,34 @@ def get_substitutions_embed(_: discord.Message = None) -> discord.Embed or str:
     return embed
 
 
-def get_new_substitutions_embed(_: discord.Message = None) -> discord.Embed or str:
-    """Event handler for the 'zast' command, following the new substitutions format."""
+def get_new_substitutions_embed(
+    _: discord.Message = None, command: ParsedCommand = None
+) -> discord.Embed or str:
+    """Event handler for the 'zast' command, following the new substitutions format.
+
+    Also called without arguments when the substitutions are updated.
+    """
     try:
-        data, old_data = substitutions.get_substitutions()
+        snapshot = substitutions.get_substitutions_snapshot()
+        data, old_data = snapshot.data, snapshot.old_data
     except web.WebException as web_exc:
         ex: str = ccutil.format_exception_info(web_exc)
         bot.send_log(f"{bot.BAD_RESPONSE}{ex}", force=True)
         return util.get_error_message(web_exc)
     else:
-        # Check if the data was updated
-        if data != old_data:
-            temp_data["updated_for_same_day"] = data.keys() == old_data.keys()
+        # Check if the data was updated; the flag is read by `announce_new_substitutions`
+        if data != old_data and command is not None:
+            command.state["updated_for_same_day"] = data.keys() == old_data.keys()
+
+    # The embed also lists the cancelled lessons, which depend on the lesson plan and teachers
+    data_version = (snapshot.version, util.static_data_version)
+    embed = render_cache.get_embed("zast", (), data_version, lambda: render_new_embed(data))
+    # The age is shown in the footer since the data may be served while it's being refreshed
+    return embed.set_footer(text=AGE_FOOTER_TEMPLATE.format(bot.prefix, snapshot.format_age()))
+
 
+def render_new_embed(data: dict[str, list[str]]) -> discord.Embed:
+    """Renders the embed containing the given substitutions, following the new format."""
     # Initialise the embed
     dates = sorted(data.keys(), key=lambda x: datetime.strptime(x, "%d.%m.%Y"))
     embed = discord.Embed(
@@ -202,10 +219,10 @@ def get_new_substitutions_embed(_: discord.Message = None) -> discord.Embed or s
 
 
 async def announce_new_substitutions(
-    _: discord.Message, bot_reply: discord.Message
+    _: discord.Message, bot_reply: discord.Message, command: ParsedCommand
 ) -> None:
     """Callback to be run after the command is executed. Announces the substitutions if new."""
-    updated_for_same_day: bool or None = temp_data.get("updated_for_same_day")
+    updated_for_same_day: bool or None = command.state.get("updated_for_same_day")
     if updated_for_same_day is None:
         # The substitutions were not changed. Don't announce them.
         return
@@ -219,4 +236,3 @@ async def announce_new_substitutions(
         )
     else:
         await bot.announce_substitutions(embed, same_day=updated_for_same_day)
-    temp_data.clear()
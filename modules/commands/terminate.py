@@ -5,7 +5,8 @@ import discord
 
 # Local application imports
 from modules.commands import ensure_user_authorised
-from modules import bot, data_manager
+from modules.commands.router import ParsedCommand
+from modules import bot, data_manager, periodic
 
 DESC = None
 
@@ -14,13 +15,13 @@ RESTARTING_BOT_MSG = "Restarting bot..."
 EXITING_BOT_MSG = "Exiting program."
 
 
-def restart_bot(message: discord.Message) -> str:
+def restart_bot(message: discord.Message, _: ParsedCommand) -> str:
     """Event handler for the 'restart' command."""
     ensure_user_authorised(message, owner_only=True)
     return RESTARTING_BOT_MSG
 
 
-def exit_bot(message: discord.Message) -> str:
+def exit_bot(message: discord.Message, _: ParsedCommand) -> str:
     """Event handler for the 'exit' command."""
     ensure_user_authorised(message, owner_only=True)
     bot.restart_on_exit = False
@@ -28,7 +29,7 @@ def exit_bot(message: discord.Message) -> str:
 
 
 async def terminate_bot(
-    original_msg: discord.Message, reply_msg: discord.Message
+    original_msg: discord.Message, reply_msg: discord.Message, _: ParsedCommand
 ) -> None:
     """Save's the ID of the bot's exit message and terminates the bot client process."""
     data_manager.on_exit_msg = {
@@ -36,5 +37,5 @@ async def terminate_bot(
         "channel_id": original_msg.channel.id,
         "message_id": reply_msg.id,
     }
-    bot.main_update_loop.stop()
+    periodic.stop_all()
     await bot.close()
@@ -1,9 +1,10 @@
 """Functionality for reading and saving the bot's data file."""
 
 # Standard library imports
+import gzip
 import json
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Third-party imports
 from corny_commons import util as ccutil
@@ -14,6 +15,10 @@ from modules.api import lucky_numbers
 
 DATA_IDENTICAL_MSG = "... data is identical; no changes have been made."
 
+# Homework events are moved to the archive this many days after their deadline.
+ARCHIVE_AFTER_DAYS = 7
+ARCHIVE_FILENAME = "homework_archive.jsonl.gz"
+
 
 on_exit_msg = {}
 last_substitutions = {}
@@ -49,11 +54,9 @@ def read_data_file(filename: str = "data.json") -> None:
         new_event_candidate = commands.HomeworkEvent(*attributes.values())
         new_event_candidates.append(new_event_candidate)
     commands.homework.homework_events.remove_disjunction(new_event_candidates)
+    existing_states = {event.state for event in commands.homework.homework_events}
     for new_event_candidate in new_event_candidates:
-        if (
-            new_event_candidate.serialised
-            not in commands.homework.homework_events.serialised
-        ):
+        if new_event_candidate.state not in existing_states:
             new_event_candidate.sort_into_container(commands.homework.homework_events)
 
     for attributes in data.get("tracked_market_items", []):
@@ -62,7 +65,7 @@ def read_data_file(filename: str = "data.json") -> None:
         if item not in commands.steam_market.tracked_market_items:
             commands.steam_market.tracked_market_items.append(item)
 
-    lucky_numbers.cached_data = data.get("lucky_numbers", {})
+    lucky_numbers_data = data.get("lucky_numbers", {})
     try:
         # Make datetime object from saved lucky numbers data
         date: str = data["lucky_numbers"]["date"]
@@ -77,20 +80,13 @@ def read_data_file(filename: str = "data.json") -> None:
         )
         bot.send_log(bad_lucky_numbers, force=True)
     else:
-        lucky_numbers.cached_data["date"] = data_timestamp.date()
+        lucky_numbers_data["date"] = data_timestamp.date()
+    lucky_numbers.set_cached_data(lucky_numbers_data)
     bot.send_log(f"... successfully read data file '{filename}'.", force=True)
 
 
-def save_data_file(filename: str = "data.json", allow_logs: bool = True) -> None:
-    """Saves the settings stored in the program's memory to the file provided.
-
-    Arguments:
-        filename -- the name of the file relative to the program root directory to write to.
-        Defaults to 'data.json'.
-        allow_logs -- a boolean indicating whether or not the save should be logged.
-    """
-    if allow_logs:
-        bot.send_log(f"Saving data file '{filename}'...", force=True)
+def get_serialised_data() -> dict[str, any]:
+    """Returns the settings stored in the program's memory as a JSON-serialisable dictionary."""
     # Creates containers with the data to be saved in .json format
     serialised_homework_events = {
         event.id_string: event.serialised for event in commands.homework.homework_events
@@ -98,8 +94,8 @@ def save_data_file(filename: str = "data.json", allow_logs: bool = True) -> None
     serialised_tracked_market_items = [
         item.serialised for item in commands.steam_market.tracked_market_items
     ]
-    # Creates a parent dictionary to save all data that needs to be saved
-    data_to_be_saved = {
+    # Creates a parent dictionary containing all data that needs to be saved
+    return {
         "lesson_links": {
             code: link for code, link in util.lesson_links.items() if link
         },
@@ -109,6 +105,19 @@ def save_data_file(filename: str = "data.json", allow_logs: bool = True) -> None
         "on_exit_msg": on_exit_msg,
         "last_substitutions": last_substitutions,
     }
+
+
+def save_data_file(filename: str = "data.json", allow_logs: bool = True) -> None:
+    """Saves the settings stored in the program's memory to the file provided.
+
+    Arguments:
+        filename -- the name of the file relative to the program root directory to write to.
+        Defaults to 'data.json'.
+        allow_logs -- a boolean indicating whether or not the save should be logged.
+    """
+    if allow_logs:
+        bot.send_log(f"Saving data file '{filename}'...", force=True)
+    data_to_be_saved = get_serialised_data()
     # Checks if the data actually needs to be saved
     with open(filename, "r", encoding="UTF-8") as file:
         existing_data = json.load(file)
@@ -128,3 +137,59 @@ def save_data_file(filename: str = "data.json", allow_logs: bool = True) -> None
     if allow_logs:
         bot.send_log(f"... successfully saved data file '{filename}'.", force=True)
         bot.send_log(formatted_data)
+
+
+def archive_expired_homework_events(
+    current_time: datetime = None, filename: str = ARCHIVE_FILENAME
+) -> int:
+    """Moves the homework events whose deadline has passed more than `ARCHIVE_AFTER_DAYS` ago
+    from the active container into the compressed archive file, saving the data file first.
+
+    Each batch of archived events is appended to the file as a single gzip member, containing one
+    JSON line per event, so the existing archive never has to be read or rewritten.
+
+    Returns the number of archived events.
+    """
+    current_time = current_time or datetime.now()
+    cutoff = current_time - timedelta(days=ARCHIVE_AFTER_DAYS)
+    events = commands.homework.homework_events
+    # The container is sorted chronologically, so the expired events are all at the start
+    expired = []
+    for event in events:
+        if event.deadline_time >= cutoff:
+            break
+        expired.append(event)
+    if not expired:
+        return 0
+    archived_on = str(current_time.date())
+    lines = [
+        json.dumps(
+            {"event_id": event.id_string, "archived": archived_on, "event": event.serialised},
+            ensure_ascii=False,
+        )
+        for event in expired
+    ]
+    # The events are removed from the data file before they're archived, so that they can't be
+    # archived twice if the bot crashes in between; at worst they would be lost from the archive
+    del events[: len(expired)]
+    try:
+        save_data_file()
+    except Exception:
+        # Keep the events in memory, so that they are archived by the next run instead
+        events[:0] = expired
+        raise
+    with gzip.open(filename, "at", encoding="UTF-8") as file:
+        file.write("\n".join(lines) + "\n")
+    bot.send_log(f"Archived {len(expired)} expired homework event(s).", force=True)
+    return len(expired)
+
+
+def read_homework_archive(filename: str = ARCHIVE_FILENAME) -> list[dict[str, any]]:
+    """Reads the homework event archive file.
+
+    Returns a list of the archived records, in the order in which they were archived.
+    """
+    if not os.path.isfile(filename):
+        return []
+    with gzip.open(filename, "rt", encoding="UTF-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
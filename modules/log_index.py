@@ -0,0 +1,261 @@
+"""Search of the bot's log files using a sidecar index of the byte offsets of each hour.
+
+Each log file, i.e. the active 'bot.log' and the archived logs in 'bot_logs', compressed or not,
+has an index file next to it, named after the log file with the '.idx' extension. The index contains
+the offset of the first entry logged in each hour, so a search for a time range only reads the
+slice of each file that covers it, and skips the files outside of it entirely. The index of the
+active log is extended incrementally as lines are appended to it, and rebuilt if the log is rotated.
+
+The entries are streamed line by line, so the log files are never loaded into memory as a whole.
+"""
+
+# Standard library imports
+import collections
+import gzip
+import json
+import os
+import re
+from datetime import datetime
+
+# Local application imports
+from modules import log_writer
+
+
+INDEX_EXTENSION = ".idx"
+# Incremented whenever the structure of the index changes, so that old indexes are rebuilt
+INDEX_VERSION = 1
+# Matches the timestamp at the start of each log entry; the continuation lines are indented
+ENTRY_PATTERN = re.compile(rb"^(\d{4}-\d{2}-\d{2} @ \d{2}:\d{2}:\d{2}): ")
+TIMESTAMP_FORMAT = "%Y-%m-%d @ %H:%M:%S"
+# The length of the timestamp prefix identifying the hour, e.g. '2022-09-01 @ 08'
+HOUR_KEY_LENGTH = 15
+# The levels in increasing order of severity. The log entries have no explicit level, so it is
+# inferred from their contents using these patterns; any other entry is 'info'.
+LEVELS = ("info", "warning", "error")
+LEVEL_PATTERNS = {
+    "error": re.compile(r"Traceback \(most recent call last\)|CRITICAL|[Ff]ailed|Could not"),
+    "warning": re.compile(r"WARNING|Skipping|Suppressing|[Tt]oo long|[Nn]iepoprawn"),
+}
+# The maximum number of characters of matching entries returned by a search. The latest entries
+# are kept if there are more.
+MAX_RESULT_LENGTH = 4 * 1024 * 1024
+
+
+class SearchResult:
+    """The entries matched by a log search.
+
+    Attributes:
+        entries -- the text of the latest matching entries, in chronological order.
+        num_matches -- the total number of matching entries, including the omitted ones.
+        num_omitted -- the number of earlier matching entries left out due to the length limit.
+        files_searched -- the number of log files whose contents were read.
+        files_skipped -- the number of log files skipped using their index.
+    """
+
+    def __init__(self) -> None:
+        self.entries: collections.deque[str] = collections.deque()
+        self.num_matches: int = 0
+        self.num_omitted: int = 0
+        self.files_searched: int = 0
+        self.files_skipped: int = 0
+        self._length: int = 0
+
+    def add(self, entry: str) -> None:
+        """Adds the matching entry, dropping the earliest ones if the result is too long."""
+        self.entries.append(entry)
+        self.num_matches += 1
+        self._length += len(entry)
+        while self._length > MAX_RESULT_LENGTH and len(self.entries) > 1:
+            self._length -= len(self.entries.popleft())
+            self.num_omitted += 1
+
+    @property
+    def text(self) -> str:
+        """The matching entries joined into a single string."""
+        return "".join(self.entries)
+
+
+def get_level(entry: str) -> str:
+    """Returns the level inferred from the contents of the log entry."""
+    for level in reversed(LEVELS):
+        pattern = LEVEL_PATTERNS.get(level)
+        if pattern is not None and pattern.search(entry):
+            return level
+    return LEVELS[0]
+
+
+def get_log_files(filename: str = "bot") -> list[str]:
+    """Returns the paths of the archived logs in chronological order, followed by the active log."""
+    logs_directory = f"{filename}_logs"
+    paths = []
+    if os.path.isdir(logs_directory):
+        # The archives are named after the time the log was started, so they sort chronologically
+        paths = [
+            os.path.join(logs_directory, name)
+            for name in sorted(os.listdir(logs_directory))
+            if name.endswith((".log", ".log.gz"))
+        ]
+    if os.path.isfile(filename + ".log"):
+        paths.append(filename + ".log")
+    return paths
+
+
+def _open_log(path: str):
+    """Opens the log file for reading in binary mode, decompressing it if needed."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+
+def _read_header(path: str) -> str:
+    """Returns the first line of the file, which identifies the active log until it's rotated."""
+    with _open_log(path) as file:
+        return file.readline().decode("UTF-8", errors="replace")
+
+
+def _read_index(path: str) -> dict[str, any] or None:
+    """Returns the index of the log file, or None if there isn't a valid one."""
+    try:
+        with open(path + INDEX_EXTENSION, "r", encoding="UTF-8") as file:
+            index = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if not isinstance(index, dict) or index.get("version") != INDEX_VERSION:
+        return None
+    return index
+
+
+def _write_index(path: str, index: dict[str, any]) -> None:
+    """Replaces the index of the log file atomically."""
+    index_filename = path + INDEX_EXTENSION
+    temporary_filename = index_filename + ".tmp"
+    with open(temporary_filename, "w", encoding="UTF-8") as file:
+        json.dump(index, file)
+    os.replace(temporary_filename, index_filename)
+
+
+def get_index(path: str) -> dict[str, any]:
+    """Returns the index of the log file, creating or extending it if it's out of date.
+
+    The index contains the list of [hour, offset] pairs giving the offset of the first entry logged
+    in each hour, the timestamps of the first and last entries, and the number of bytes indexed.
+    """
+    modified_time = os.path.getmtime(path)
+    header = _read_header(path)
+    index = _read_index(path)
+    if index is None or index["header"] != header:
+        # The log was rotated since it was indexed, or it hasn't been indexed yet
+        index = {"version": INDEX_VERSION, "header": header, "size": 0, "hours": []}
+        index["first"] = index["last"] = index["modified"] = None
+    elif index["modified"] == modified_time:
+        return index
+    elif path.endswith(".gz"):
+        # The archives are never appended to, so if one was changed it is reindexed from the start
+        index.update(size=0, hours=[], first=None, last=None)
+    with _open_log(path) as file:
+        file.seek(index["size"])
+        offset = index["size"]
+        last_hour = index["hours"][-1][0] if index["hours"] else None
+        for line in file:
+            if not line.endswith(b"\n"):
+                # The line is still being written; it will be indexed the next time
+                break
+            match = ENTRY_PATTERN.match(line)
+            if match:
+                timestamp = match.group(1).decode()
+                hour = timestamp[:HOUR_KEY_LENGTH]
+                if hour != last_hour:
+                    index["hours"].append([hour, offset])
+                    last_hour = hour
+                index["first"] = index["first"] or timestamp
+                index["last"] = timestamp
+            offset += len(line)
+    index["size"] = offset
+    index["modified"] = modified_time
+    _write_index(path, index)
+    return index
+
+
+def _get_slice(index: dict[str, any], since: str or None, until: str or None) -> tuple[int, int]:
+    """Returns the offsets of the start and end of the part of the log covering the time range."""
+    hours = index["hours"]
+    end = next(
+        (offset for hour, offset in hours if until and hour > until[:HOUR_KEY_LENGTH]),
+        index["size"],
+    )
+    start = next(
+        (offset for hour, offset in hours if not since or hour >= since[:HOUR_KEY_LENGTH]), end
+    )
+    return start, end
+
+
+def _read_entries(path: str, start: int, end: int):
+    """Yields the (timestamp, text) tuples of the log entries between the two offsets."""
+    with _open_log(path) as file:
+        file.seek(start)
+        offset = start
+        timestamp, lines = None, []
+        for line in file:
+            if offset >= end:
+                break
+            offset += len(line)
+            match = ENTRY_PATTERN.match(line)
+            if match:
+                if timestamp is not None:
+                    yield timestamp, b"".join(lines).decode("UTF-8", errors="replace")
+                timestamp, lines = match.group(1).decode(), [line]
+            elif timestamp is not None:
+                lines.append(line)
+        if timestamp is not None:
+            yield timestamp, b"".join(lines).decode("UTF-8", errors="replace")
+
+
+def search(
+    since: datetime = None,
+    until: datetime = None,
+    level: str = LEVELS[0],
+    text: str = None,
+    filename: str = "bot",
+) -> SearchResult:
+    """Returns the log entries matching all of the given criteria.
+
+    Arguments:
+        since -- the earliest time of the entries, or None for no lower limit.
+        until -- the latest time of the entries, or None for no upper limit.
+        level -- the minimum level of the entries, one of `LEVELS`.
+        text -- the substring that the entries must contain, case-insensitive, or None.
+        filename -- the name of the active log file, without the '.log' extension.
+    """
+    # Make sure the recently logged lines are included
+    log_writer.flush(timeout=5)
+    since_key = None if since is None else f"{since:{TIMESTAMP_FORMAT}}"
+    until_key = None if until is None else f"{until:{TIMESTAMP_FORMAT}}"
+    min_severity = LEVELS.index(level)
+    text = text and text.lower()
+    result = SearchResult()
+    for path in get_log_files(filename):
+        try:
+            index = get_index(path)
+        except (OSError, EOFError, gzip.BadGzipFile) as exception:
+            log_writer.log(f"Could not index log file '{path}': {exception!r}", force=False)
+            continue
+        if (
+            not index["hours"]
+            or since_key is not None and index["last"] < since_key
+            or until_key is not None and index["first"] > until_key
+        ):
+            result.files_skipped += 1
+            continue
+        result.files_searched += 1
+        start, end = _get_slice(index, since_key, until_key)
+        for timestamp, entry in _read_entries(path, start, end):
+            if since_key is not None and timestamp < since_key:
+                continue
+            if until_key is not None and timestamp > until_key:
+                break
+            if text and text not in entry.lower():
+                continue
+            if min_severity and LEVELS.index(get_level(entry)) < min_severity:
+                continue
+            result.add(entry)
+    return result
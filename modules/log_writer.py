@@ -0,0 +1,203 @@
+"""Buffered background writer of the log files.
+
+`log` formats the message in the same way as `file_manager.log`, but instead of opening the file
+and writing to it in the calling thread, it puts the line in a queue. A daemon thread writes the
+queued lines in batches, so logging never blocks the event loop on file I/O.
+
+The writer thread also rotates each log file once it exceeds `MAX_LOG_SIZE` bytes or it was
+started more than `MAX_LOG_AGE` ago. The contents of the rotated file are compressed into the
+file's logs directory (e.g. 'bot_logs' for 'bot.log'), named by the time the log was started, and
+a new log is started in its place. `flush` waits for the queued lines to be written, and should be
+called before the program exits.
+"""
+
+# Standard library imports
+import atexit
+import gzip
+import os
+import queue
+import shutil
+import sys
+import threading
+from datetime import datetime, timedelta
+
+
+# Rotate the log file once it's larger than this
+MAX_LOG_SIZE = 5 * 1024 * 1024  # Bytes
+# Rotate the log file once it was started longer ago than this
+MAX_LOG_AGE = timedelta(days=1)
+# The maximum number of lines written to a file at once
+MAX_BATCH_SIZE = 1_000
+# The format of the header of each log file, which contains the time the log was started
+HEADER_TEMPLATE = "START TIMESTAMP {} END TIMESTAMP Started log.\n"
+HEADER_SEPARATOR = " END TIMESTAMP "
+START_TIME_FORMAT = "%Y-%m-%d__%H.%M.%S"
+
+# Each item is a tuple of the absolute path of the log file and the line to write to it, or of the
+# path and None to rotate the file.
+_queue: queue.Queue = queue.Queue()
+_writer_thread: threading.Thread = None
+_thread_lock = threading.Lock()
+# The time each log file was started, read from its header. Only used by the writer thread.
+_start_times: dict[str, datetime] = {}
+
+
+def format_message(*raw_message: any) -> str:
+    """Formats the message with the current time, indenting the lines after the first."""
+    timestamp = f"{datetime.now():%Y-%m-%d @ %H:%M:%S}: "
+    # Adds spaces after each newline so that the actual message is in line with the timestamp.
+    return timestamp + " ".join(map(str, raw_message)).replace("\n", "\n" + " " * len(timestamp))
+
+
+def _get_path(filename: str) -> str:
+    """Returns the absolute path of the log file, so it isn't affected by later 'chdir' calls."""
+    return os.path.abspath(filename + ".log")
+
+
+def _ensure_started() -> None:
+    """Starts the writer thread if it's not running."""
+    global _writer_thread  # pylint: disable=global-statement
+    if _writer_thread is not None and _writer_thread.is_alive():
+        return
+    with _thread_lock:
+        if _writer_thread is None or not _writer_thread.is_alive():
+            _writer_thread = threading.Thread(target=_write_forever, name="log-writer", daemon=True)
+            _writer_thread.start()
+
+
+def log(*raw_message: any, filename: str = "bot", force: bool = True) -> str:
+    """Queues the message to be written to the log file and returns the formatted message.
+
+    Arguments:
+        raw_message -- the objects to log, which are converted to strings and joined with spaces.
+        filename -- the name of the log file, without the '.log' extension.
+        force -- if True, the message is also printed.
+    """
+    message = format_message(*raw_message)
+    _ensure_started()
+    _queue.put((_get_path(filename), message))
+    if force:
+        print(message)
+    return message
+
+
+def rotate(filename: str = "bot") -> None:
+    """Archives the current contents of the log file and starts a new log, e.g. on start-up."""
+    _ensure_started()
+    _queue.put((_get_path(filename), None))
+
+
+def flush(timeout: float = None) -> bool:
+    """Waits until all of the queued lines have been written.
+
+    Returns False if they weren't written before the timeout, otherwise True.
+    """
+    if _writer_thread is None or not _writer_thread.is_alive():
+        return _queue.unfinished_tasks == 0
+    if timeout is None:
+        _queue.join()
+        return True
+    finished = threading.Event()
+    threading.Thread(target=lambda: (_queue.join(), finished.set()), daemon=True).start()
+    return finished.wait(timeout)
+
+
+def _write_forever() -> None:
+    """The writer thread. Writes the queued lines in batches, grouped by file."""
+    while True:
+        items = [_queue.get()]
+        while len(items) < MAX_BATCH_SIZE:
+            try:
+                items.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _write_batch(items)
+        except Exception as exception:  # pylint: disable=broad-except
+            print(f"Could not write {len(items)} log lines: {exception!r}", file=sys.stderr)
+        finally:
+            for _ in items:
+                _queue.task_done()
+
+
+def _write_batch(items: list[tuple[str, str or None]]) -> None:
+    """Writes the lines to their files, performing any rotations in the order they were queued."""
+    lines: dict[str, list[str]] = {}
+    for path, line in items:
+        if line is None:
+            _write_lines(lines)
+            lines.clear()
+            _rotate_file(path)
+        else:
+            lines.setdefault(path, []).append(line + "\n")
+    _write_lines(lines)
+
+
+def _write_lines(lines: dict[str, list[str]]) -> None:
+    """Appends the lines to each file, rotating it first if it's too large or too old."""
+    for path, file_lines in lines.items():
+        if not os.path.isfile(path):
+            _start_log(path)
+        elif _should_rotate(path):
+            _rotate_file(path)
+        with open(path, "a", encoding="UTF-8") as file:
+            file.writelines(file_lines)
+
+
+def _start_log(path: str) -> None:
+    """Truncates the log file and writes the header containing the current time."""
+    start_time = datetime.now().replace(microsecond=0)
+    with open(path, "w", encoding="UTF-8") as file:
+        file.write(HEADER_TEMPLATE.format(f"{start_time:{START_TIME_FORMAT}}"))
+    _start_times[path] = start_time
+
+
+def _get_start_time(path: str) -> datetime or None:
+    """Returns the time the log was started, or None if the file has no valid header."""
+    if path not in _start_times:
+        with open(path, "r", encoding="UTF-8") as file:
+            header = file.readline()
+        raw_time = header.removeprefix("START TIMESTAMP ").partition(HEADER_SEPARATOR)[0]
+        try:
+            _start_times[path] = datetime.strptime(raw_time, START_TIME_FORMAT)
+        except ValueError:
+            return None
+    return _start_times[path]
+
+
+def _should_rotate(path: str) -> bool:
+    """Checks if the log file is too large or was started too long ago."""
+    if os.path.getsize(path) > MAX_LOG_SIZE:
+        return True
+    start_time = _get_start_time(path)
+    return start_time is not None and datetime.now() - start_time > MAX_LOG_AGE
+
+
+def _rotate_file(path: str) -> None:
+    """Compresses the contents of the log file into its logs directory and starts a new log."""
+    if os.path.isfile(path) and os.path.getsize(path) > 0:
+        directory, basename = os.path.split(path)
+        name = basename.removesuffix(".log")
+        logs_directory = os.path.join(directory, f"{name}_logs")
+        os.makedirs(logs_directory, exist_ok=True)
+        start_time = _get_start_time(path) or datetime.fromtimestamp(os.path.getmtime(path))
+        archive_name = f"{start_time:{START_TIME_FORMAT}}"
+        archive_path = os.path.join(logs_directory, archive_name + ".log.gz")
+        suffix = 1
+        while os.path.exists(archive_path):
+            suffix += 1
+            archive_path = os.path.join(logs_directory, f"{archive_name}_{suffix}.log.gz")
+        with open(path, "r", encoding="UTF-8") as source:
+            header = source.readline()
+            # The archived log doesn't include the header, as in `file_manager.save_active_log_file`
+            if HEADER_SEPARATOR in header:
+                header = header.partition(HEADER_SEPARATOR)[2]
+            with gzip.open(archive_path, "wt", encoding="UTF-8") as archive:
+                archive.write(header)
+                shutil.copyfileobj(source, archive)
+    _start_times.pop(path, None)
+    _start_log(path)
+
+
+# Write any remaining lines if the program exits without flushing, but don't hang if it's stuck
+atexit.register(flush, 5)
@@ -11,7 +11,7 @@ import sys
 from corny_commons import file_manager
 
 # Local application imports
-from modules import bot, data_manager, commands, util
+from modules import bot, data_manager, commands, log_writer, startup, util
 
 
 def start_bot() -> bool:
@@ -20,13 +20,15 @@ def start_bot() -> bool:
 
     Returns a boolean that indicates if the bot should be restarted.
     """
-    # Save the previous log on startup
-    file_manager.save_active_log_file(filename="bot", logs_dir="bot_logs")
-    file_manager.clear_log_file(filename="bot")
+    startup.begin()
+    # Save the previous log on startup; it's archived in the background by the log writer
+    with startup.phase("save log"):
+        log_writer.rotate(filename="bot")
     save_on_exit = True
 
-    for module in (bot, file_manager, util, commands):
-        importlib.reload(module)
+    with startup.phase("reload modules"):
+        for module in (bot, file_manager, util, commands):
+            importlib.reload(module)
     if __name__ == "__main__":
         starting_msg = "Started bot from main file! Assuming this is debug behaviour."
     else:
@@ -35,28 +37,37 @@ def start_bot() -> bool:
     if "--dev" in sys.argv:
         bot.VERBOSE_LOG_MESSAGES = True
         bot.send_log("Enabling verbose logging.")
-    file_manager.read_env()
-    data_manager.read_data_file("data.json")
+    with startup.phase("read env"):
+        file_manager.read_env()
+    with startup.phase("read data file"):
+        data_manager.read_data_file("data.json")
+    # Load the static data before connecting, so that the commands work as soon as the bot is ready
+    with startup.phase("warm start"):
+        if startup.load_warm_start():
+            bot.send_log("Loaded the warm-start snapshot.")
     event_loop = asyncio.get_event_loop()
     try:
         try:
             token = os.environ["BOT_TOKEN"]
         except KeyError:
-            file_manager.log(filename="bot")
-            file_manager.log("    --- CRITICAL ERROR! ---", filename="bot")
+            log_writer.log(filename="bot")
+            log_writer.log("    --- CRITICAL ERROR! ---", filename="bot")
             exit_msg = "'BOT_TOKEN' OS environment variable not found. Program exiting."
             save_on_exit = False
             # Do not restart bot
             return False
         else:
             # No problems finding OS variable containing bot token. Can login successfully.
-            event_loop.run_until_complete(bot.client.login(token))
+            with startup.phase("login"):
+                event_loop.run_until_complete(bot.client.login(token))
             bot.send_log("    --- Successfully authorised bot client! ---")
         # Bot has been logged in, continue with attempt to connect
         try:
             # Blocking call:
             # The program will stay on this line until the bot is disconnected.
             bot.send_log("    --- Connecting to Discord... ---")
+            # Ended in 'on_ready'
+            startup.start_phase("connect")
             event_loop.run_until_complete(bot.client.connect())
         except KeyboardInterrupt:
             # Raised when the program is forcefully closed (e.g. Ctrl+C in terminal).
@@ -74,16 +85,18 @@ def start_bot() -> bool:
         }
         # check=False -- do not raise an exception if the process finishes with non-zero exit code
         result = subprocess.run(["py3clean", "."], check=False, **run_settings)
-        file_manager.log("Pyclean:", result.stderr or result.stdout, filename="bot")
+        log_writer.log("Pyclean:", result.stderr or result.stdout, filename="bot")
         # Execute this in most cases; ensures data file is always up-to-date.
         if save_on_exit:
             # The file is saved before the start_bot() function returns.
             # Do not send a debug message since the bot is already offline.
             data_manager.save_data_file(allow_logs=False)
             saved_msg = "Successfully saved data file 'data.json'. Program exiting."
-            file_manager.log(saved_msg, filename="bot")
-        file_manager.log(exit_msg, filename="bot")
-        file_manager.log(filename="bot")
+            log_writer.log(saved_msg, filename="bot")
+        log_writer.log(exit_msg, filename="bot")
+        log_writer.log(filename="bot")
+        # Make sure the queued log lines are written before the bot is restarted or exits
+        log_writer.flush()
     # By default, when the program is exited gracefully, it is later restarted in 'run.pyw'.
     # If the user issues a command like !exit, the return_on_exit global variable is set to False,
     # and the bot is not restarted.
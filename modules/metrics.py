@@ -0,0 +1,241 @@
+"""Lightweight metrics registry.
+
+Records the latency of each command (from receiving the message to sending the reply) and the
+number, latency and errors of the web API calls made by each API module. These are combined with
+the statistics kept by the caches, the periodic tasks and the watchdog in the 'stats' command, and
+can optionally be served in the Prometheus text format on a local HTTP endpoint.
+"""
+
+# Standard library imports
+import bisect
+import contextlib
+import math
+import os
+import threading
+import time
+
+# Local application imports
+from modules import bot, periodic, startup, watchdog
+from modules.api import cache, single_flight, snapshots
+from modules.commands import render_cache
+
+
+# The upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, math.inf)
+# The environment variable containing the port of the Prometheus endpoint. Disabled if not set.
+PORT_VARIABLE = "METRICS_PORT"
+
+
+class Histogram:
+    """A cumulative histogram of observed values.
+
+    Attributes:
+        buckets -- the upper bounds of the buckets.
+        counts -- the number of observations in each bucket, not cumulative.
+        total -- the sum of all observed values.
+        count -- the number of observations.
+    """
+
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets: tuple[float] = LATENCY_BUCKETS) -> None:
+        self.buckets: tuple[float] = buckets
+        self.counts: list[int] = [0] * len(buckets)
+        self.total: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        """Records a single value."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def quantile(self, fraction: float) -> float:
+        """Returns the upper bound of the bucket containing the given quantile, e.g. 0.95."""
+        target = fraction * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return math.inf
+
+
+class ApiMetrics:
+    """The metrics of the web API calls made by a single API module.
+
+    Attributes:
+        calls -- the number of calls made.
+        errors -- the number of calls that raised an exception.
+        latency -- the histogram of the call durations.
+    """
+
+    __slots__ = ("calls", "errors", "latency")
+
+    def __init__(self) -> None:
+        self.calls: int = 0
+        self.errors: int = 0
+        self.latency = Histogram()
+
+
+command_latency: dict[str, Histogram] = {}
+api_metrics: dict[str, ApiMetrics] = {}
+# The API calls are made from worker threads, so the updates are synchronised
+_lock = threading.Lock()
+_server: "aiohttp_web.AppRunner" = None
+
+
+def observe_command(command_name: str, seconds: float) -> None:
+    """Records the time it took to respond to a command."""
+    with _lock:
+        command_latency.setdefault(command_name, Histogram()).observe(seconds)
+
+
+@contextlib.contextmanager
+def api_call(module_name: str):
+    """Context manager that records the duration of a web API call and whether it failed."""
+    start = time.perf_counter()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        with _lock:
+            metrics = api_metrics.setdefault(module_name, ApiMetrics())
+            metrics.calls += 1
+            metrics.errors += failed
+            metrics.latency.observe(duration)
+
+
+def get_api_metrics() -> dict[str, ApiMetrics]:
+    """Returns a copy of the API metrics dictionary, which is safe to iterate over."""
+    with _lock:
+        return dict(api_metrics)
+
+
+def get_cache_hit_ratios() -> dict[str, float]:
+    """Returns the ratio of hits to all lookups for each cache namespace and the render cache."""
+    ratios = {}
+    for name, stats in cache.get_statistics().items():
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        # An expired entry is also counted as a disk hit or a miss, so expirations aren't added
+        lookups = hits + stats["misses"]
+        ratios[name] = hits / lookups if lookups else None
+    lookups = render_cache.statistics["hits"] + render_cache.statistics["misses"]
+    ratios["render"] = render_cache.statistics["hits"] / lookups if lookups else None
+    return ratios
+
+
+def _format_labels(**labels: str) -> str:
+    """Formats the Prometheus labels, e.g. '{command="plan"}'."""
+    pairs = (f'{key}="{value}"' for key, value in labels.items())
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_histogram(name: str, histogram: Histogram, **labels: str) -> list[str]:
+    """Returns the lines of a histogram in the Prometheus text format."""
+    lines = []
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        bucket = "+Inf" if bound == math.inf else str(bound)
+        lines.append(f"{name}_bucket{_format_labels(**labels, le=bucket)} {cumulative}")
+    lines.append(f"{name}_sum{_format_labels(**labels)} {histogram.total}")
+    lines.append(f"{name}_count{_format_labels(**labels)} {histogram.count}")
+    return lines
+
+
+def render_prometheus() -> str:
+    """Returns all of the metrics in the Prometheus text exposition format."""
+    lines = ["# TYPE dzwonnik_command_latency_seconds histogram"]
+    with _lock:
+        for command_name, histogram in command_latency.items():
+            lines += _format_histogram(
+                "dzwonnik_command_latency_seconds", histogram, command=command_name
+            )
+        lines.append("# TYPE dzwonnik_api_calls_total counter")
+        for module_name, metrics in api_metrics.items():
+            lines.append(f"dzwonnik_api_calls_total{_format_labels(module=module_name)} "
+                         f"{metrics.calls}")
+        lines.append("# TYPE dzwonnik_api_errors_total counter")
+        for module_name, metrics in api_metrics.items():
+            lines.append(f"dzwonnik_api_errors_total{_format_labels(module=module_name)} "
+                         f"{metrics.errors}")
+        lines.append("# TYPE dzwonnik_api_latency_seconds histogram")
+        for module_name, metrics in api_metrics.items():
+            lines += _format_histogram(
+                "dzwonnik_api_latency_seconds", metrics.latency, module=module_name
+            )
+    lines.append("# TYPE dzwonnik_cache_lookups_total counter")
+    for name, stats in cache.get_statistics().items():
+        for result in ("memory_hits", "disk_hits", "misses", "expirations", "evictions"):
+            labels = _format_labels(namespace=name, result=result)
+            lines.append(f"dzwonnik_cache_lookups_total{labels} {stats[result]}")
+    lines.append("# TYPE dzwonnik_render_cache_lookups_total counter")
+    for result, count in render_cache.statistics.items():
+        lines.append(f"dzwonnik_render_cache_lookups_total{_format_labels(result=result)} {count}")
+    lines.append("# TYPE dzwonnik_coalesced_calls_total counter")
+    for name, stats in single_flight.get_statistics().items():
+        lines.append(f"dzwonnik_coalesced_calls_total{_format_labels(namespace=name)} "
+                     f"{stats['coalesced']}")
+    lines.append("# TYPE dzwonnik_snapshot_refreshes_total counter")
+    for name, stats in snapshots.get_statistics().items():
+        for result in ("refreshes", "failures"):
+            labels = _format_labels(namespace=name, result=result)
+            lines.append(f"dzwonnik_snapshot_refreshes_total{labels} {stats[result]}")
+    lines.append("# TYPE dzwonnik_periodic_task_runs_total counter")
+    for name, stats in periodic.get_statistics().items():
+        for result in ("runs", "skips", "failures", "timeouts"):
+            labels = _format_labels(task=name, result=result)
+            lines.append(f"dzwonnik_periodic_task_runs_total{labels} {stats[result]}")
+    lines.append("# TYPE dzwonnik_loop_lag_seconds gauge")
+    lines.append(f"dzwonnik_loop_lag_seconds {watchdog.statistics['last_lag']}")
+    lines.append("# TYPE dzwonnik_loop_lag_max_seconds gauge")
+    lines.append(f"dzwonnik_loop_lag_max_seconds {watchdog.statistics['max_lag']}")
+    lines.append("# TYPE dzwonnik_loop_stalls_total counter")
+    lines.append(f"dzwonnik_loop_stalls_total {watchdog.statistics['stalls']}")
+    lines.append("# TYPE dzwonnik_startup_phase_seconds gauge")
+    for name, duration in startup.phases.items():
+        lines.append(f"dzwonnik_startup_phase_seconds{_format_labels(phase=name)} {duration}")
+    if startup.total_duration is not None:
+        lines.append("# TYPE dzwonnik_startup_seconds gauge")
+        lines.append(f"dzwonnik_startup_seconds {startup.total_duration}")
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_metrics_request(_: "aiohttp_web.Request") -> "aiohttp_web.Response":
+    """Request handler for the Prometheus endpoint."""
+    from aiohttp import web as aiohttp_web  # pylint: disable=import-outside-toplevel
+
+    return aiohttp_web.Response(text=render_prometheus(), content_type="text/plain")
+
+
+async def start_http_server() -> int or None:
+    """Starts serving the metrics on localhost if the port environment variable is set.
+
+    Returns the port number, or None if the endpoint is disabled, already running, or the server
+    could not be started, e.g. because the port is in use.
+    """
+    global _server  # pylint: disable=global-statement
+    port = os.environ.get(PORT_VARIABLE)
+    if not port or _server is not None:
+        return None
+    # The web server is only imported if the endpoint is enabled, since it's slow to import
+    from aiohttp import web as aiohttp_web  # pylint: disable=import-outside-toplevel
+
+    app = aiohttp_web.Application()
+    app.router.add_get("/metrics", _handle_metrics_request)
+    runner = aiohttp_web.AppRunner(app)
+    try:
+        await runner.setup()
+        await aiohttp_web.TCPSite(runner, "127.0.0.1", int(port)).start()
+    except (ValueError, OSError) as exc:
+        # The port is invalid or already in use; the bot works without the endpoint
+        await runner.cleanup()
+        bot.send_log(f"Could not serve the metrics on port '{port}': {exc!r}", force=True)
+        return None
+    _server = runner
+    return int(port)
@@ -0,0 +1,205 @@
+"""Supervised periodic tasks.
+
+Each periodic duty of the bot runs as an independent asyncio task with its own cadence and timeout,
+so that a slow duty (e.g. the Steam Market pass) doesn't delay the others. If a run is still in
+progress when the next one is due, the next run is skipped. The blocking work of the duties is run
+with `to_thread`, so that a run which timed out is also considered in progress until its worker
+thread finishes, since the thread can't be cancelled. Exceptions and timeouts are logged
+and counted, but they don't stop the task from running again.
+"""
+
+# Standard library imports
+import asyncio
+import contextvars
+import datetime
+import sys
+import time
+
+# Third-party imports
+from corny_commons import util as ccutil
+
+# Local application imports
+from modules import bot
+
+
+class PeriodicTask:
+    """A coroutine function that is run periodically under supervision.
+
+    Attributes:
+        name -- the name of the task, used in the logs and statistics.
+        function -- the coroutine function to run. It is passed the time the run was scheduled for.
+        interval -- the number of seconds between runs. The runs are aligned to multiples of the
+        interval since the UNIX epoch, so an interval of 60 runs at the start of every minute.
+        timeout -- the number of seconds after which a run is cancelled.
+        predicate -- an optional function taking the scheduled time, which returns a boolean
+        indicating if the task should run at that time.
+        statistics -- the numbers of runs, skipped runs, failures and timeouts.
+        last_duration -- the number of seconds the last completed run took.
+        pending_threads -- the futures of the worker threads started by the runs using `to_thread`
+        that haven't finished yet.
+    """
+
+    def __init__(
+        self, name: str, function, interval: float, timeout: float, predicate=None
+    ) -> None:
+        self.name: str = name
+        self.function = function
+        self.interval: float = interval
+        self.timeout: float = timeout
+        self.predicate = predicate
+        self.statistics: dict[str, int] = dict.fromkeys(
+            ("runs", "skips", "failures", "timeouts"), 0
+        )
+        self.last_duration: float = None
+        self.pending_threads: set[asyncio.Future] = set()
+        self._scheduler: asyncio.Task = None
+        self._current_run: asyncio.Task = None
+
+    @property
+    def is_running(self) -> bool:
+        """Checks if the task is currently scheduled."""
+        return self._scheduler is not None and not self._scheduler.done()
+
+    def start(self) -> None:
+        """Starts scheduling the runs of the task. Does nothing if it's already running."""
+        if self.is_running:
+            return
+        self._scheduler = asyncio.create_task(self._schedule(), name=f"periodic-{self.name}")
+
+    def stop(self) -> None:
+        """Stops scheduling the task and cancels the current run, if any."""
+        for task in (self._scheduler, self._current_run):
+            if task is not None:
+                task.cancel()
+        self._scheduler = self._current_run = None
+
+    async def _schedule(self) -> None:
+        """Waits until each run is due and starts it, skipping it if the previous one is ongoing."""
+        while True:
+            now = time.time()
+            next_run = (now // self.interval + 1) * self.interval
+            await asyncio.sleep(next_run - now)
+            scheduled_time = datetime.datetime.fromtimestamp(next_run)
+            if self.predicate is not None and not self.predicate(scheduled_time):
+                continue
+            if self.pending_threads or (
+                self._current_run is not None and not self._current_run.done()
+            ):
+                self.statistics["skips"] += 1
+                bot.send_log(f"Skipping periodic task '{self.name}'; the last run is ongoing.")
+                continue
+            self._current_run = asyncio.create_task(
+                self._run(scheduled_time), name=f"periodic-{self.name}-run"
+            )
+
+    async def _run(self, scheduled_time: datetime.datetime) -> None:
+        """Runs the task once, logging any exception raised or if it times out."""
+        self.statistics["runs"] += 1
+        _running_task.set(self)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self.function(scheduled_time), self.timeout)
+        except asyncio.TimeoutError:
+            self.statistics["timeouts"] += 1
+            bot.send_log(
+                f"Periodic task '{self.name}' timed out after {self.timeout} s.", force=True
+            )
+        except Exception as exc:  # pylint: disable=broad-except
+            self.statistics["failures"] += 1
+            fmt_exc = ccutil.format_exception_info(exc)
+            bot.send_log(f"Periodic task '{self.name}' failed:\n{fmt_exc}", force=True)
+        finally:
+            self.last_duration = time.perf_counter() - start
+
+
+tasks: dict[str, PeriodicTask] = {}
+# The periodic task whose run is executing in the current context
+_running_task: contextvars.ContextVar[PeriodicTask] = contextvars.ContextVar(
+    "running_periodic_task", default=None
+)
+
+
+async def to_thread(function, *args, **kwargs) -> any:
+    """Runs the function in a worker thread and returns its result, like `asyncio.to_thread`.
+
+    When called from a periodic task's run, the task isn't run again until the thread finishes,
+    even if the run is cancelled by its timeout in the meantime.
+    """
+    thread_future = asyncio.ensure_future(asyncio.to_thread(function, *args, **kwargs))
+    periodic_task = _running_task.get()
+
+    def on_thread_done(future: asyncio.Future) -> None:
+        if periodic_task is not None:
+            periodic_task.pending_threads.discard(future)
+        if not future.cancelled():
+            # Retrieve the exception, so it isn't reported as unhandled if the run was cancelled
+            future.exception()
+
+    if periodic_task is not None:
+        periodic_task.pending_threads.add(thread_future)
+    thread_future.add_done_callback(on_thread_done)
+    # Cancelling the run doesn't cancel the future, so it stays pending until the thread finishes
+    return await asyncio.shield(thread_future)
+
+
+def register(name: str, interval: float, timeout: float, predicate=None):
+    """Decorator that registers the coroutine function as a periodic task.
+
+    Arguments:
+        name -- the name of the task, used in the logs and statistics.
+        interval -- the number of seconds between runs, aligned to the UNIX epoch.
+        timeout -- the number of seconds after which a run is cancelled.
+        predicate -- an optional function taking the scheduled time, which returns a boolean
+        indicating if the task should run at that time.
+    """
+
+    def decorator(function):
+        tasks[name] = PeriodicTask(name, function, interval, timeout, predicate)
+        return function
+
+    return decorator
+
+
+def rebind_functions() -> None:
+    """Replaces the functions of the tasks with the current versions defined in their modules.
+
+    Called after the modules were reloaded, so that the running tasks execute the new code.
+    """
+    for task in tasks.values():
+        task.function = _get_current_version(task.function)
+        if task.predicate is not None:
+            task.predicate = _get_current_version(task.predicate)
+
+
+def _get_current_version(function):
+    """Returns the function of the same name in the function's module, e.g. after it was reloaded.
+
+    Returns the function itself if it can't be looked up by name, e.g. if it's a lambda.
+    """
+    module = sys.modules.get(function.__module__)
+    return getattr(module, function.__qualname__, function)
+
+
+def start_all() -> None:
+    """Starts all of the registered periodic tasks that aren't already running."""
+    for task in tasks.values():
+        task.start()
+
+
+def stop_all() -> None:
+    """Stops all of the registered periodic tasks."""
+    for task in tasks.values():
+        task.stop()
+
+
+def is_running() -> bool:
+    """Checks if any of the registered periodic tasks are running."""
+    return any(task.is_running for task in tasks.values())
+
+
+def get_statistics() -> dict[str, dict[str, any]]:
+    """Returns the statistics and the last run duration of each periodic task."""
+    return {
+        name: {**task.statistics, "last_duration": task.last_duration}
+        for name, task in tasks.items()
+    }
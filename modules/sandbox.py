@@ -0,0 +1,138 @@
+"""Execution of blocking code outside of the event loop, with a hard timeout.
+
+Code run in a supervised thread has access to the live bot state. If it exceeds the timeout, an
+exception is raised asynchronously in the thread, which interrupts pure Python code such as an
+infinite loop, but not a blocking call into C code.
+
+Code run in a worker process only has access to a read-only snapshot of the bot state passed as
+plain data. The process is killed if it exceeds the timeout, so this mode is always interruptible.
+This module deliberately doesn't import the bot, so that the worker process starts quickly.
+"""
+
+# Standard library imports
+import asyncio
+import ctypes
+import multiprocessing
+import threading
+from concurrent.futures import Future
+
+# Third-party imports
+from corny_commons import util as ccutil
+
+# Local application imports
+from modules import util
+
+
+# The code template executed in the thread and process modes. Unlike the in-loop template, the
+# function is synchronous, and it is also passed the state of the bot.
+EXPRESSION_TEMPLATE = "def __execute(message, state):\n    {}\n    return locals()"
+
+# Worker processes are spawned rather than forked, as forking a process with threads is unsafe
+_process_context = multiprocessing.get_context("spawn")
+
+
+class ExecutionTimeout(BaseException):
+    """Raised asynchronously in the execution thread when the code exceeds the timeout.
+
+    Derives from BaseException so that it isn't caught by the executed code's exception handlers.
+    """
+
+
+def _execute(source: str, global_variables: dict[str, any], *args) -> list[str]:
+    """Defines and calls the '__execute()' function, returning the formatted results."""
+    try:
+        local_variables = {}
+        exec(source, global_variables, local_variables)  # pylint: disable=exec-used
+        execute_locals: dict[str, any] = local_variables["__execute"](*args) or {}
+    except Exception as exec_exc:  # pylint: disable=broad-except
+        return [f"```py\n{ccutil.format_exception_info(exec_exc)}```"]
+    exec_result = execute_locals.get("__temp", util.ExecResultList())
+    if isinstance(exec_result, util.ExecResultList) and not exec_result:
+        return ["*(return value unspecified)*"]
+    return util.format_code_results(exec_result)
+
+
+def _process_worker(connection, source: str, message: dict, state: dict) -> None:
+    """The entry point of the worker process. Sends the formatted results through the pipe."""
+    with connection:
+        connection.send(_execute(source, {"util": util}, message, state))
+
+
+def _interrupt_thread(thread: threading.Thread) -> None:
+    """Raises ExecutionTimeout asynchronously in the given thread."""
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(
+        ctypes.c_ulong(thread.ident), ctypes.py_object(ExecutionTimeout)
+    )
+
+
+async def run_in_thread(
+    source: str, global_variables: dict[str, any], message: any, state: any, timeout: float
+) -> list[str]:
+    """Executes the code in a dedicated daemon thread without blocking the event loop.
+
+    Arguments:
+        source -- the code defining the '__execute()' function according to EXPRESSION_TEMPLATE.
+        global_variables -- the global namespace the code is executed in.
+        message -- the message containing the command, made available to the executed code.
+        state -- the bot state made available to the executed code.
+        timeout -- the number of seconds after which the thread is interrupted.
+
+    Returns the results formatted using `util.format_code_results`.
+    """
+    future = Future()
+
+    def target():
+        try:
+            future.set_result(_execute(source, global_variables, message, state))
+        except ExecutionTimeout:
+            future.set_result([f"```py\nExecution exceeded the timeout of {timeout} s.```"])
+
+    thread = threading.Thread(target=target, name="exec-sandbox", daemon=True)
+    thread.start()
+    try:
+        return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+    except asyncio.TimeoutError:
+        _interrupt_thread(thread)
+    # Give the thread a moment to handle the exception before reporting it as unresponsive
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(future), 1)
+    except asyncio.TimeoutError:
+        return [
+            f"```py\nExecution exceeded the timeout of {timeout} s and could not be interrupted. "
+            "The thread will keep running in the background.```"
+        ]
+
+
+async def run_in_process(source: str, message: dict, state: dict, timeout: float) -> list[str]:
+    """Executes the code in a worker process, which is killed if it exceeds the timeout.
+
+    Arguments:
+        source -- the code defining the '__execute()' function according to EXPRESSION_TEMPLATE.
+        message -- a picklable snapshot of the message containing the command.
+        state -- a picklable snapshot of the bot state.
+        timeout -- the number of seconds after which the process is killed.
+
+    Returns the results formatted using `util.format_code_results`.
+    """
+    receiver, sender = _process_context.Pipe(duplex=False)
+    process = _process_context.Process(
+        target=_process_worker,
+        args=(sender, source, message, state),
+        name="exec-sandbox",
+        daemon=True,
+    )
+    process.start()
+    # The parent's copy of the sending end must be closed so that EOF is detected if the child dies
+    sender.close()
+    try:
+        if not await asyncio.to_thread(receiver.poll, timeout):
+            process.kill()
+            return [f"```py\nExecution exceeded the timeout of {timeout} s; process killed.```"]
+        try:
+            return receiver.recv()
+        except EOFError:
+            await asyncio.to_thread(process.join)
+            return [f"```py\nThe worker process exited with code {process.exitcode}.```"]
+    finally:
+        receiver.close()
+        await asyncio.to_thread(process.join)
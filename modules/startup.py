@@ -0,0 +1,150 @@
+"""Timing of the start-up phases and the warm-start snapshot of the static bot data.
+
+Each phase of the start-up, from saving the previous log file to the first `on_ready` event, is
+timed and the report is logged once the bot is ready. The report is also shown by the 'stats'
+command and exported by the Prometheus endpoint.
+
+The warm-start snapshot contains the data that is otherwise scraped or read from disk in `on_ready`
+(the period times, the DP lesson plan and the teacher index). It is loaded before connecting to
+Discord, so that the bot can respond to commands immediately, while the data is refreshed from the
+network in the background.
+"""
+
+# Standard library imports
+import contextlib
+import json
+import os
+import time
+
+# Third-party imports
+from corny_commons import file_manager
+
+# Local application imports
+from modules import util
+
+
+WARM_START_FILENAME = "warm_start.json"
+# Incremented whenever the structure of the snapshot changes, so that old snapshots are ignored
+WARM_START_VERSION = 1
+
+# The duration of each completed phase in seconds, in the order they were completed
+phases: dict[str, float] = {}
+# The number of seconds from the start of the start-up to the bot being ready
+total_duration: float = None
+
+_start_time: float = None
+_started_phases: dict[str, float] = {}
+
+
+def begin() -> None:
+    """Marks the start of the start-up, discarding the timings of any previous start-up."""
+    global _start_time, total_duration  # pylint: disable=global-statement
+    _start_time = time.perf_counter()
+    total_duration = None
+    phases.clear()
+    _started_phases.clear()
+
+
+def start_phase(name: str) -> None:
+    """Marks the start of the phase. Used for phases that don't fit in a single block."""
+    _started_phases[name] = time.perf_counter()
+
+
+def end_phase(name: str) -> None:
+    """Marks the end of the phase. Does nothing if it wasn't started."""
+    start = _started_phases.pop(name, None)
+    if start is not None:
+        phases[name] = time.perf_counter() - start
+
+
+@contextlib.contextmanager
+def phase(name: str):
+    """Context manager that times the phase named `name`."""
+    start_phase(name)
+    try:
+        yield
+    finally:
+        end_phase(name)
+
+
+def is_finished() -> bool:
+    """Checks if the start-up has been completed."""
+    return total_duration is not None
+
+
+def finish() -> str:
+    """Marks the end of the start-up and returns the report of the phase timings."""
+    global total_duration  # pylint: disable=global-statement
+    total_duration = time.perf_counter() - (_start_time or time.perf_counter())
+    return format_report()
+
+
+def format_report() -> str:
+    """Returns the phase timings in milliseconds, one per line, followed by the total."""
+    lines = [f"{name}: {duration * 1000:.1f} ms" for name, duration in phases.items()]
+    if total_duration is not None:
+        lines.append(f"total: {total_duration * 1000:.1f} ms")
+    return "\n".join(lines)
+
+
+def compile_lookup_tables() -> None:
+    """Rebuilds the lookup tables derived from the period times in `util.lesson_plan_dp`."""
+    util.period_boundaries = {
+        tuple(boundary): period
+        for period, times in enumerate(util.lesson_plan_dp["times"])
+        for boundary in times
+    }
+
+
+def apply_static_data(plan_dp: dict[str, list], teacher_subjects: dict[str, list[str]]) -> None:
+    """Makes the DP lesson plan and the teacher index available to the bot.
+
+    Arguments:
+        plan_dp -- a dictionary containing the period times and the DP lesson plan.
+        teacher_subjects -- a dictionary mapping each teacher to the subjects they teach.
+    """
+    util.lesson_plan_dp = plan_dp
+    util.teacher_subjects = teacher_subjects
+    util.static_data_version += 1
+    compile_lookup_tables()
+
+
+def get_warm_start_filename() -> str:
+    """Returns the path of the warm-start snapshot file."""
+    return os.path.join(file_manager.CACHE_DIRECTORY, WARM_START_FILENAME)
+
+
+def load_warm_start() -> bool:
+    """Loads the warm-start snapshot, if there is a valid one.
+
+    Returns a boolean indicating if the snapshot was loaded.
+    """
+    try:
+        with open(get_warm_start_filename(), "r", encoding="UTF-8") as file:
+            snapshot = json.load(file)
+    except (OSError, json.JSONDecodeError):
+        return False
+    if not isinstance(snapshot, dict) or snapshot.get("version") != WARM_START_VERSION:
+        return False
+    apply_static_data(snapshot["lesson_plan_dp"], snapshot["teacher_subjects"])
+    return True
+
+
+def save_warm_start() -> None:
+    """Writes the current static data to the warm-start snapshot file.
+
+    The file is replaced atomically, so a snapshot that was only partially written is never loaded.
+    """
+    if not os.path.isdir(file_manager.CACHE_DIRECTORY):
+        os.mkdir(file_manager.CACHE_DIRECTORY)
+    snapshot = {
+        "version": WARM_START_VERSION,
+        "timestamp": time.time(),
+        "lesson_plan_dp": util.lesson_plan_dp,
+        "teacher_subjects": util.teacher_subjects,
+    }
+    filename = get_warm_start_filename()
+    temporary_filename = filename + ".tmp"
+    with open(temporary_filename, "w", encoding="UTF-8") as file:
+        json.dump(snapshot, file, ensure_ascii=False)
+    os.replace(temporary_filename, filename)
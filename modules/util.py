@@ -8,7 +8,7 @@ import json
 from corny_commons.util import web
 
 # Local application imports
-from modules import GROUP_NAMES
+from modules import GROUP_NAMES, ROLE_CODES
 
 URL_404 = "https://www.guzek.uk/error/404/?lang=PL&utm_source=discord"
 
@@ -18,11 +18,21 @@ lesson_plan: dict[str, any] = {}
 lesson_plan_dp: dict[str, list[list[int]] or list[list[dict]]] = {}
 lesson_links: dict[str, str] = {}
 teacher_subjects: dict[str, list[str]] = {}
+# Maps the (hour, minute) start and end times of each period to the period number.
+# Compiled from `lesson_plan_dp` by `startup.compile_lookup_tables`.
+period_boundaries: dict[tuple[int, int], int] = {}
+# Incremented by `startup.apply_static_data` whenever the DP plan or the teacher index is replaced
+static_data_version: int = 0
 
 # Used to show the current lesson in the lesson plan (e.g. '!plan' command).
 current_period: int = -1
 next_period: int = -1
 
+# Map each guild ID to the group code <-> role ID mappings of that guild's roles.
+# These are rebuilt whenever a role in the guild is created, updated or deleted.
+group_role_ids: dict[int, dict[str, int]] = {}
+role_group_codes: dict[int, dict[int, str]] = {}
+
 
 class ExecResultList(list):
     """Defines a custom class that derives from the `list` base type.
@@ -165,6 +175,52 @@ def get_formatted_period_time(period: int or str = None) -> str:
     return "-".join([":".join([f"{t:02}" for t in time]) for time in times])
 
 
+def refresh_group_roles(guild) -> None:
+    """Rebuilds the group code <-> role ID mappings for the given `discord.Guild`."""
+    group_codes = {role_name: code for code, role_name in ROLE_CODES.items()}
+    role_ids: dict[str, int] = {}
+    for role in guild.roles:
+        group_code = group_codes.get(str(role))
+        if group_code is not None and group_code not in role_ids:
+            role_ids[group_code] = role.id
+    group_role_ids[guild.id] = role_ids
+    role_group_codes[guild.id] = {role_id: code for code, role_id in role_ids.items()}
+
+
+def get_group_role_id(guild, group_code: str) -> int or None:
+    """Returns the ID of the role in the given guild that corresponds to the group code."""
+    if guild.id not in group_role_ids:
+        refresh_group_roles(guild)
+    return group_role_ids[guild.id].get(group_code)
+
+
+def get_group_code(guild, role_id: int) -> str or None:
+    """Returns the group code corresponding to the role with the given ID in the guild."""
+    if guild.id not in role_group_codes:
+        refresh_group_roles(guild)
+    return role_group_codes[guild.id].get(role_id)
+
+
+def is_in_group(guild, member, group_code: str) -> bool:
+    """Checks if the `discord.Member` of the given guild belongs to the group with the given code.
+    Everyone belongs to the entire class and to the groups that have no corresponding role.
+    """
+    if group_code == "grupa_0":
+        return True
+    role_id = get_group_role_id(guild, group_code)
+    return role_id is None or any(role.id == role_id for role in getattr(member, "roles", []))
+
+
+def get_group_mention(guild, group_code: str) -> str:
+    """Returns the mention string of the role corresponding to the given group code.
+    Defaults to '@everyone' if the group is the entire class or has no corresponding role.
+    """
+    if group_code == "grupa_0":
+        return "@everyone"
+    role_id = get_group_role_id(guild, group_code)
+    return "@everyone" if role_id is None else f"<@&{role_id}>"
+
+
 def get_error_message(web_exc: web.WebException) -> str:
     """Returns the error message to be displayed to the user if a web exception occurs."""
     if not isinstance(web_exc, web.WebException):
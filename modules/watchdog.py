@@ -0,0 +1,138 @@
+"""Event loop lag monitor.
+
+A coroutine on the event loop measures how late its sleeps wake up, which is how long the loop was
+blocked. A helper thread watches the coroutine's heartbeat, and if the loop stalls for longer than
+the threshold, it captures the stack of the blocking frame while the stall is still in progress.
+The report is logged once the loop is responsive again, along with the name of the asyncio task
+that was running, e.g. the command or periodic task. The task is identified on the loop's side, by
+finding the task whose coroutine frame is in the captured stack.
+
+The bot reuses the event loop when it's restarted, so the monitor is stopped before the loop is,
+and the first sample after the loop was stopped is discarded, since it includes the downtime.
+"""
+
+# Standard library imports
+import asyncio
+import sys
+import threading
+import time
+import traceback
+
+# Local application imports
+from modules import bot
+
+
+# The number of seconds between the latency measurements
+SAMPLE_INTERVAL = 0.1
+# The number of seconds the loop must be blocked for the stall to be reported
+STALL_THRESHOLD = 0.5
+# The maximum number of stack frames included in the report
+MAX_STACK_DEPTH = 15
+
+statistics: dict[str, float] = {"samples": 0, "stalls": 0, "last_lag": 0.0, "max_lag": 0.0}
+
+_heartbeat: float = time.monotonic()
+# The stack captured by the helper thread during the current stall and the IDs of its frames
+_captured_stall: tuple[str, set[int]] = None
+# Set by the helper thread if it saw the loop stop, so that the next sample is discarded
+_loop_was_stopped: bool = False
+_monitor_task: asyncio.Task = None
+_helper_thread: threading.Thread = None
+# Set to make the current helper thread exit
+_helper_stop: threading.Event = threading.Event()
+
+
+def _capture_stall(
+    loop: asyncio.AbstractEventLoop, loop_thread_id: int, stop: threading.Event
+) -> None:
+    """Helper thread that captures the stack of the event loop thread when it is blocked."""
+    global _captured_stall, _loop_was_stopped  # pylint: disable=global-statement
+    while not stop.wait(SAMPLE_INTERVAL):
+        if not loop.is_running():
+            # The loop was stopped, e.g. to restart the bot; its thread isn't blocked by a task
+            _loop_was_stopped = True
+            return
+        # The heartbeat is updated before each sleep, so allow for the sleep itself
+        blocked_for = time.monotonic() - _heartbeat - SAMPLE_INTERVAL
+        if _captured_stall is not None or blocked_for < STALL_THRESHOLD:
+            continue
+        frame = sys._current_frames().get(loop_thread_id)  # pylint: disable=protected-access
+        if frame is None:
+            continue
+        stack = "".join(traceback.format_stack(frame, limit=MAX_STACK_DEPTH))
+        frame_ids = set()
+        while frame is not None:
+            frame_ids.add(id(frame))
+            frame = frame.f_back
+        _captured_stall = stack, frame_ids
+
+
+def _get_task_name(frame_ids: set[int]) -> str:
+    """Returns the name of the task whose coroutine was running in the captured frames."""
+    for task in asyncio.all_tasks():
+        coroutine_frame = getattr(task.get_coro(), "cr_frame", None)
+        if coroutine_frame is not None and id(coroutine_frame) in frame_ids:
+            return task.get_name()
+    # The task finished during the stall, or the loop was blocked by a callback
+    return "(unknown)"
+
+
+async def _measure_lag() -> None:
+    """Continuously measures the event loop latency and logs the stalls once they end."""
+    global _heartbeat, _captured_stall, _loop_was_stopped  # pylint: disable=global-statement
+    while True:
+        _heartbeat = start = time.monotonic()
+        await asyncio.sleep(SAMPLE_INTERVAL)
+        lag = time.monotonic() - start - SAMPLE_INTERVAL
+        _heartbeat = time.monotonic()
+        stall, _captured_stall = _captured_stall, None
+        if _loop_was_stopped:
+            # The sample includes the time the loop was stopped for, e.g. the restart downtime
+            _loop_was_stopped = False
+            continue
+        statistics["samples"] += 1
+        statistics["last_lag"] = lag
+        statistics["max_lag"] = max(statistics["max_lag"], lag)
+        if lag < STALL_THRESHOLD:
+            continue
+        statistics["stalls"] += 1
+        if stall is None:
+            task_name, stack = "(unknown)", "(stack not captured)\n"
+        else:
+            stack, frame_ids = stall
+            task_name = _get_task_name(frame_ids)
+        bot.send_log(
+            f"Event loop was blocked for {lag:.3f} s while running task '{task_name}'.\n"
+            f"Blocking stack:\n{stack}",
+            force=True,
+        )
+
+
+def start() -> None:
+    """Starts monitoring the running event loop, replacing the monitor of a previous run."""
+    global _monitor_task, _helper_thread, _helper_stop  # pylint: disable=global-statement
+    global _heartbeat, _captured_stall, _loop_was_stopped  # pylint: disable=global-statement
+    stop()
+    _heartbeat = time.monotonic()
+    _captured_stall = None
+    _loop_was_stopped = False
+    loop = asyncio.get_running_loop()
+    _monitor_task = loop.create_task(_measure_lag(), name="watchdog")
+    # The previous helper may not have exited yet, so the new one gets its own stop event
+    _helper_stop = threading.Event()
+    _helper_thread = threading.Thread(
+        target=_capture_stall,
+        args=(loop, threading.get_ident(), _helper_stop),
+        name="watchdog-helper",
+        daemon=True,
+    )
+    _helper_thread.start()
+
+
+def stop() -> None:
+    """Stops monitoring the event loop, e.g. before it's stopped to restart the bot."""
+    global _monitor_task  # pylint: disable=global-statement
+    if _monitor_task is not None:
+        _monitor_task.cancel()
+        _monitor_task = None
+    _helper_stop.set()
@@ -4,9 +4,12 @@ import modules
 from modules import main
 
 
-while True:
-    importlib.reload(modules)
-    importlib.reload(main)
-    if not main.start_bot():
-        # start_bot() returns a boolean indicating whether or not the bot should be restarted
-        break
+# The guard prevents the bot from being started again in the sandboxed 'exec' worker processes,
+# which re-import the main module when they are spawned
+if __name__ == "__main__":
+    while True:
+        importlib.reload(modules)
+        importlib.reload(main)
+        if not main.start_bot():
+            # start_bot() returns a boolean indicating whether or not the bot should be restarted
+            break